@@ -1,19 +1,16 @@
 """
 Módulo de autenticação e segurança
 """
-from datetime import datetime, timedelta
+import secrets
+from datetime import datetime, timedelta, timezone
 from typing import Optional
 from jose import JWTError, jwt
-from passlib.context import CryptContext
 from fastapi import Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
-from sqlalchemy.orm import Session
-from app.database import get_db
-from app.models import User, RefreshToken
 from app.config import settings
-
-# Configuração de hash de senhas
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+from app.services.user_cache import UserSnapshot, load_user_snapshot, user_cache
+from app.services.password_hashing import hash_password, verify_password as verify_password_in_pool
+from app.services.token_store import save_refresh_token, revoke_refresh_token  # noqa: F401 - usados pelos routers
 
 # OAuth2 scheme
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/api/auth/login", auto_error=False)
@@ -22,23 +19,23 @@ oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/api/auth/login", auto_error=Fals
 SECRET_KEY = settings.secret_key
 ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = 30
-REFRESH_TOKEN_EXPIRE_DAYS = 7
+REFRESH_TOKEN_EXPIRE_DAYS = settings.refresh_token_expire_days
 
 def verify_password(plain_password: str, hashed_password: str) -> bool:
-    """Verificar senha"""
-    return pwd_context.verify(plain_password, hashed_password)
+    """Verificar senha (no pool de hash)"""
+    return verify_password_in_pool(plain_password, hashed_password)
 
 def get_password_hash(password: str) -> str:
-    """Hash de senha"""
-    return pwd_context.hash(password)
+    """Hash de senha (no pool de hash)"""
+    return hash_password(password)
 
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None) -> str:
     """Criar token JWT"""
     to_encode = data.copy()
     if expires_delta:
-        expire = datetime.utcnow() + expires_delta
+        expire = datetime.now(timezone.utc) + expires_delta
     else:
-        expire = datetime.utcnow() + timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
+        expire = datetime.now(timezone.utc) + timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
     to_encode.update({"exp": expire, "type": "access"})
     encoded_jwt = jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
     return encoded_jwt
@@ -46,8 +43,9 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None) -
 def create_refresh_token(data: dict) -> str:
     """Criar refresh token"""
     to_encode = data.copy()
-    expire = datetime.utcnow() + timedelta(days=REFRESH_TOKEN_EXPIRE_DAYS)
-    to_encode.update({"exp": expire, "type": "refresh"})
+    expire = datetime.now(timezone.utc) + timedelta(days=REFRESH_TOKEN_EXPIRE_DAYS)
+    # jti aleatório: dois logins no mesmo segundo geravam o mesmo token
+    to_encode.update({"exp": expire, "type": "refresh", "jti": secrets.token_urlsafe(16)})
     encoded_jwt = jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
     return encoded_jwt
 
@@ -68,10 +66,13 @@ def verify_token(token: str, token_type: str = "access") -> dict:
         )
 
 async def get_current_user(
-    token: str = Depends(oauth2_scheme),
-    db: Session = Depends(get_db)
-) -> User:
-    """Obter usuário atual a partir do token"""
+    token: str = Depends(oauth2_scheme)
+) -> UserSnapshot:
+    """Obter usuário atual a partir do token
+
+    Retorna um UserSnapshot (id, role, is_active, is_superuser) do cache de
+    usuários; o banco só é consultado quando o usuário não está em cache.
+    """
     if not token:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
@@ -97,7 +98,9 @@ async def get_current_user(
             detail="Could not validate credentials"
         )
     
-    user = db.query(User).filter(User.id == user_id).first()
+    user = user_cache.get(user_id)
+    if user is None:
+        user = await load_user_snapshot(user_id)
     if user is None:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
@@ -113,8 +116,8 @@ async def get_current_user(
     return user
 
 async def get_current_active_user(
-    current_user: User = Depends(get_current_user)
-) -> User:
+    current_user: UserSnapshot = Depends(get_current_user)
+) -> UserSnapshot:
     """Obter usuário ativo"""
     if not current_user.is_active:
         raise HTTPException(
@@ -124,8 +127,8 @@ async def get_current_active_user(
     return current_user
 
 async def get_current_admin_user(
-    current_user: User = Depends(get_current_active_user)
-) -> User:
+    current_user: UserSnapshot = Depends(get_current_active_user)
+) -> UserSnapshot:
     """Obter usuário admin"""
     if current_user.role != "admin" and not current_user.is_superuser:
         raise HTTPException(
@@ -133,29 +136,3 @@ async def get_current_admin_user(
             detail="Not enough permissions"
         )
     return current_user
-
-def save_refresh_token(db: Session, user_id: int, token: str) -> RefreshToken:
-    """Salvar refresh token no banco"""
-    expires_at = datetime.utcnow() + timedelta(days=REFRESH_TOKEN_EXPIRE_DAYS)
-    refresh_token = RefreshToken(
-        token=token,
-        user_id=user_id,
-        expires_at=expires_at
-    )
-    db.add(refresh_token)
-    db.commit()
-    db.refresh(refresh_token)
-    return refresh_token
-
-def revoke_refresh_token(db: Session, token: str) -> bool:
-    """Revogar refresh token"""
-    refresh_token = db.query(RefreshToken).filter(
-        RefreshToken.token == token,
-        RefreshToken.is_revoked == False
-    ).first()
-    if refresh_token:
-        refresh_token.is_revoked = True
-        db.commit()
-        return True
-    return False
-
@@ -2,7 +2,7 @@
 Configurações da aplicação
 """
 import os
-from typing import List
+from typing import List, Tuple
 
 # Fallback para pydantic-settings se não estiver disponível
 try:
@@ -14,6 +14,24 @@ class Settings(BaseSettings):
     # Database
     database_url: str = os.getenv("DATABASE_URL", "sqlite:///./financial_manager.db")
     
+    # Pool de conexões (perfis em app/database.py)
+    db_pool_size: int = int(os.getenv("DB_POOL_SIZE", "5"))
+    db_max_overflow: int = int(os.getenv("DB_MAX_OVERFLOW", "10"))
+    db_pool_timeout_seconds: float = float(os.getenv("DB_POOL_TIMEOUT_SECONDS", "30"))
+    db_pool_recycle_seconds: int = int(os.getenv("DB_POOL_RECYCLE_SECONDS", "1800"))
+    db_pool_pre_ping: bool = os.getenv("DB_POOL_PRE_PING", "true").lower() == "true"
+    
+    # PostgreSQL
+    db_connect_timeout_seconds: int = int(os.getenv("DB_CONNECT_TIMEOUT_SECONDS", "10"))
+    db_statement_timeout_ms: int = int(os.getenv("DB_STATEMENT_TIMEOUT_MS", "30000"))
+    
+    # Pragmas do SQLite
+    sqlite_journal_mode: str = os.getenv("SQLITE_JOURNAL_MODE", "WAL")
+    sqlite_synchronous: str = os.getenv("SQLITE_SYNCHRONOUS", "NORMAL")
+    sqlite_cache_size_kb: int = int(os.getenv("SQLITE_CACHE_SIZE_KB", "20000"))
+    sqlite_mmap_size_mb: int = int(os.getenv("SQLITE_MMAP_SIZE_MB", "256"))
+    sqlite_busy_timeout_ms: int = int(os.getenv("SQLITE_BUSY_TIMEOUT_MS", "5000"))
+    
     # CORS - converter string para lista
     cors_origins_str: str = os.getenv("CORS_ORIGINS", "https://financial-clever.com.br,http://localhost:5173")
     
@@ -33,8 +51,91 @@ class Settings(BaseSettings):
     access_token_expire_minutes: int = int(os.getenv("ACCESS_TOKEN_EXPIRE_MINUTES", "30"))
     refresh_token_expire_days: int = int(os.getenv("REFRESH_TOKEN_EXPIRE_DAYS", "7"))
     
+    # Hash de senhas (bcrypt)
+    bcrypt_rounds: int = int(os.getenv("BCRYPT_ROUNDS", "12"))
+    password_hash_workers: int = int(os.getenv("PASSWORD_HASH_WORKERS", "2"))
+    password_hash_max_queue: int = int(os.getenv("PASSWORD_HASH_MAX_QUEUE", "64"))
+    
+    # Limpeza dos refresh tokens vencidos ou revogados
+    refresh_token_prune_interval_seconds: int = int(os.getenv("REFRESH_TOKEN_PRUNE_INTERVAL_SECONDS", "3600"))
+    refresh_token_prune_batch_size: int = int(os.getenv("REFRESH_TOKEN_PRUNE_BATCH_SIZE", "1000"))
+    
+    # Cache de usuários autenticados
+    user_cache_size: int = int(os.getenv("USER_CACHE_SIZE", "1024"))
+    user_cache_ttl_seconds: int = int(os.getenv("USER_CACHE_TTL_SECONDS", "60"))
+    
     # Rate Limiting
     rate_limit_per_minute: int = int(os.getenv("RATE_LIMIT_PER_MINUTE", "60"))
+    rate_limit_enabled: bool = os.getenv("RATE_LIMIT_ENABLED", "true").lower() == "true"
+    # memory:// (por processo) ou redis://host:6379/1 (compartilhado entre réplicas)
+    rate_limit_storage_uri: str = os.getenv("RATE_LIMIT_STORAGE_URI", "memory://")
+    rate_limit_strategy: str = os.getenv("RATE_LIMIT_STRATEGY", "sliding-window-counter")
+    
+    # Headers de segurança (valor vazio remove o header)
+    security_content_type_options: str = os.getenv("SECURITY_CONTENT_TYPE_OPTIONS", "nosniff")
+    security_frame_options: str = os.getenv("SECURITY_FRAME_OPTIONS", "DENY")
+    security_xss_protection: str = os.getenv("SECURITY_XSS_PROTECTION", "1; mode=block")
+    security_hsts: str = os.getenv("SECURITY_HSTS", "max-age=31536000; includeSubDomains")
+    security_csp: str = os.getenv("SECURITY_CSP", "default-src 'self'")
+    security_referrer_policy: str = os.getenv("SECURITY_REFERRER_POLICY", "strict-origin-when-cross-origin")
+    security_permissions_policy: str = os.getenv("SECURITY_PERMISSIONS_POLICY", "geolocation=(), microphone=(), camera=()")
+    
+    @property
+    def security_headers(self) -> List[Tuple[str, str]]:
+        headers = [
+            ("X-Content-Type-Options", self.security_content_type_options),
+            ("X-Frame-Options", self.security_frame_options),
+            ("X-XSS-Protection", self.security_xss_protection),
+            ("Strict-Transport-Security", self.security_hsts),
+            ("Content-Security-Policy", self.security_csp),
+            ("Referrer-Policy", self.security_referrer_policy),
+            ("Permissions-Policy", self.security_permissions_policy),
+        ]
+        return [(name, value) for name, value in headers if value]
+    
+    # Métricas em /api/metrics (formato Prometheus)
+    metrics_enabled: bool = os.getenv("METRICS_ENABLED", "true").lower() == "true"
+    # Token exigido como "Authorization: Bearer <token>"; vazio deixa a rota aberta
+    # (nesse caso /api/metrics não pode passar pelo ingress)
+    metrics_token: str = os.getenv("METRICS_TOKEN", "")
+    
+    # Profiler de consultas por requisição: off, header (com X-Query-Profile) ou always.
+    # Só para desenvolvimento: a resposta expõe o SQL executado e os tempos
+    query_profiler: str = os.getenv("QUERY_PROFILER", "off")
+    # Segredo exigido no header X-Query-Profile quando QUERY_PROFILER=header
+    query_profiler_token: str = os.getenv("QUERY_PROFILER_TOKEN", "")
+    query_profiler_repeat_threshold: int = int(os.getenv("QUERY_PROFILER_REPEAT_THRESHOLD", "5"))
+    
+    # Logging (app/logging_config.py)
+    log_level: str = os.getenv("LOG_LEVEL", "INFO")
+    # Níveis por módulo, ex.: "app.routers=DEBUG,sqlalchemy.engine=INFO"
+    log_levels: str = os.getenv("LOG_LEVELS", "")
+    log_format: str = os.getenv("LOG_FORMAT", "json")
+    log_queue_size: int = int(os.getenv("LOG_QUEUE_SIZE", "10000"))
+    log_sample_burst: int = int(os.getenv("LOG_SAMPLE_BURST", "20"))
+    log_sample_interval_seconds: float = float(os.getenv("LOG_SAMPLE_INTERVAL_SECONDS", "60"))
+    log_sample_max_level: str = os.getenv("LOG_SAMPLE_MAX_LEVEL", "ERROR")
+    
+    # Cache de respostas do dashboard (memory, redis ou none)
+    response_cache_backend: str = os.getenv("RESPONSE_CACHE_BACKEND", "memory")
+    response_cache_url: str = os.getenv("RESPONSE_CACHE_URL", "redis://localhost:6379/0")
+    response_cache_size: int = int(os.getenv("RESPONSE_CACHE_SIZE", "1024"))
+    response_cache_ttl_seconds: int = int(os.getenv("RESPONSE_CACHE_TTL_SECONDS", "30"))
+    
+    # Operações em lote de transações (/api/transactions/bulk)
+    bulk_max_items: int = int(os.getenv("BULK_MAX_ITEMS", "500"))
+    
+    # Relatórios
+    report_workers: int = int(os.getenv("REPORT_WORKERS", "2"))
+    report_job_workers: int = int(os.getenv("REPORT_JOB_WORKERS", "2"))
+    report_artifacts_dir: str = os.getenv("REPORT_ARTIFACTS_DIR", "./data/reports")
+    report_artifact_ttl_minutes: int = int(os.getenv("REPORT_ARTIFACT_TTL_MINUTES", "60"))
+    report_job_timeout_minutes: int = int(os.getenv("REPORT_JOB_TIMEOUT_MINUTES", "15"))
+    report_cleanup_interval_seconds: int = int(os.getenv("REPORT_CLEANUP_INTERVAL_SECONDS", "300"))
+    
+    # Importação de planilhas
+    upload_max_size_mb: int = int(os.getenv("UPLOAD_MAX_SIZE_MB", "100"))
+    upload_batch_size: int = int(os.getenv("UPLOAD_BATCH_SIZE", "1000"))
     
     class Config:
         env_file = ".env"
@@ -1,13 +1,231 @@
-from sqlalchemy import create_engine
+"""
+Engine do banco de dados e sessões
+
+O engine é montado a partir de um perfil escolhido pela URL
+(DATABASE_URL) e configurado pelo Settings:
+
+- sqlite_file: QueuePool com limite e timeout de espera; em cada conexão
+  nova são aplicados os pragmas (WAL, synchronous, cache_size, mmap_size,
+  busy_timeout), para leitores não bloquearem escritores e escritas
+  concorrentes esperarem o lock em vez de falhar com "database is locked".
+- sqlite_memory: StaticPool, uma única conexão compartilhada (o banco em
+  memória só existe enquanto a conexão estiver aberta). Usado em testes.
+- postgresql: QueuePool com pool_size/max_overflow, pre_ping e recycle;
+  connect_timeout e statement_timeout vão como argumentos do driver, e a
+  sessão usa timezone=UTC: datas sem fuso (as copiadas do SQLite, por
+  exemplo) são lidas como UTC, seja qual for o fuso do servidor.
+
+O tempo de espera por uma conexão do pool é medido (pool_stats()).
+
+Além do engine síncrono (SessionLocal/get_db) existe um assíncrono com
+o mesmo perfil (aiosqlite ou asyncpg), usado por AsyncSessionLocal e
+get_async_db. Em SQLite em memória os dois compartilham o mesmo banco
+(cache compartilhado).
+"""
+import threading
+import time
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import Engine, make_url
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
-import os
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, async_sessionmaker, create_async_engine
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool, StaticPool
+from app.config import settings
+
+SQLALCHEMY_DATABASE_URL = settings.database_url
+
+class PoolStats:
+    """Contadores de checkout e de espera por conexão"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.checkouts = 0
+        self.timeouts = 0
+        self.wait_total = 0.0
+        self.wait_max = 0.0
+
+    def record(self, waited: float, timed_out: bool = False) -> None:
+        with self._lock:
+            if timed_out:
+                self.timeouts += 1
+            else:
+                self.checkouts += 1
+            self.wait_total += waited
+            self.wait_max = max(self.wait_max, waited)
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            attempts = self.checkouts + self.timeouts
+            return {
+                "checkouts": self.checkouts,
+                "timeouts": self.timeouts,
+                "wait_avg_ms": round(self.wait_total / attempts * 1000, 3) if attempts else 0.0,
+                "wait_max_ms": round(self.wait_max * 1000, 3),
+            }
+
+class _TimedPoolMixin:
+    """Mede quanto cada checkout esperou por uma conexão"""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.stats = PoolStats()
+
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            connection = super()._do_get()
+        except PoolTimeoutError:
+            self.stats.record(time.perf_counter() - start, timed_out=True)
+            raise
+        self.stats.record(time.perf_counter() - start)
+        return connection
+
+    def recreate(self):
+        # engine.dispose() recria o pool; os contadores continuam
+        pool = super().recreate()
+        pool.stats = self.stats
+        return pool
+
+class TimedQueuePool(_TimedPoolMixin, QueuePool):
+    pass
+
+class TimedAsyncQueuePool(_TimedPoolMixin, AsyncAdaptedQueuePool):
+    pass
 
-SQLALCHEMY_DATABASE_URL = os.getenv("DATABASE_URL", "sqlite:///./financial_manager.db")
+def engine_profile(url: str) -> str:
+    """Perfil do engine para a URL: sqlite_file, sqlite_memory ou postgresql"""
+    parsed = make_url(url)
+    backend = parsed.get_backend_name()
+    if backend == "sqlite":
+        if parsed.database in (None, "", ":memory:") or parsed.query.get("mode") == "memory":
+            return "sqlite_memory"
+        return "sqlite_file"
+    if backend == "postgresql":
+        return "postgresql"
+    return "default"
 
-engine = create_engine(
-    SQLALCHEMY_DATABASE_URL, connect_args={"check_same_thread": False}
-)
+def shared_memory_url(url: str) -> str:
+    """URL de SQLite em memória compartilhável entre o engine síncrono e o assíncrono
+
+    Cada conexão com ":memory:" teria o seu próprio banco; com cache
+    compartilhado todas as conexões do processo veem o mesmo.
+    """
+    parsed = make_url(url)
+    if parsed.database in (None, "", ":memory:"):
+        return f"{parsed.drivername}:///file:financial_manager?mode=memory&cache=shared&uri=true"
+    return url
+
+def async_database_url(url: str) -> str:
+    """URL com o driver assíncrono (aiosqlite/asyncpg) do mesmo banco"""
+    parsed = make_url(url)
+    drivers = {"sqlite": "sqlite+aiosqlite", "postgresql": "postgresql+asyncpg"}
+    drivername = drivers.get(parsed.get_backend_name(), parsed.drivername)
+    return parsed.set(drivername=drivername).render_as_string(hide_password=False)
+
+def engine_options(url: str, asynchronous: bool = False) -> dict:
+    """Argumentos do create_engine para o perfil da URL"""
+    profile = engine_profile(url)
+    if profile == "sqlite_memory":
+        return {"poolclass": StaticPool, "connect_args": {"check_same_thread": False}}
+
+    options = {
+        "poolclass": TimedAsyncQueuePool if asynchronous else TimedQueuePool,
+        "pool_size": settings.db_pool_size,
+        "max_overflow": settings.db_max_overflow,
+        "pool_timeout": settings.db_pool_timeout_seconds,
+        "pool_pre_ping": settings.db_pool_pre_ping,
+    }
+    if profile == "sqlite_file":
+        # timeout do driver = espera pelo lock de escrita (mesmo valor do busy_timeout)
+        options["connect_args"] = {
+            "check_same_thread": False,
+            "timeout": settings.sqlite_busy_timeout_ms / 1000,
+        }
+    else:
+        # Conexões de servidor podem ser derrubadas por proxies/firewalls ociosos
+        options["pool_recycle"] = settings.db_pool_recycle_seconds
+    if profile == "postgresql" and asynchronous:
+        # asyncpg recebe as configurações de sessão em server_settings
+        options["connect_args"] = {
+            "timeout": settings.db_connect_timeout_seconds,
+            "server_settings": {
+                "application_name": "financial-manager",
+                "statement_timeout": str(settings.db_statement_timeout_ms),
+                "timezone": "UTC",
+            },
+        }
+    elif profile == "postgresql":
+        options["connect_args"] = {
+            "connect_timeout": settings.db_connect_timeout_seconds,
+            "application_name": "financial-manager",
+            "options": f"-c statement_timeout={settings.db_statement_timeout_ms} -c timezone=UTC",
+        }
+    return options
+
+def sqlite_pragmas(profile: str) -> list:
+    """Pragmas aplicados em cada conexão SQLite nova"""
+    pragmas = [
+        f"PRAGMA synchronous={settings.sqlite_synchronous}",
+        f"PRAGMA cache_size=-{settings.sqlite_cache_size_kb}",  # negativo = KiB
+        f"PRAGMA busy_timeout={settings.sqlite_busy_timeout_ms}",
+    ]
+    if profile == "sqlite_file":
+        # WAL e mmap só fazem sentido com arquivo
+        pragmas.insert(0, f"PRAGMA journal_mode={settings.sqlite_journal_mode}")
+        pragmas.append(f"PRAGMA mmap_size={settings.sqlite_mmap_size_mb * 1024 * 1024}")
+    return pragmas
+
+def _apply_sqlite_pragmas(sync_engine: Engine, profile: str) -> None:
+    pragmas = sqlite_pragmas(profile)
+
+    @event.listens_for(sync_engine, "connect")
+    def apply_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        try:
+            for pragma in pragmas:
+                cursor.execute(pragma)
+        finally:
+            cursor.close()
+
+def create_app_engine(url: str = SQLALCHEMY_DATABASE_URL) -> Engine:
+    """Criar um engine com o perfil e os pragmas adequados à URL"""
+    profile = engine_profile(url)
+    if profile == "sqlite_memory":
+        url = shared_memory_url(url)
+    new_engine = create_engine(url, **engine_options(url))
+    if profile.startswith("sqlite"):
+        _apply_sqlite_pragmas(new_engine, profile)
+    return new_engine
+
+def create_async_app_engine(url: str = SQLALCHEMY_DATABASE_URL) -> AsyncEngine:
+    """Engine assíncrono (aiosqlite/asyncpg) com o mesmo perfil do síncrono"""
+    profile = engine_profile(url)
+    if profile == "sqlite_memory":
+        url = shared_memory_url(url)
+    new_engine = create_async_engine(async_database_url(url), **engine_options(url, asynchronous=True))
+    if profile.startswith("sqlite"):
+        _apply_sqlite_pragmas(new_engine.sync_engine, profile)
+    return new_engine
+
+def pool_stats(target: Engine = None) -> dict:
+    """Estado do pool e estatísticas de checkout/espera"""
+    target = target or engine
+    if isinstance(target, AsyncEngine):
+        target = target.sync_engine
+    pool = target.pool
+    stats = {"profile": engine_profile(str(target.url)), "pool": type(pool).__name__}
+    if isinstance(pool, QueuePool):
+        stats.update({
+            "size": pool.size(),
+            "checked_out": pool.checkedout(),
+            "overflow": pool.overflow(),
+        })
+    if isinstance(pool, _TimedPoolMixin):
+        stats.update(pool.stats.snapshot())
+    return stats
+
+engine = create_app_engine()
 
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
@@ -20,3 +238,12 @@ def get_db():
     finally:
         db.close()
 
+# Caminho assíncrono: as rotas de leitura mais usadas e a autenticação não
+# ocupam threads do threadpool enquanto esperam o banco
+async_engine = create_async_app_engine()
+
+AsyncSessionLocal = async_sessionmaker(async_engine, expire_on_commit=False, autoflush=False)
+
+async def get_async_db():
+    async with AsyncSessionLocal() as db:
+        yield db
@@ -0,0 +1,204 @@
+"""
+Logging estruturado e fora do caminho da requisição
+
+Os loggers da aplicação (logging.getLogger(__name__)) só enfileiram o
+registro: um QueueHandler na raiz põe os registros numa fila limitada e um
+QueueListener, em thread própria, formata (JSON ou texto) e escreve no
+stdout. A formatação, inclusive de tracebacks, e o I/O não acontecem na
+thread da requisição; com a fila cheia o registro é descartado e contado,
+em vez de travar a requisição.
+
+Na entrada da fila:
+- o id da requisição (app/middleware/request_id.py) é anexado a cada
+  registro;
+- avisos e erros (de WARNING até LOG_SAMPLE_MAX_LEVEL, ERROR por padrão)
+  são amostrados: cada mensagem passa no máximo LOG_SAMPLE_BURST vezes por
+  LOG_SAMPLE_INTERVAL_SECONDS, e o próximo registro que passar informa
+  quantos foram suprimidos. Uma avalanche de erros repetidos não vira uma
+  avalanche de escrita. INFO e DEBUG (inclusive o access log) não são
+  amostrados.
+
+Configuração:
+- LOG_LEVEL: nível da raiz (INFO);
+- LOG_LEVELS: níveis por módulo, ex.: "app.routers=DEBUG,sqlalchemy.engine=INFO";
+- LOG_FORMAT: json (padrão) ou text.
+"""
+import json
+import logging
+import queue
+import sys
+import threading
+import time
+from contextvars import ContextVar
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener
+from typing import Dict, Optional
+from app.config import settings
+
+TEXT_FORMAT = "%(asctime)s %(levelname)s %(name)s [%(request_id)s] %(message)s"
+# Loggers do uvicorn passam a usar a mesma fila e o mesmo formato
+UVICORN_LOGGERS = ("uvicorn", "uvicorn.error", "uvicorn.access")
+# Níveis padrão, sobrescritos por LOG_LEVELS: os pools de app/database.py
+# herdam o log de INFO do SQLAlchemy (checkout, dispose) e o httpx loga
+# cada requisição dos scripts de verificação
+DEFAULT_LEVELS = {"app.database": "WARNING", "httpx": "WARNING"}
+
+# Id da requisição atual (definido pelo RequestIdMiddleware)
+request_id_var: ContextVar[Optional[str]] = ContextVar("request_id", default=None)
+
+# Atributos padrão do LogRecord; o resto veio de `extra=` e vai para o JSON
+_RESERVED = set(vars(logging.LogRecord("", 0, "", 0, "", None, None))) | {"message", "asctime", "request_id", "suppressed"}
+
+class RequestIdFilter(logging.Filter):
+    """Anexar o id da requisição (lido na thread que registrou)"""
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if getattr(record, "request_id", None) is None:
+            record.request_id = request_id_var.get()
+        return True
+
+class SamplingFilter(logging.Filter):
+    """No máximo `burst` registros por mensagem a cada `interval` segundos (de WARNING a `max_level`)"""
+
+    def __init__(self, burst: int, interval: float, max_level: int):
+        super().__init__()
+        self.burst = burst
+        self.interval = interval
+        self.max_level = max_level
+        self.suppressed_total = 0
+        self._windows: Dict[tuple, list] = {}
+        self._lock = threading.Lock()
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if not logging.WARNING <= record.levelno <= self.max_level or self.burst <= 0:
+            return True
+        key = (record.name, record.msg)
+        now = time.monotonic()
+        with self._lock:
+            window = self._windows.get(key)
+            if window is None or now - window[0] >= self.interval:
+                suppressed = window[2] if window else 0
+                window = self._windows[key] = [now, 0, 0]
+                if suppressed:
+                    record.suppressed = suppressed
+                if len(self._windows) > 10_000:
+                    self._prune(now)
+            if window[1] >= self.burst:
+                window[2] += 1
+                self.suppressed_total += 1
+                return False
+            window[1] += 1
+            return True
+
+    def _prune(self, now: float) -> None:
+        for key in [key for key, window in self._windows.items() if now - window[0] >= self.interval]:
+            del self._windows[key]
+
+class DroppingQueueHandler(QueueHandler):
+    """QueueHandler que descarta (e conta) quando a fila está cheia"""
+
+    def __init__(self, log_queue: queue.Queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # Só resolve a mensagem; traceback e JSON ficam para a thread do listener
+        record.message = record.getMessage()
+        record.msg, record.args = record.message, None
+        return record
+
+class JsonFormatter(logging.Formatter):
+    """Uma linha JSON por registro"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "ts": datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        request_id = getattr(record, "request_id", None)
+        if request_id:
+            entry["request_id"] = request_id
+        suppressed = getattr(record, "suppressed", None)
+        if suppressed:
+            entry["suppressed"] = suppressed
+        for key, value in record.__dict__.items():
+            if key not in _RESERVED and not key.startswith("_"):
+                entry[key] = value
+        if record.exc_info:
+            entry["exc"] = self.formatException(record.exc_info)
+        elif record.exc_text:
+            entry["exc"] = record.exc_text
+        return json.dumps(entry, default=str, ensure_ascii=False)
+
+class TextFormatter(logging.Formatter):
+    def format(self, record: logging.LogRecord) -> str:
+        record.request_id = getattr(record, "request_id", None) or "-"
+        text = super().format(record)
+        suppressed = getattr(record, "suppressed", None)
+        return f"{text} (+{suppressed} suprimidos)" if suppressed else text
+
+def parse_levels(spec: str) -> Dict[str, str]:
+    """Níveis por módulo de LOG_LEVELS (ex.: app.routers=DEBUG,sqlalchemy.engine=INFO)"""
+    levels = {}
+    for item in filter(None, (part.strip() for part in spec.split(","))):
+        name, _, level = item.partition("=")
+        if not level:
+            raise ValueError(f"LOG_LEVELS inválido: '{item}' (use modulo=NIVEL)")
+        levels[name.strip()] = level.strip().upper()
+    return levels
+
+_listener: Optional[QueueListener] = None
+_queue_handler: Optional[DroppingQueueHandler] = None
+_sampler: Optional[SamplingFilter] = None
+
+def setup_logging() -> None:
+    """Configurar a raiz com a fila e iniciar o listener (idempotente)"""
+    global _listener, _queue_handler, _sampler
+    if _listener is not None:
+        return
+
+    output = logging.StreamHandler(sys.stdout)
+    output.setFormatter(TextFormatter(TEXT_FORMAT) if settings.log_format.lower() == "text" else JsonFormatter())
+
+    _sampler = SamplingFilter(
+        settings.log_sample_burst,
+        settings.log_sample_interval_seconds,
+        logging.getLevelName(settings.log_sample_max_level.upper())
+    )
+    _queue_handler = DroppingQueueHandler(queue.Queue(maxsize=settings.log_queue_size))
+    _queue_handler.addFilter(RequestIdFilter())
+    _queue_handler.addFilter(_sampler)
+
+    root = logging.getLogger()
+    root.handlers = [_queue_handler]
+    root.setLevel(settings.log_level.upper())
+    for name in UVICORN_LOGGERS:
+        logging.getLogger(name).handlers = []
+        logging.getLogger(name).propagate = True
+    for name, level in {**DEFAULT_LEVELS, **parse_levels(settings.log_levels)}.items():
+        logging.getLogger(name).setLevel(level)
+
+    _listener = QueueListener(_queue_handler.queue, output, respect_handler_level=True)
+    _listener.start()
+
+def shutdown_logging() -> None:
+    """Esvaziar a fila e parar o listener"""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
+
+def logging_stats() -> dict:
+    return {
+        "queued": _queue_handler.queue.qsize() if _queue_handler else 0,
+        "dropped": _queue_handler.dropped if _queue_handler else 0,
+        "suppressed": _sampler.suppressed_total if _sampler else 0,
+    }
@@ -1,43 +1,52 @@
 from fastapi import FastAPI, Request, status
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, PlainTextResponse
 from fastapi.exceptions import RequestValidationError
 from datetime import date, datetime
+import asyncio
+import hmac
 import json
-from app.database import engine, Base
-from app.routers import transactions, reports, dashboard, upload, auth, users
+import logging
+import os
+from app.logging_config import logging_stats, setup_logging, shutdown_logging
+from app.database import async_engine, engine, Base, pool_stats
+from app.routers import transactions, reports, dashboard, upload, auth, users, categories
+from app.middleware.metrics import MetricsMiddleware, instrument_engine
+from app.middleware.profiler import (
+    PROFILE_HEADER, SERVER_TIMING_HEADER, QueryProfilerMiddleware, profile_engine, profiler_enabled
+)
+from app.middleware.rate_limit import limiter, rate_limit_stats
+from app.middleware.request_id import REQUEST_ID_HEADER, RequestIdMiddleware
 from app.middleware.security import SecurityHeadersMiddleware
 from app.config import settings
+from app.utils.pagination import NEXT_CURSOR_HEADER
+from app.utils.periodic import run_periodically
+from app.services.report_jobs import cleanup_report_artifacts, shutdown_report_workers
+from app.services.metrics import registry, render_stats
+from app.services.password_hashing import hashing_stats, shutdown_password_hashing
+from app.services.response_cache import dashboard_cache
+from app.services.token_store import prune_expired_refresh_tokens
+from app.services.user_cache import user_cache
 
-# Rate limiting opcional
-try:
-    from slowapi import Limiter, _rate_limit_exceeded_handler
-    from slowapi.util import get_remote_address
-    from slowapi.errors import RateLimitExceeded
-    RATE_LIMITING_AVAILABLE = True
-except ImportError:
-    RATE_LIMITING_AVAILABLE = False
-    print("⚠️  slowapi não instalado. Rate limiting desabilitado.")
+# Logs em JSON, escritos por uma thread própria (app/logging_config.py)
+setup_logging()
+logger = logging.getLogger(__name__)
 
 # Criar tabelas do banco de dados
 Base.metadata.create_all(bind=engine)
 
-# Rate Limiter (opcional)
-if RATE_LIMITING_AVAILABLE:
-    limiter = Limiter(key_func=get_remote_address)
-    app = FastAPI(
-        title="Financial Manager API",
-        description="Sistema de gestão financeira",
-        version="1.0.0"
-    )
+app = FastAPI(
+    title="Financial Manager API",
+    description="Sistema de gestão financeira",
+    version="1.0.0"
+)
+
+# Limiter único de todos os routers (app/middleware/rate_limit.py)
+if limiter is not None:
+    from slowapi import _rate_limit_exceeded_handler
+    from slowapi.errors import RateLimitExceeded
     app.state.limiter = limiter
     app.add_exception_handler(RateLimitExceeded, _rate_limit_exceeded_handler)
-else:
-    app = FastAPI(
-        title="Financial Manager API",
-        description="Sistema de gestão financeira",
-        version="1.0.0"
-    )
 
 # Middleware de segurança
 app.add_middleware(SecurityHeadersMiddleware)
@@ -59,39 +68,37 @@ def serialize_for_json(obj):
 @app.exception_handler(RequestValidationError)
 async def validation_exception_handler(request: Request, exc: RequestValidationError):
     errors = exc.errors()
-    print(f"ERRO DE VALIDAÇÃO: {errors}")
-    print(f"Body recebido: {exc.body}")
-    
-    # Serializar erros para garantir que objetos date/datetime sejam convertidos
-    serialized_errors = serialize_for_json(errors)
     
-    # Serializar body também, caso contenha objetos date/datetime
-    try:
-        if exc.body:
-            if isinstance(exc.body, (dict, list)):
-                serialized_body = serialize_for_json(exc.body)
-            else:
-                serialized_body = str(exc.body)
-        else:
-            serialized_body = None
-    except Exception:
-        serialized_body = str(exc.body) if exc.body else None
+    # Nem o body nem os valores recebidos voltam na resposta ou vão para o log:
+    # podem ter senhas e dados financeiros ("input" ecoa o valor rejeitado)
+    serialized_errors = serialize_for_json([
+        {key: value for key, value in error.items() if key != "input"} for error in errors
+    ])
+    logger.warning("Erro de validação", extra={
+        "method": request.method,
+        "path": request.url.path,
+        "errors": [{"loc": error.get("loc"), "type": error.get("type")} for error in errors]
+    })
     
     return JSONResponse(
         status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
-        content={"detail": serialized_errors, "body": serialized_body},
+        content={"detail": serialized_errors},
     )
 
 # Handler de erros gerais
 @app.exception_handler(Exception)
 async def general_exception_handler(request: Request, exc: Exception):
-    import traceback
-    error_trace = traceback.format_exc()
-    print(f"ERRO GERAL: {str(exc)}")
-    print(f"Traceback:\n{error_trace}")
+    # Detalhes e traceback só no log; o cliente recebe o id para correlacionar
+    request_id = getattr(request.state, "request_id", None)
+    logger.error(
+        "Erro não tratado",
+        exc_info=(type(exc), exc, exc.__traceback__),
+        extra={"method": request.method, "path": request.url.path, "request_id": request_id}
+    )
     return JSONResponse(
         status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-        content={"detail": f"Erro interno: {str(exc)}", "traceback": error_trace},
+        content={"detail": "Erro interno", "request_id": request_id},
+        headers={REQUEST_ID_HEADER: request_id} if request_id else None,
     )
 
 # CORS para permitir requisições do frontend
@@ -103,8 +110,24 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=[NEXT_CURSOR_HEADER, REQUEST_ID_HEADER, PROFILE_HEADER, SERVER_TIMING_HEADER],
 )
 
+# Profiler de consultas (QUERY_PROFILER=header ou always)
+if profiler_enabled():
+    app.add_middleware(QueryProfilerMiddleware)
+    profile_engine(engine)
+    profile_engine(async_engine)
+
+# Métricas (/api/metrics): adicionado por último para medir também CORS e headers
+if settings.metrics_enabled:
+    app.add_middleware(MetricsMiddleware)
+    instrument_engine(engine, "sync")
+    instrument_engine(async_engine, "async")
+
+# Id de correlação dos logs: o mais externo, para valer em todos os outros
+app.add_middleware(RequestIdMiddleware)
+
 # Routers
 app.include_router(auth.router, prefix="/api/auth", tags=["auth"])
 app.include_router(users.router, prefix="/api/users", tags=["users"])
@@ -112,6 +135,31 @@ app.include_router(transactions.router, prefix="/api/transactions", tags=["trans
 app.include_router(reports.router, prefix="/api/reports", tags=["reports"])
 app.include_router(dashboard.router, prefix="/api/dashboard", tags=["dashboard"])
 app.include_router(upload.router, prefix="/api/upload", tags=["upload"])
+app.include_router(categories.router, prefix="/api/categories", tags=["categories"])
+
+# Limpeza periódica dos relatórios em segundo plano e dos refresh tokens
+_background_tasks = []
+
+@app.on_event("startup")
+async def start_background_tasks():
+    os.makedirs(settings.report_artifacts_dir, exist_ok=True)
+    _background_tasks.append(asyncio.create_task(
+        run_periodically(settings.report_cleanup_interval_seconds, cleanup_report_artifacts)
+    ))
+    _background_tasks.append(asyncio.create_task(
+        run_periodically(settings.refresh_token_prune_interval_seconds, prune_expired_refresh_tokens)
+    ))
+
+@app.on_event("shutdown")
+async def stop_background_tasks():
+    for task in _background_tasks:
+        task.cancel()
+    _background_tasks.clear()
+    shutdown_report_workers()
+    shutdown_password_hashing()
+    await dashboard_cache.close()
+    await async_engine.dispose()
+    shutdown_logging()
 
 @app.get("/")
 async def root():
@@ -119,4 +167,30 @@ async def root():
 
 @app.get("/api/health")
 async def health_check():
-    return {"status": "healthy"}
+    return {
+        "status": "healthy",
+        "database": pool_stats(),
+        "database_async": pool_stats(async_engine),
+        "password_hashing": hashing_stats(),
+        "dashboard_cache": dashboard_cache.stats(),
+        "rate_limit": rate_limit_stats(),
+        "logging": logging_stats()
+    }
+
+@app.get("/api/metrics", response_class=PlainTextResponse, include_in_schema=False)
+async def metrics(request: Request):
+    """Métricas no formato de texto do Prometheus"""
+    if not settings.metrics_enabled:
+        return PlainTextResponse("", status_code=404)
+    if settings.metrics_token and not hmac.compare_digest(
+        request.headers.get("Authorization", "").encode(), f"Bearer {settings.metrics_token}".encode()
+    ):
+        return PlainTextResponse("", status_code=401, headers={"WWW-Authenticate": "Bearer"})
+    lines = registry.render()
+    lines += render_stats("db_pool", [({"engine": "sync"}, pool_stats()), ({"engine": "async"}, pool_stats(async_engine))])
+    lines += render_stats("password_hashing", [({}, hashing_stats())])
+    lines += render_stats("user_cache", [({}, user_cache.stats())])
+    lines += render_stats("dashboard_cache", [({}, dashboard_cache.stats())])
+    lines += render_stats("rate_limit", [({}, rate_limit_stats())])
+    lines += render_stats("logging", [({}, logging_stats())])
+    return PlainTextResponse("\n".join(lines) + "\n", media_type="text/plain; version=0.0.4")
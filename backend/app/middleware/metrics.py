@@ -0,0 +1,121 @@
+"""
+Instrumentação das requisições HTTP e das consultas SQL
+
+MetricsMiddleware é ASGI puro (como o de segurança): mede a latência por
+rota, conta os status e mantém o número de requisições em andamento. A
+rota é o template registrado (/api/transactions/{transaction_id}), não o
+caminho, para não criar uma série por id; caminhos sem rota viram
+"unmatched".
+
+instrument_engine registra eventos do SQLAlchemy que contam as consultas e
+o tempo gasto no banco. O total de cada requisição é guardado numa
+ContextVar, que o threadpool e as sessões assíncronas herdam, e vira os
+histogramas http_request_db_queries e http_request_db_duration_seconds.
+"""
+import time
+from contextvars import ContextVar
+from typing import Optional
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncEngine
+from starlette.routing import Mount
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+from app.services.metrics import registry
+
+UNMATCHED_ROUTE = "unmatched"
+QUERY_COUNT_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100)
+
+REQUESTS = registry.counter(
+    "http_requests_total", "Requisições HTTP por método, rota e status", ("method", "route", "status")
+)
+REQUEST_DURATION = registry.histogram(
+    "http_request_duration_seconds", "Latência das requisições HTTP", ("method", "route")
+)
+IN_PROGRESS = registry.gauge(
+    "http_requests_in_progress", "Requisições HTTP em andamento", ("method",)
+)
+REQUEST_DB_QUERIES = registry.histogram(
+    "http_request_db_queries", "Consultas SQL por requisição", ("method", "route"), buckets=QUERY_COUNT_BUCKETS
+)
+REQUEST_DB_DURATION = registry.histogram(
+    "http_request_db_duration_seconds", "Tempo no banco por requisição", ("method", "route")
+)
+DB_QUERIES = registry.counter(
+    "db_queries_total", "Consultas SQL executadas (inclusive fora de requisições)", ("engine",)
+)
+DB_QUERY_DURATION = registry.histogram(
+    "db_query_duration_seconds", "Duração de cada consulta SQL", ("engine",)
+)
+
+# [consultas, segundos] da requisição atual
+_request_db_usage: ContextVar[Optional[list]] = ContextVar("request_db_usage", default=None)
+
+def _route_template(scope: Scope) -> str:
+    """Template da rota que atendeu (o roteador grava o endpoint no scope)"""
+    endpoint = scope.get("endpoint")
+    app = scope.get("app")
+    if endpoint is None or app is None:
+        return UNMATCHED_ROUTE
+    templates = getattr(app.state, "route_templates", None)
+    if templates is None or endpoint not in templates:
+        templates = app.state.route_templates = {
+            getattr(route, "endpoint", None) or route.app: route.path
+            for route in app.routes
+            if not isinstance(route, Mount)
+        }
+    return templates.get(endpoint, UNMATCHED_ROUTE)
+
+class MetricsMiddleware:
+    """Latência, status e requisições em andamento por rota"""
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        method = scope["method"]
+        status_code = 500
+        usage = [0, 0.0]
+        token = _request_db_usage.set(usage)
+
+        async def send_with_status(message: Message) -> None:
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        IN_PROGRESS.inc((method,))
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            elapsed = time.perf_counter() - started
+            IN_PROGRESS.dec((method,))
+            _request_db_usage.reset(token)
+            labels = (method, _route_template(scope))
+            REQUESTS.inc((*labels, str(status_code)))
+            REQUEST_DURATION.observe(labels, elapsed)
+            REQUEST_DB_QUERIES.observe(labels, usage[0])
+            REQUEST_DB_DURATION.observe(labels, usage[1])
+
+def instrument_engine(target, name: str) -> None:
+    """Contar consultas e medir o tempo no banco do engine (síncrono ou assíncrono)"""
+    if isinstance(target, AsyncEngine):
+        target = target.sync_engine
+    labels = (name,)
+
+    @event.listens_for(target, "before_cursor_execute")
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        context._metrics_started = time.perf_counter()
+
+    @event.listens_for(target, "after_cursor_execute")
+    def after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        elapsed = time.perf_counter() - context._metrics_started
+        DB_QUERIES.inc(labels)
+        DB_QUERY_DURATION.observe(labels, elapsed)
+        usage = _request_db_usage.get()
+        if usage is not None:
+            usage[0] += 1
+            usage[1] += elapsed
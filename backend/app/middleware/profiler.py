@@ -0,0 +1,103 @@
+"""
+Profiler de consultas por requisição (opcional)
+
+Só para desenvolvimento: a resposta expõe o SQL executado e os tempos.
+Com QUERY_PROFILER=header, são perfiladas as requisições cujo header
+X-Query-Profile traz o segredo de QUERY_PROFILER_TOKEN (obrigatório nesse
+modo); com QUERY_PROFILER=always, todas. A resposta ganha:
+- Server-Timing: tempo no banco, número de consultas e tempo total, que
+  o DevTools do navegador mostra na aba de rede;
+- X-Query-Profile: resumo em JSON (consultas, statements repetidos e os
+  mais lentos).
+
+Statements repetidos QUERY_PROFILER_REPEAT_THRESHOLD vezes ou mais geram
+um aviso de possível N+1. O perfil vive numa ContextVar, herdada pelo
+threadpool e pelas sessões assíncronas; fora do perfil os eventos custam
+só a leitura dela. Com QUERY_PROFILER=off (padrão) nada é registrado.
+"""
+import hmac
+import logging
+import time
+from contextvars import ContextVar
+from typing import Optional
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncEngine
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+from app.config import settings
+from app.services.query_profiler import QueryProfile
+
+PROFILE_HEADER = "X-Query-Profile"
+SERVER_TIMING_HEADER = "Server-Timing"
+PROFILER_MODES = ("off", "header", "always")
+
+logger = logging.getLogger(__name__)
+
+_request_profile: ContextVar[Optional[QueryProfile]] = ContextVar("request_profile", default=None)
+
+def profiler_enabled() -> bool:
+    mode = settings.query_profiler.lower()
+    if mode not in PROFILER_MODES:
+        raise ValueError(f"QUERY_PROFILER inválido: {settings.query_profiler} (use {', '.join(PROFILER_MODES)})")
+    if mode == "header" and not settings.query_profiler_token:
+        raise ValueError("QUERY_PROFILER=header exige QUERY_PROFILER_TOKEN")
+    return mode != "off"
+
+class QueryProfilerMiddleware:
+    """Perfilar as consultas da requisição e devolver o resumo nos headers"""
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+        self.always = settings.query_profiler.lower() == "always"
+        self.header = PROFILE_HEADER.lower().encode("latin-1")
+        self.token = settings.query_profiler_token.encode("latin-1")
+
+    def requested(self, scope: Scope) -> bool:
+        """Header X-Query-Profile com o segredo configurado"""
+        return any(
+            name == self.header and hmac.compare_digest(value, self.token)
+            for name, value in scope["headers"]
+        )
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or not (self.always or self.requested(scope)):
+            await self.app(scope, receive, send)
+            return
+
+        profile = QueryProfile()
+        token = _request_profile.set(profile)
+
+        async def send_with_profile(message: Message) -> None:
+            if message["type"] == "http.response.start":
+                message["headers"] = list(message.get("headers", ())) + [
+                    (b"server-timing", profile.server_timing().encode("latin-1")),
+                    (self.header, profile.summary_json().encode("latin-1")),
+                ]
+                repeated = profile.repeated()
+                if repeated:
+                    worst = repeated[0]
+                    logger.warning("Possível N+1", extra={
+                        "method": scope["method"], "path": scope["path"], **worst
+                    })
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_profile)
+        finally:
+            _request_profile.reset(token)
+
+def profile_engine(target) -> None:
+    """Registrar as consultas do engine (síncrono ou assíncrono) no perfil da requisição"""
+    if isinstance(target, AsyncEngine):
+        target = target.sync_engine
+
+    @event.listens_for(target, "before_cursor_execute")
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        if _request_profile.get() is not None:
+            context._profile_started = time.perf_counter()
+
+    @event.listens_for(target, "after_cursor_execute")
+    def after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        profile = _request_profile.get()
+        started = getattr(context, "_profile_started", None)
+        if profile is not None and started is not None:
+            profile.record(statement, time.perf_counter() - started)
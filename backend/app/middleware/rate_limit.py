@@ -1,15 +1,200 @@
 """
-Rate Limiting Middleware
+Rate limiting compartilhado por todos os routers
+
+Um único Limiter (slowapi) para a aplicação inteira, com o armazenamento
+configurado em RATE_LIMIT_STORAGE_URI:
+- memory:// (padrão): contadores em processo, expirados por um timer do
+  pacote `limits` (chaves de clientes que somem não ficam para sempre);
+- redis://host:porta/db: servidor compatível com Redis, compartilhado entre
+  réplicas e workers, então o limite vale para o conjunto e não N vezes.
+  Requer o pacote `redis`; se o servidor cair, os limites continuam valendo
+  em memória até ele voltar.
+
+A estratégia (RATE_LIMIT_STRATEGY) é sliding-window-counter por padrão;
+moving-window e fixed-window também são aceitas.
+
+A chave é o id do usuário do access token (user:<id>) e, sem token válido,
+o IP do cliente (ip:<endereço>), então usuários atrás do mesmo NAT não
+dividem o limite e trocar de IP não renova o limite de um usuário.
 """
-from fastapi import Request, HTTPException, status
-from slowapi import Limiter, _rate_limit_exceeded_handler
-from slowapi.util import get_remote_address
-from slowapi.errors import RateLimitExceeded
+import asyncio
+import functools
+import logging
+import threading
+import time
+from collections import deque
+from typing import Optional
+from fastapi import Request
+from jose import JWTError, jwt
+from app.auth import ALGORITHM, SECRET_KEY
 from app.config import settings
 
-limiter = Limiter(key_func=get_remote_address)
+logger = logging.getLogger(__name__)
+
+# Rate limiting opcional
+try:
+    from slowapi import Limiter
+    from slowapi.errors import RateLimitExceeded
+    from slowapi.util import get_remote_address
+    from limits.errors import ConfigurationError
+    RATE_LIMITING_AVAILABLE = True
+except ImportError:
+    RATE_LIMITING_AVAILABLE = False
+    Limiter = object
+    logger.warning("slowapi não instalado. Rate limiting desabilitado.")
+
+MEMORY_STORAGE_URI = "memory://"
+LATENCY_SAMPLES = 1024
+
+def rate_limit_key(request: Request) -> str:
+    """user:<id> do access token ou, sem token válido, ip:<endereço>"""
+    authorization = request.headers.get("authorization", "")
+    scheme, _, token = authorization.partition(" ")
+    if scheme.lower() == "bearer" and token:
+        try:
+            # Assinatura verificada: um token forjado não escolhe a chave de outro usuário
+            payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+            if payload.get("type") == "access" and payload.get("sub"):
+                return f"user:{payload['sub']}"
+        except JWTError:
+            pass
+    return f"ip:{get_remote_address(request)}"
+
+class MeteredLimiter(Limiter):
+    """Limiter do slowapi com contadores e latência das verificações
+
+    Só usa a API pública do slowapi: `limit` envolve o decorator dele por
+    fora (início da verificação e RateLimitExceeded) e a rota por dentro
+    (verificação aprovada), sem sobrescrever métodos internos.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.strategy = kwargs.get("strategy")
+        self._stats_lock = threading.Lock()
+        self._latencies = deque(maxlen=LATENCY_SAMPLES)
+        self._checks = 0
+        self._rejected = 0
+        self._max_latency = 0.0
+
+    def limit(self, *args, **kwargs):
+        slowapi_decorator = super().limit(*args, **kwargs)
+
+        def decorator(func):
+            if asyncio.iscoroutinefunction(func):
+                @functools.wraps(func)
+                async def checked(*args, **kwargs):
+                    self._record(kwargs.get("request"), rejected=False)
+                    return await func(*args, **kwargs)
+
+                limited = slowapi_decorator(checked)
+
+                @functools.wraps(limited)
+                async def metered(*args, **kwargs):
+                    self._start(kwargs.get("request"))
+                    try:
+                        return await limited(*args, **kwargs)
+                    except RateLimitExceeded:
+                        self._record(kwargs.get("request"), rejected=True)
+                        raise
+                return metered
+
+            @functools.wraps(func)
+            def checked_sync(*args, **kwargs):
+                self._record(kwargs.get("request"), rejected=False)
+                return func(*args, **kwargs)
+
+            limited_sync = slowapi_decorator(checked_sync)
+
+            @functools.wraps(limited_sync)
+            def metered_sync(*args, **kwargs):
+                self._start(kwargs.get("request"))
+                try:
+                    return limited_sync(*args, **kwargs)
+                except RateLimitExceeded:
+                    self._record(kwargs.get("request"), rejected=True)
+                    raise
+            return metered_sync
+
+        return decorator
+
+    def _start(self, request) -> None:
+        if self.enabled and isinstance(request, Request):
+            request.state.rate_limit_started = time.perf_counter()
+
+    def _record(self, request, rejected: bool) -> None:
+        # Rotas síncronas são verificadas no threadpool, daí o lock nos contadores
+        started = getattr(request.state, "rate_limit_started", None) if isinstance(request, Request) else None
+        if started is None:
+            return
+        request.state.rate_limit_started = None
+        elapsed = time.perf_counter() - started
+        with self._stats_lock:
+            self._checks += 1
+            self._rejected += rejected
+            self._max_latency = max(self._max_latency, elapsed)
+            self._latencies.append(elapsed)
+
+    def _storage_usage(self) -> dict:
+        """Chaves e entradas guardadas (só no armazenamento em memória)"""
+        storage = self.limiter.storage
+        counters = getattr(storage, "storage", None)
+        events = getattr(storage, "events", None)
+        if counters is None or events is None:
+            return {"keys": None, "entries": None}
+        counters, events = dict(counters), dict(events)
+        return {
+            "keys": len(counters) + len(events),
+            "entries": sum(counters.values()) + sum(len(window) for window in events.values()),
+        }
+
+    def stats(self) -> dict:
+        with self._stats_lock:
+            latencies = sorted(self._latencies)
+            checks, rejected, max_latency = self._checks, self._rejected, self._max_latency
+        p95 = latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))] if latencies else 0.0
+        return {
+            "enabled": self.enabled,
+            "storage": type(self.limiter.storage).__name__,
+            "strategy": self.strategy,
+            "checks": checks,
+            "rejected": rejected,
+            "latency_avg_ms": round(sum(latencies) / len(latencies) * 1000, 3) if latencies else 0.0,
+            "latency_p95_ms": round(p95 * 1000, 3),
+            "latency_max_ms": round(max_latency * 1000, 3),
+            **self._storage_usage(),
+        }
+
+def create_limiter(storage_uri: str = None, strategy: str = None) -> Optional["MeteredLimiter"]:
+    """Limiter configurado em RATE_LIMIT_STORAGE_URI/RATE_LIMIT_STRATEGY (None sem slowapi)"""
+    if not RATE_LIMITING_AVAILABLE:
+        return None
+    storage_uri = storage_uri or settings.rate_limit_storage_uri
+    strategy = strategy or settings.rate_limit_strategy
+    options = dict(
+        key_func=rate_limit_key,
+        strategy=strategy,
+        enabled=settings.rate_limit_enabled,
+        # Falha no armazenamento não derruba a requisição
+        swallow_errors=True,
+    )
+    if storage_uri.startswith(MEMORY_STORAGE_URI):
+        return MeteredLimiter(storage_uri=storage_uri, **options)
+    try:
+        return MeteredLimiter(storage_uri=storage_uri, in_memory_fallback_enabled=True, **options)
+    except ConfigurationError as e:
+        logger.warning("Armazenamento de rate limit indisponível (%s). Usando memória.", e)
+        return MeteredLimiter(storage_uri=MEMORY_STORAGE_URI, **options)
+
+limiter = create_limiter()
 
-def get_rate_limiter():
-    """Obter instância do rate limiter"""
-    return limiter
+def rate_limit(limit: str):
+    """Decorator de limite por rota; sem slowapi a rota fica sem limite"""
+    if limiter is not None:
+        return limiter.limit(limit)
+    return lambda f: f
 
+def rate_limit_stats() -> dict:
+    if limiter is None:
+        return {"enabled": False}
+    return limiter.stats()
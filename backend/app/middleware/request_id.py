@@ -0,0 +1,52 @@
+"""
+Id de correlação das requisições
+
+Usa o X-Request-ID recebido (do proxy ou do frontend) quando é válido ou
+gera um novo, guarda na ContextVar lida pelo logging e devolve no header
+da resposta, para cruzar uma resposta de erro com as linhas do log.
+"""
+import re
+import uuid
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+from app.logging_config import request_id_var
+
+REQUEST_ID_HEADER = "X-Request-ID"
+# Ids de fora só com caracteres seguros e tamanho limitado (vão para o log)
+_VALID_REQUEST_ID = re.compile(r"^[A-Za-z0-9._:-]{1,128}$")
+
+class RequestIdMiddleware:
+    """Definir o id da requisição e devolvê-lo no X-Request-ID"""
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+        self.header = REQUEST_ID_HEADER.lower().encode("latin-1")
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        request_id = None
+        for name, value in scope["headers"]:
+            if name == self.header:
+                candidate = value.decode("latin-1")
+                if _VALID_REQUEST_ID.match(candidate):
+                    request_id = candidate
+                break
+        request_id = request_id or uuid.uuid4().hex
+        raw_id = request_id.encode("latin-1")
+        token = request_id_var.set(request_id)
+        # Também em request.state: o handler de erro 500 roda fora deste middleware
+        scope.setdefault("state", {})["request_id"] = request_id
+
+        async def send_with_request_id(message: Message) -> None:
+            if message["type"] == "http.response.start":
+                message["headers"] = [
+                    header for header in message.get("headers", ()) if header[0] != self.header
+                ] + [(self.header, raw_id)]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_request_id)
+        finally:
+            request_id_var.reset(token)
@@ -1,23 +1,39 @@
 """
 Middleware de segurança
+
+Middleware ASGI puro: os headers são codificados uma vez na criação e
+acrescentados à mensagem http.response.start, sem a task extra e o stream
+em memória do BaseHTTPMiddleware, então respostas em streaming (relatórios)
+continuam saindo em pedaços.
 """
-from starlette.middleware.base import BaseHTTPMiddleware
-from starlette.requests import Request
-from starlette.responses import Response
+from typing import Iterable, Optional, Tuple
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+from app.config import settings
+
+class SecurityHeadersMiddleware:
+    """Adicionar headers de segurança (configurados em Settings.security_headers)"""
+
+    def __init__(self, app: ASGIApp, headers: Optional[Iterable[Tuple[str, str]]] = None):
+        self.app = app
+        headers = settings.security_headers if headers is None else headers
+        self.raw_headers = [
+            (name.lower().encode("latin-1"), value.encode("latin-1"))
+            for name, value in headers
+        ]
+        self.names = {name for name, _ in self.raw_headers}
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or not self.raw_headers:
+            await self.app(scope, receive, send)
+            return
+
+        async def send_with_headers(message: Message) -> None:
+            if message["type"] == "http.response.start":
+                # Os valores configurados substituem os que a rota tenha definido
+                message["headers"] = [
+                    header for header in message.get("headers", ())
+                    if header[0].lower() not in self.names
+                ] + self.raw_headers
+            await send(message)
 
-class SecurityHeadersMiddleware(BaseHTTPMiddleware):
-    """Adicionar headers de segurança"""
-    
-    async def dispatch(self, request: Request, call_next):
-        response = await call_next(request)
-        
-        # Headers de segurança
-        response.headers["X-Content-Type-Options"] = "nosniff"
-        response.headers["X-Frame-Options"] = "DENY"
-        response.headers["X-XSS-Protection"] = "1; mode=block"
-        response.headers["Strict-Transport-Security"] = "max-age=31536000; includeSubDomains"
-        response.headers["Content-Security-Policy"] = "default-src 'self'"
-        response.headers["Referrer-Policy"] = "strict-origin-when-cross-origin"
-        response.headers["Permissions-Policy"] = "geolocation=(), microphone=(), camera=()"
-        
-        return response
+        await self.app(scope, receive, send_with_headers)
@@ -1,8 +1,11 @@
-from sqlalchemy import Column, Integer, String, Float, Date, DateTime, Boolean, Enum as SQLEnum
+from sqlalchemy import Column, Integer, String, Numeric, Date, DateTime, Boolean, PrimaryKeyConstraint, Index, Enum as SQLEnum
 from sqlalchemy.sql import func
 from app.database import Base
 import enum
 
+# Valores monetários: NUMERIC exato no banco (centavos), float no Python
+Money = Numeric(14, 2, asdecimal=False)
+
 class TransactionType(str, enum.Enum):
     EXPENSE = "expense"  # Saída
     INCOME = "income"    # Sangria/Entrada
@@ -33,16 +36,95 @@ class Transaction(Base):
     type = Column(String(20), nullable=False)  # expense, income
     subtype = Column(String(30), nullable=True)  # fixed, sporadic, investment, received
     description = Column(String, nullable=False)  # Destino/Origem
-    amount = Column(Float, nullable=False)
+    amount = Column(Money, nullable=False)
     date = Column(Date, nullable=False)
     category = Column(String, default="Other")
     notes = Column(String, nullable=True)  # OBS
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     updated_at = Column(DateTime(timezone=True), onupdate=func.now())
+    
+    # Índices compostos das consultas por usuário (criados em bancos existentes por migrate_add_indexes.py)
+    __table_args__ = (
+        Index("ix_transactions_user_date", "user_id", "date"),
+        Index("ix_transactions_user_type_date", "user_id", "type", "date"),
+        Index("ix_transactions_user_category_type", "user_id", "category", "type"),
+    )
 
     def __repr__(self):
         return f"<Transaction(id={self.id}, type={self.type}, description='{self.description}', amount={self.amount})>"
 
+class MonthlyRollup(Base):
+    """Totais mensais materializados por usuário, tipo, subtipo e categoria"""
+    __tablename__ = "monthly_rollups"
+    
+    user_id = Column(Integer, nullable=False)
+    year_month = Column(String(7), nullable=False)  # YYYY-MM
+    type = Column(String(20), nullable=False)
+    subtype = Column(String(30), nullable=False, default="")  # "" quando a transação não tem subtipo
+    category = Column(String, nullable=False, default="Other")
+    total = Column(Money, nullable=False, default=0.0)
+    count = Column(Integer, nullable=False, default=0)
+    
+    __table_args__ = (
+        PrimaryKeyConstraint("user_id", "year_month", "type", "subtype", "category"),
+    )
+    
+    def __repr__(self):
+        return f"<MonthlyRollup(user_id={self.user_id}, year_month='{self.year_month}', type={self.type}, total={self.total}, count={self.count})>"
+
+class ReportJob(Base):
+    """Relatório gerado em segundo plano e o arquivo resultante"""
+    __tablename__ = "report_jobs"
+    
+    id = Column(String(32), primary_key=True)  # uuid4 hex
+    user_id = Column(Integer, nullable=False)
+    format = Column(String(10), nullable=False)  # pdf, excel
+    params = Column(String, nullable=False)  # filtros em JSON
+    dedup_key = Column(String(64), nullable=False)
+    status = Column(String(20), nullable=False, default="pending")  # pending, running, done, failed
+    artifact_path = Column(String, nullable=True)
+    error = Column(String, nullable=True)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    finished_at = Column(DateTime(timezone=True), nullable=True)
+    expires_at = Column(DateTime(timezone=True), nullable=True)
+    
+    __table_args__ = (
+        Index("ix_report_jobs_user_dedup", "user_id", "dedup_key"),
+        Index("ix_report_jobs_expires_at", "expires_at"),
+    )
+    
+    def __repr__(self):
+        return f"<ReportJob(id='{self.id}', user_id={self.user_id}, format={self.format}, status={self.status})>"
+
+class CategoryRule(Base):
+    """Palavra-chave de categorização definida pelo usuário"""
+    __tablename__ = "category_rules"
+    
+    id = Column(Integer, primary_key=True, index=True)
+    user_id = Column(Integer, nullable=False)
+    keyword = Column(String(100), nullable=False)  # minúsculas, casada como palavra inteira
+    category = Column(String, nullable=False)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    updated_at = Column(DateTime(timezone=True), onupdate=func.now())
+    
+    __table_args__ = (
+        Index("ix_category_rules_user_keyword", "user_id", "keyword", unique=True),
+    )
+    
+    def __repr__(self):
+        return f"<CategoryRule(id={self.id}, user_id={self.user_id}, keyword='{self.keyword}', category='{self.category}')>"
+
+class UserDataVersion(Base):
+    """Contador de versão dos dados de cada usuário (incrementado a cada escrita em transactions)"""
+    __tablename__ = "user_data_versions"
+    
+    user_id = Column(Integer, primary_key=True, autoincrement=False)
+    version = Column(Integer, nullable=False, default=0)
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
+    
+    def __repr__(self):
+        return f"<UserDataVersion(user_id={self.user_id}, version={self.version})>"
+
 class User(Base):
     __tablename__ = "users"
     
@@ -65,12 +147,18 @@ class RefreshToken(Base):
     __tablename__ = "refresh_tokens"
     
     id = Column(Integer, primary_key=True, index=True)
-    token = Column(String, unique=True, index=True, nullable=False)
+    token_hash = Column(String(64), unique=True, index=True, nullable=False)  # SHA-256 do token
     user_id = Column(Integer, nullable=False)
-    expires_at = Column(DateTime(timezone=True), nullable=False)
+    expires_at = Column(DateTime(timezone=True), nullable=False)  # antecipado para a revogação
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     is_revoked = Column(Boolean, default=False)
     
+    # Bancos existentes são convertidos por migrate_refresh_tokens.py
+    __table_args__ = (
+        Index("ix_refresh_tokens_user_expires", "user_id", "expires_at"),
+        Index("ix_refresh_tokens_expires_at", "expires_at"),
+    )
+    
     def __repr__(self):
         return f"<RefreshToken(id={self.id}, user_id={self.user_id}, expires_at='{self.expires_at}')>"
 
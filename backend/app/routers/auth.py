@@ -1,15 +1,16 @@
 """
 Router de autenticação
 """
-from datetime import datetime, timedelta
+from datetime import datetime, timedelta, timezone
+from typing import Optional
 from fastapi import APIRouter, Depends, HTTPException, status, Request
 from fastapi.security import OAuth2PasswordRequestForm
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
-from app.database import get_db
-from app.models import User, RefreshToken
+from app.database import get_async_db
+from app.models import User
 from app.auth import (
-    verify_password,
-    get_password_hash,
     create_access_token,
     create_refresh_token,
     verify_token,
@@ -21,40 +22,64 @@ from app.auth import (
 )
 from app.schemas import UserCreate, UserResponse, Token, TokenRefresh, UserUpdate
 from app.utils.password import validate_password_strength
+from app.services.password_hashing import HashingPoolBusy, verify_and_update_async
+from app.services.token_store import find_active_refresh_token, revoke_user_sessions
+from app.services.user_cache import UserSnapshot
 from app.config import settings
-
-# Rate limiting opcional
-try:
-    from slowapi import Limiter
-    from slowapi.util import get_remote_address
-    limiter = Limiter(key_func=get_remote_address)
-    RATE_LIMITING_AVAILABLE = True
-except ImportError:
-    RATE_LIMITING_AVAILABLE = False
-    limiter = None
+from app.middleware.rate_limit import rate_limit
 
 router = APIRouter()
 
-# Decorator de rate limiting opcional
-def rate_limit(limit: str):
-    if RATE_LIMITING_AVAILABLE and limiter:
-        return limiter.limit(limit)
-    return lambda f: f  # Retorna função sem modificação se rate limiting não disponível
-
 # Rota de registro removida - apenas admin pode criar usuários
 
+def _complete_login(db: Session, user: User, new_hash: Optional[str]) -> dict:
+    """Atualizar último login (e o hash, se refeito) e emitir os tokens"""
+    if new_hash:
+        # Hash com custo antigo: substituído de forma transparente
+        user.hashed_password = new_hash
+    user.last_login = datetime.now(timezone.utc)
+    db.commit()
+    
+    # Criar tokens
+    access_token_expires = timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
+    # IMPORTANTE: 'sub' deve ser string, não int (python-jose exige)
+    token_data = {"sub": str(user.id), "email": user.email, "username": user.username}
+    access_token = create_access_token(
+        data=token_data,
+        expires_delta=access_token_expires
+    )
+    
+    refresh_token = create_refresh_token(
+        data={"sub": str(user.id)}  # Converter para string
+    )
+    
+    # Salvar refresh token
+    save_refresh_token(db, user.id, refresh_token)
+    
+    return {
+        "access_token": access_token,
+        "refresh_token": refresh_token,
+        "token_type": "bearer",
+        "expires_in": ACCESS_TOKEN_EXPIRE_MINUTES * 60
+    }
+
 @router.post("/login", response_model=Token)
 @rate_limit("10/minute")
-def login(
+async def login(
     request: Request,
     form_data: OAuth2PasswordRequestForm = Depends(),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
-    """Login e obter tokens"""
+    """Login e obter tokens
+    
+    O bcrypt roda no pool de hash (app/services/password_hashing.py) e o
+    banco é acessado pela sessão assíncrona, então o event loop nunca fica
+    bloqueado.
+    """
     # Verificar usuário (username pode ser email ou username)
-    user = db.query(User).filter(
+    user = (await db.execute(select(User).where(
         (User.username == form_data.username) | (User.email == form_data.username)
-    ).first()
+    ).limit(1))).scalars().first()
     
     if not user:
         raise HTTPException(
@@ -63,7 +88,15 @@ def login(
             headers={"WWW-Authenticate": "Bearer"},
         )
     
-    if not verify_password(form_data.password, user.hashed_password):
+    try:
+        valid, new_hash = await verify_and_update_async(form_data.password, user.hashed_password)
+    except HashingPoolBusy:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Server busy, try again",
+            headers={"Retry-After": "1"},
+        )
+    if not valid:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Incorrect username or password",
@@ -76,39 +109,14 @@ def login(
             detail="Inactive user"
         )
     
-    # Atualizar último login
-    user.last_login = datetime.utcnow()
-    db.commit()
-    
-    # Criar tokens
-    access_token_expires = timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
-    # IMPORTANTE: 'sub' deve ser string, não int (python-jose exige)
-    token_data = {"sub": str(user.id), "email": user.email, "username": user.username}
-    access_token = create_access_token(
-        data=token_data,
-        expires_delta=access_token_expires
-    )
-    
-    refresh_token = create_refresh_token(
-        data={"sub": str(user.id)}  # Converter para string
-    )
-    
-    # Salvar refresh token
-    save_refresh_token(db, user.id, refresh_token)
-    
-    return {
-        "access_token": access_token,
-        "refresh_token": refresh_token,
-        "token_type": "bearer",
-        "expires_in": ACCESS_TOKEN_EXPIRE_MINUTES * 60
-    }
+    return await db.run_sync(_complete_login, user, new_hash)
 
 @router.post("/refresh", response_model=Token)
 @rate_limit("10/minute")
-def refresh_token(
+async def refresh_token(
     request: Request,
     token_data: TokenRefresh,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Renovar access token usando refresh token"""
     # Verificar refresh token
@@ -131,12 +139,7 @@ def refresh_token(
         )
     
     # Verificar se token está no banco e não foi revogado
-    refresh_token_db = db.query(RefreshToken).filter(
-        RefreshToken.token == token_data.refresh_token,
-        RefreshToken.user_id == user_id,
-        RefreshToken.is_revoked == False,
-        RefreshToken.expires_at > datetime.utcnow()
-    ).first()
+    refresh_token_db = await db.run_sync(find_active_refresh_token, token_data.refresh_token, user_id)
     
     if not refresh_token_db:
         raise HTTPException(
@@ -145,7 +148,7 @@ def refresh_token(
         )
     
     # Verificar usuário
-    user = db.query(User).filter(User.id == user_id).first()
+    user = await db.get(User, user_id)
     if not user or not user.is_active:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
@@ -167,17 +170,37 @@ def refresh_token(
     }
 
 @router.post("/logout")
-def logout(
+async def logout(
     token_data: TokenRefresh,
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    current_user: UserSnapshot = Depends(get_current_user),
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Logout e revogar refresh token"""
-    revoke_refresh_token(db, token_data.refresh_token)
+    await db.run_sync(revoke_refresh_token, token_data.refresh_token)
     return {"message": "Successfully logged out"}
 
+@router.post("/logout-all")
+async def logout_all(
+    current_user: UserSnapshot = Depends(get_current_user),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """Encerrar todas as sessões do usuário (revoga todos os refresh tokens)"""
+    revoked = await db.run_sync(revoke_user_sessions, current_user.id)
+    await db.commit()
+    return {"message": "All sessions revoked", "revoked": revoked}
+
 @router.get("/me", response_model=UserResponse)
-def get_current_user_info(current_user: User = Depends(get_current_user)):
+async def get_current_user_info(
+    current_user: UserSnapshot = Depends(get_current_user),
+    db: AsyncSession = Depends(get_async_db)
+):
     """Obter informações do usuário atual"""
-    return current_user
+    # O usuário em cache só tem os campos de autorização
+    user = await db.get(User, current_user.id)
+    if not user:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="User not found"
+        )
+    return user
 
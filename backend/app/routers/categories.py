@@ -0,0 +1,79 @@
+"""
+Router de regras de categorização e recategorização em lote
+"""
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from sqlalchemy.orm import Session
+from typing import List
+from app.database import get_db
+from app.models import CategoryRule
+from app.schemas import CategoryRuleCreate, CategoryRuleResponse, RecategorizeResponse
+from app.auth import get_current_active_user
+from app.services.user_cache import UserSnapshot
+from app.services.categorizer import invalidate_categorizer, normalize_keyword, recategorize_transactions
+
+router = APIRouter()
+
+@router.get("/rules", response_model=List[CategoryRuleResponse])
+def get_category_rules(
+    db: Session = Depends(get_db),
+    current_user: UserSnapshot = Depends(get_current_active_user)
+):
+    """Listar as regras de categorização do usuário logado"""
+    return db.query(CategoryRule).filter(
+        CategoryRule.user_id == current_user.id
+    ).order_by(CategoryRule.id).all()
+
+@router.post("/rules", response_model=CategoryRuleResponse, status_code=status.HTTP_201_CREATED)
+def create_category_rule(
+    rule: CategoryRuleCreate,
+    db: Session = Depends(get_db),
+    current_user: UserSnapshot = Depends(get_current_active_user)
+):
+    """Criar regra: descrições com a palavra-chave recebem a categoria"""
+    keyword = normalize_keyword(rule.keyword)
+    if not keyword:
+        raise HTTPException(status_code=400, detail="Palavra-chave inválida")
+    
+    existing = db.query(CategoryRule).filter(
+        CategoryRule.user_id == current_user.id,
+        CategoryRule.keyword == keyword
+    ).first()
+    if existing:
+        raise HTTPException(status_code=400, detail="Palavra-chave já cadastrada")
+    
+    db_rule = CategoryRule(user_id=current_user.id, keyword=keyword, category=rule.category.strip())
+    db.add(db_rule)
+    db.commit()
+    db.refresh(db_rule)
+    invalidate_categorizer(current_user.id)
+    return db_rule
+
+@router.delete("/rules/{rule_id}")
+def delete_category_rule(
+    rule_id: int,
+    db: Session = Depends(get_db),
+    current_user: UserSnapshot = Depends(get_current_active_user)
+):
+    """Remover regra do usuário logado"""
+    db_rule = db.query(CategoryRule).filter(
+        CategoryRule.id == rule_id,
+        CategoryRule.user_id == current_user.id
+    ).first()
+    if not db_rule:
+        raise HTTPException(status_code=404, detail="Rule not found")
+    
+    db.delete(db_rule)
+    db.commit()
+    invalidate_categorizer(current_user.id)
+    return {"message": "Rule deleted successfully"}
+
+@router.post("/recategorize", response_model=RecategorizeResponse)
+def recategorize(
+    only_uncategorized: bool = Query(False, description="Apenas transações sem categoria (Other)"),
+    db: Session = Depends(get_db),
+    current_user: UserSnapshot = Depends(get_current_active_user)
+):
+    """Reaplicar as regras a todas as transações do usuário logado"""
+    result = recategorize_transactions(db, current_user.id, only_uncategorized)
+    db.commit()
+    return result
@@ -1,225 +1,110 @@
-from fastapi import APIRouter, Depends, Query
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
+from starlette.concurrency import run_in_threadpool
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
-from sqlalchemy import func
 from datetime import date, datetime
-from typing import Optional
-from calendar import monthrange
-from app.database import get_db
-from app.models import Transaction, TransactionType, User
-from app.schemas import DashboardStats, HourlyCalculationRequest, HourlyCalculationResponse
+from typing import Awaitable, Callable, Literal, Optional
+from app.database import get_async_db, get_db
+from app.models import Transaction, TransactionType
+from app.schemas import DashboardStats, HourlyCalculationRequest, HourlyCalculationResponse, TrendResponse
 from app.auth import get_current_active_user
+from app.services.user_cache import UserSnapshot
+from app.services.dashboard_stats import DashboardRows, aggregate_dashboard_stats, load_dashboard_rows
+from app.services import rollups
+from app.services.data_version import data_version_query
+from app.services.response_cache import dashboard_cache
+from app.services.trends import aggregate_trend, load_trend_rows, trend_periods
+from app.utils.etag import etag_headers, etag_matches, make_etag, not_modified
 
 router = APIRouter()
 
+def _stats_json(rows: DashboardRows) -> bytes:
+    return aggregate_dashboard_stats(rows).model_dump_json().encode()
+
+def _trend_json(rows: list, granularity: str, horizon: Optional[int], today: date) -> bytes:
+    return TrendResponse(**aggregate_trend(rows, granularity, horizon, today)).model_dump_json().encode()
+
+async def _cached_json(
+    request: Request,
+    db: AsyncSession,
+    user_id: int,
+    today: date,
+    key_parts: tuple,
+    compute: Callable[[], Awaitable[bytes]]
+) -> Response:
+    """304 pela ETag ou o JSON do cache de respostas (calculado uma vez por chave)"""
+    version = (await db.execute(data_version_query(user_id))).scalar() or 0
+    etag = make_etag(user_id, version, request, today)
+    if etag_matches(request, etag):
+        return not_modified(etag)
+    # Devolver a conexão ao pool enquanto espera o cache ou outro cálculo igual
+    await db.rollback()
+    key = dashboard_cache.key(user_id, version, today, *key_parts)
+    body = await dashboard_cache.get_or_compute(key, compute)
+    return Response(content=body, media_type="application/json", headers=etag_headers(etag))
+
 @router.get("/stats", response_model=DashboardStats)
-def get_dashboard_stats(
+async def get_dashboard_stats(
+    request: Request,
     start_date: Optional[date] = None,
     end_date: Optional[date] = None,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_active_user)
+    db: AsyncSession = Depends(get_async_db),
+    current_user: UserSnapshot = Depends(get_current_active_user)
 ):
-    """Obter estatísticas do dashboard do usuário logado"""
-    # Totais respeitando filtros de data e usuário
-    total_income = db.query(func.sum(Transaction.amount)).filter(
-        Transaction.type == "income",
-        Transaction.user_id == current_user.id
-    )
-    if start_date:
-        total_income = total_income.filter(Transaction.date >= start_date)
-    if end_date:
-        total_income = total_income.filter(Transaction.date <= end_date)
-    total_income = total_income.scalar() or 0.0
-    
-    total_expense = db.query(func.sum(Transaction.amount)).filter(
-        Transaction.type == "expense",
-        Transaction.user_id == current_user.id
-    )
-    if start_date:
-        total_expense = total_expense.filter(Transaction.date >= start_date)
-    if end_date:
-        total_expense = total_expense.filter(Transaction.date <= end_date)
-    total_expense = total_expense.scalar() or 0.0
-    
-    balance = total_income - total_expense
-    
-    # Gastos fixos
-    fixed_expenses = db.query(func.sum(Transaction.amount)).filter(
-        Transaction.type == "expense",
-        Transaction.subtype == "fixed",
-        Transaction.user_id == current_user.id
-    )
-    if start_date:
-        fixed_expenses = fixed_expenses.filter(Transaction.date >= start_date)
-    if end_date:
-        fixed_expenses = fixed_expenses.filter(Transaction.date <= end_date)
-    fixed_expenses = fixed_expenses.scalar() or 0.0
-    
-    # Gastos esporádicos
-    sporadic_expenses = db.query(func.sum(Transaction.amount)).filter(
-        Transaction.type == "expense",
-        Transaction.subtype == "sporadic",
-        Transaction.user_id == current_user.id
-    )
-    if start_date:
-        sporadic_expenses = sporadic_expenses.filter(Transaction.date >= start_date)
-    if end_date:
-        sporadic_expenses = sporadic_expenses.filter(Transaction.date <= end_date)
-    sporadic_expenses = sporadic_expenses.scalar() or 0.0
-    
-    # Investimentos
-    investments = db.query(func.sum(Transaction.amount)).filter(
-        Transaction.type == "income",
-        Transaction.subtype == "investment",
-        Transaction.user_id == current_user.id
-    )
-    if start_date:
-        investments = investments.filter(Transaction.date >= start_date)
-    if end_date:
-        investments = investments.filter(Transaction.date <= end_date)
-    investments = investments.scalar() or 0.0
+    """Obter estatísticas do dashboard do usuário logado
     
-    # Saldo mensal (recebidos do mês atual - gastos do mês atual)
+    A ETag combina a versão dos dados com a data de hoje (o mês corrente e a
+    janela da tendência dependem dela); If-None-Match igual responde 304.
+    O JSON pronto fica no cache de respostas com a mesma chave, então abas
+    e dispositivos do mesmo usuário com os mesmos filtros calculam uma vez.
+    """
     today = date.today()
-    month_start = today.replace(day=1)
-    _, last_day = monthrange(today.year, today.month)
-    month_end = today.replace(day=last_day)
-    
-    monthly_income = db.query(func.sum(Transaction.amount)).filter(
-        Transaction.type == "income",
-        Transaction.user_id == current_user.id,
-        Transaction.date >= month_start,
-        Transaction.date <= month_end
-    ).scalar() or 0.0
-    
-    monthly_expense = db.query(func.sum(Transaction.amount)).filter(
-        Transaction.type == "expense",
-        Transaction.user_id == current_user.id,
-        Transaction.date >= month_start,
-        Transaction.date <= month_end
-    ).scalar() or 0.0
-    
-    monthly_balance = float(monthly_income) - float(monthly_expense)
-    
-    # Por categoria - Despesas
-    expense_by_category = {}
-    expense_query = db.query(
-        Transaction.category,
-        func.sum(Transaction.amount).label('total')
-    ).filter(
-        Transaction.type == "expense",
-        Transaction.user_id == current_user.id
-    )
-    if start_date:
-        expense_query = expense_query.filter(Transaction.date >= start_date)
-    if end_date:
-        expense_query = expense_query.filter(Transaction.date <= end_date)
-    expenses = expense_query.group_by(Transaction.category).all()
-    
-    for category, total in expenses:
-        expense_by_category[category or "Other"] = float(total or 0)
-    
-    # Por categoria - Receitas
-    income_by_category = {}
-    income_query = db.query(
-        Transaction.category,
-        func.sum(Transaction.amount).label('total')
-    ).filter(
-        Transaction.type == "income",
-        Transaction.user_id == current_user.id
-    )
-    if start_date:
-        income_query = income_query.filter(Transaction.date >= start_date)
-    if end_date:
-        income_query = income_query.filter(Transaction.date <= end_date)
-    incomes = income_query.group_by(Transaction.category).all()
-    
-    for category, total in incomes:
-        income_by_category[category or "Other"] = float(total or 0)
-    
-    # Tendência mensal (últimos 12 meses)
-    monthly_trend = []
-    for i in range(12):
-        month_start = date.today().replace(day=1)
-        month_start = month_start.replace(month=(month_start.month - i) % 12 or 12)
-        if month_start.month > date.today().month:
-            month_start = month_start.replace(year=month_start.year - 1)
-        
-        month_end = month_start.replace(day=28)  # Aproximação
-        
-        month_income = db.query(func.sum(Transaction.amount)).filter(
-            Transaction.type == "income",
-            Transaction.user_id == current_user.id,
-            Transaction.date >= month_start,
-            Transaction.date <= month_end
-        ).scalar() or 0.0
-        
-        month_expense = db.query(func.sum(Transaction.amount)).filter(
-            Transaction.type == "expense",
-            Transaction.user_id == current_user.id,
-            Transaction.date >= month_start,
-            Transaction.date <= month_end
-        ).scalar() or 0.0
-        
-        monthly_trend.append({
-            "month": month_start.strftime("%Y-%m"),
-            "income": float(month_income),
-            "expense": float(month_expense)
-        })
-    
-    monthly_trend.reverse()
-    
-    # Transações recentes (respeitando filtros e usuário)
-    recent_query = db.query(Transaction).filter(Transaction.user_id == current_user.id)
-    if start_date:
-        recent_query = recent_query.filter(Transaction.date >= start_date)
-    if end_date:
-        recent_query = recent_query.filter(Transaction.date <= end_date)
-    recent_transactions = recent_query.order_by(
-        Transaction.date.desc()
-    ).limit(10).all()
+
+    async def compute() -> bytes:
+        # Consultas na sessão assíncrona; agregação e JSON no threadpool, fora do
+        # event loop, com a conexão já devolvida ao pool
+        rows = await db.run_sync(load_dashboard_rows, current_user.id, start_date, end_date, today)
+        await db.rollback()
+        return await run_in_threadpool(_stats_json, rows)
+
+    return await _cached_json(request, db, current_user.id, today, ("stats", start_date, end_date), compute)
+
+@router.get("/trend", response_model=TrendResponse)
+async def get_trend(
+    request: Request,
+    granularity: Literal["day", "week", "month", "quarter"] = Query("month"),
+    horizon: Optional[int] = Query(None, ge=1, description="Quantidade de períodos até o atual (padrão por granularidade)"),
+    db: AsyncSession = Depends(get_async_db),
+    current_user: UserSnapshot = Depends(get_current_active_user)
+):
+    """Receitas, despesas e saldo por dia, semana, mês ou trimestre
     
-    return DashboardStats(
-        total_income=float(total_income),
-        total_expense=float(total_expense),
-        balance=float(balance),
-        expense_by_category=expense_by_category,
-        income_by_category=income_by_category,
-        monthly_trend=monthly_trend,
-        recent_transactions=[{
-            "id": t.id,
-            "type": str(t.type),
-            "description": t.description,
-            "amount": t.amount,
-            "date": t.date.isoformat(),
-            "category": t.category
-        } for t in recent_transactions],
-        fixed_expenses=float(fixed_expenses),
-        sporadic_expenses=float(sporadic_expenses),
-        investments=float(investments),
-        monthly_balance=monthly_balance
-    )
+    Períodos de calendário terminando no atual, com zero nos períodos sem
+    movimento. Usa a mesma ETag e o mesmo cache de respostas de /stats.
+    """
+    today = date.today()
+    try:
+        trend_periods(granularity, horizon, today)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    async def compute() -> bytes:
+        rows = await db.run_sync(load_trend_rows, current_user.id, granularity, horizon, today)
+        await db.rollback()
+        return await run_in_threadpool(_trend_json, rows, granularity, horizon, today)
+
+    return await _cached_json(request, db, current_user.id, today, ("trend", granularity, horizon), compute)
 
 @router.post("/hourly-calculation", response_model=HourlyCalculationResponse)
 def calculate_hourly_values(
     request: HourlyCalculationRequest,
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_active_user)
+    current_user: UserSnapshot = Depends(get_current_active_user)
 ):
     """Calcular valores por hora, dia e semana baseado em recebidos do mês"""
-    # Obter primeiro e último dia do mês
-    _, last_day = monthrange(request.year, request.month)
+    # Total recebido no mês (type = "income"), lido dos agregados mensais
     month_start = date(request.year, request.month, 1)
-    month_end = date(request.year, request.month, last_day)
-    
-    # Buscar total recebido no mês (subtype = "received" ou type = "income")
-    total_received = db.query(func.sum(Transaction.amount)).filter(
-        Transaction.type == "income",
-        Transaction.user_id == current_user.id,
-        Transaction.date >= month_start,
-        Transaction.date <= month_end
-    ).scalar() or 0.0
-    
-    total_received = float(total_received)
+    total_received = rollups.type_total(db, current_user.id, rollups.year_month(month_start), "income")
     
     # Calcular valores
     total_hours = request.days_worked * request.hours_per_day
@@ -1,219 +1,136 @@
-from fastapi import APIRouter, Depends, Query
-from fastapi.responses import StreamingResponse
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, status
+from fastapi.responses import FileResponse, StreamingResponse
 from sqlalchemy.orm import Session
 from datetime import date
 from typing import Optional
+import os
 from app.database import get_db
-from app.models import Transaction, TransactionType, User
-from app.auth import get_current_active_user, User
+from app.models import ReportJob, TransactionType
+from app.schemas import ReportJobCreate, ReportJobResponse
 from app.auth import get_current_active_user
-import pandas as pd
-from reportlab.lib import colors
-from reportlab.lib.pagesizes import A4
-from reportlab.lib.units import inch
-from reportlab.platypus import SimpleDocTemplate, Table, TableStyle, Paragraph, Spacer
-from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
-from reportlab.lib.enums import TA_CENTER
-from io import BytesIO
+from app.services.user_cache import UserSnapshot
+from app.services.data_version import get_data_version
+from app.services.report_data import REPORT_FORMATS, build_report
+from app.services.report_jobs import refresh_job_status, submit_report_job
+from app.services.report_workers import run_in_report_pool
+from app.utils.etag import etag_headers, etag_matches, make_etag, not_modified
+from app.utils.streaming import iter_file
 
 router = APIRouter()
 
+def _report_response(output, report_format: str, etag: str) -> StreamingResponse:
+    media_type, extension = REPORT_FORMATS[report_format]
+    return StreamingResponse(
+        iter_file(output),
+        media_type=media_type,
+        headers={
+            "Content-Disposition": f"attachment; filename=relatorio_financeiro.{extension}",
+            **etag_headers(etag)
+        }
+    )
+
+def _report_etag(db: Session, request: Request, user_id: int) -> str:
+    # Fraca: PDF e xlsx carregam a data de criação, os bytes mudam a cada geração
+    return make_etag(user_id, get_data_version(db, user_id), request, weak=True)
+
+def _pdf_report(db: Session, request: Request, user_id: int, **filters):
+    """ETag e PDF numa única chamada: a sessão síncrona fica numa só thread"""
+    etag = _report_etag(db, request, user_id)
+    if etag_matches(request, etag):
+        return not_modified(etag)
+    output = build_report(db, user_id, "pdf", **filters)
+    return _report_response(output, "pdf", etag)
+
 @router.get("/pdf")
-def generate_pdf_report(
+async def generate_pdf_report(
+    request: Request,
     start_date: Optional[date] = Query(None),
     end_date: Optional[date] = Query(None),
     transaction_type: Optional[TransactionType] = Query(None),
     category: Optional[str] = Query(None),
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_active_user)
+    current_user: UserSnapshot = Depends(get_current_active_user)
 ):
     """Gerar relatório em PDF do usuário logado"""
-    query = db.query(Transaction).filter(Transaction.user_id == current_user.id)
-    
-    if start_date:
-        query = query.filter(Transaction.date >= start_date)
-    if end_date:
-        query = query.filter(Transaction.date <= end_date)
-    if transaction_type:
-        type_value = transaction_type.value if isinstance(transaction_type, TransactionType) else str(transaction_type)
-        query = query.filter(Transaction.type == type_value)
-    if category:
-        query = query.filter(Transaction.category == category)
-    
-    transactions = query.order_by(Transaction.date.desc()).all()
-    
-    # Calcular totais
-    total_income = sum(t.amount for t in transactions if t.type == TransactionType.INCOME)
-    total_expense = sum(t.amount for t in transactions if t.type == TransactionType.EXPENSE)
-    balance = total_income - total_expense
-    
-    # Criar PDF
-    buffer = BytesIO()
-    doc = SimpleDocTemplate(buffer, pagesize=A4, topMargin=0.5*inch)
-    elements = []
-    
-    styles = getSampleStyleSheet()
-    title_style = ParagraphStyle(
-        'CustomTitle',
-        parent=styles['Heading1'],
-        fontSize=24,
-        textColor=colors.HexColor('#6366f1'),
-        spaceAfter=30,
-        alignment=TA_CENTER
-    )
-    
-    # Título
-    elements.append(Paragraph("Relatório Financeiro", title_style))
-    elements.append(Spacer(1, 0.2*inch))
-    
-    # Período
-    period_text = f"Período: {start_date or 'Início'} a {end_date or 'Hoje'}"
-    elements.append(Paragraph(period_text, styles['Normal']))
-    elements.append(Spacer(1, 0.3*inch))
-    
-    # Resumo
-    summary_data = [
-        ['Resumo Financeiro', '', ''],
-        ['Receitas', f'R$ {total_income:,.2f}', ''],
-        ['Despesas', f'R$ {total_expense:,.2f}', ''],
-        ['Saldo', f'R$ {balance:,.2f}', '']
-    ]
-    
-    summary_table = Table(summary_data, colWidths=[3*inch, 2*inch, 2*inch])
-    summary_table.setStyle(TableStyle([
-        ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#6366f1')),
-        ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
-        ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
-        ('ALIGN', (1, 0), (2, -1), 'RIGHT'),
-        ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
-        ('FONTSIZE', (0, 0), (-1, 0), 14),
-        ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
-        ('BACKGROUND', (0, 1), (-1, -1), colors.beige),
-        ('GRID', (0, 0), (-1, -1), 1, colors.black),
-        ('ROWBACKGROUNDS', (0, 1), (-1, -1), [colors.white, colors.lightgrey])
-    ]))
-    
-    elements.append(summary_table)
-    elements.append(Spacer(1, 0.4*inch))
-    
-    # Transações
-    if transactions:
-        elements.append(Paragraph("Transações", styles['Heading2']))
-        elements.append(Spacer(1, 0.2*inch))
-        
-        trans_data = [['Data', 'Tipo', 'Descrição', 'Categoria', 'Valor']]
-        
-        for t in transactions:
-            trans_data.append([
-                t.date.strftime("%d/%m/%Y"),
-                "Receita" if t.type == TransactionType.INCOME else "Despesa",
-                t.description,
-                t.category or "Outro",
-                f"R$ {t.amount:,.2f}"
-            ])
-        
-        trans_table = Table(trans_data, colWidths=[1*inch, 1*inch, 2.5*inch, 1.5*inch, 1.5*inch])
-        trans_table.setStyle(TableStyle([
-            ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#6366f1')),
-            ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
-            ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
-            ('ALIGN', (4, 0), (4, -1), 'RIGHT'),
-            ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
-            ('FONTSIZE', (0, 0), (-1, 0), 11),
-            ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
-            ('BACKGROUND', (0, 1), (-1, -1), colors.white),
-            ('GRID', (0, 0), (-1, -1), 1, colors.grey),
-            ('ROWBACKGROUNDS', (0, 1), (-1, -1), [colors.white, colors.lightgrey])
-        ]))
-        
-        elements.append(trans_table)
-    
-    # Gerar PDF
-    doc.build(elements)
-    buffer.seek(0)
-    
-    return StreamingResponse(
-        BytesIO(buffer.read()),
-        media_type="application/pdf",
-        headers={"Content-Disposition": "attachment; filename=relatorio_financeiro.pdf"}
+    return await run_in_report_pool(
+        _pdf_report, db, request, current_user.id,
+        start_date=start_date, end_date=end_date,
+        transaction_type=transaction_type, category=category
     )
 
 @router.get("/excel")
 def generate_excel_report(
+    request: Request,
     start_date: Optional[date] = Query(None),
     end_date: Optional[date] = Query(None),
     transaction_type: Optional[TransactionType] = Query(None),
     category: Optional[str] = Query(None),
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_active_user)
+    current_user: UserSnapshot = Depends(get_current_active_user)
 ):
     """Gerar relatório em Excel do usuário logado"""
-    query = db.query(Transaction).filter(Transaction.user_id == current_user.id)
-    
-    if start_date:
-        query = query.filter(Transaction.date >= start_date)
-    if end_date:
-        query = query.filter(Transaction.date <= end_date)
-    if transaction_type:
-        type_value = transaction_type.value if isinstance(transaction_type, TransactionType) else str(transaction_type)
-        query = query.filter(Transaction.type == type_value)
-    if category:
-        query = query.filter(Transaction.category == category)
-    
-    transactions = query.order_by(Transaction.date.desc()).all()
-    
-    # Preparar dados
-    data = []
-    for t in transactions:
-        data.append({
-            "Data": t.date.strftime("%d/%m/%Y"),
-            "Tipo": "Receita" if t.type == TransactionType.INCOME else "Despesa",
-            "Descrição": t.description,
-            "Categoria": t.category or "Outro",
-            "Valor": t.amount,
-            "Observações": t.notes or ""
-        })
-    
-    df = pd.DataFrame(data)
-    
-    # Criar Excel com formatação
-    output = BytesIO()
-    try:
-        from openpyxl.styles import Font, PatternFill, Alignment
-        
-        with pd.ExcelWriter(output, engine='openpyxl') as writer:
-            df.to_excel(writer, sheet_name='Transações', index=False)
-            
-            # Formatação
-            workbook = writer.book
-            worksheet = writer.sheets['Transações']
-            
-            # Cabeçalho
-            header_fill = PatternFill(start_color="6366F1", end_color="6366F1", fill_type="solid")
-            header_font = Font(color="FFFFFF", bold=True)
-            
-            for cell in worksheet[1]:
-                cell.fill = header_fill
-                cell.font = header_font
-                cell.alignment = Alignment(horizontal="center")
-            
-            # Ajustar largura das colunas
-            worksheet.column_dimensions['A'].width = 12
-            worksheet.column_dimensions['B'].width = 12
-            worksheet.column_dimensions['C'].width = 30
-            worksheet.column_dimensions['D'].width = 15
-            worksheet.column_dimensions['E'].width = 15
-            worksheet.column_dimensions['F'].width = 30
-    except ImportError:
-        # Fallback se openpyxl não estiver disponível
-        with pd.ExcelWriter(output, engine='openpyxl') as writer:
-            df.to_excel(writer, sheet_name='Transações', index=False)
-    
-    output.seek(0)
-    
-    return StreamingResponse(
-        BytesIO(output.read()),
-        media_type="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
-        headers={"Content-Disposition": "attachment; filename=relatorio_financeiro.xlsx"}
+    etag = _report_etag(db, request, current_user.id)
+    if etag_matches(request, etag):
+        return not_modified(etag)
+    # Linhas lidas em lotes e gravadas direto na planilha write-only
+    output = build_report(
+        db, current_user.id, "excel",
+        start_date=start_date, end_date=end_date,
+        transaction_type=transaction_type, category=category
+    )
+    return _report_response(output, "excel", etag)
+
+# Relatórios em segundo plano
+
+def _get_user_job(db: Session, job_id: str, user_id: int) -> ReportJob:
+    job = db.query(ReportJob).filter(
+        ReportJob.id == job_id,
+        ReportJob.user_id == user_id
+    ).first()
+    if not job:
+        raise HTTPException(status_code=404, detail="Relatório não encontrado")
+    return refresh_job_status(db, job)
+
+@router.post("/jobs", response_model=ReportJobResponse, status_code=status.HTTP_202_ACCEPTED)
+def create_report_job(
+    request: ReportJobCreate,
+    db: Session = Depends(get_db),
+    current_user: UserSnapshot = Depends(get_current_active_user)
+):
+    """Enfileirar a geração de um relatório (pedidos idênticos reutilizam o mesmo job)"""
+    return submit_report_job(
+        db, current_user.id, request.format,
+        start_date=request.start_date, end_date=request.end_date,
+        transaction_type=request.transaction_type, category=request.category
     )
 
+@router.get("/jobs/{job_id}", response_model=ReportJobResponse)
+def get_report_job(
+    job_id: str,
+    db: Session = Depends(get_db),
+    current_user: UserSnapshot = Depends(get_current_active_user)
+):
+    """Consultar o status de um relatório em segundo plano"""
+    return _get_user_job(db, job_id, current_user.id)
+
+@router.get("/jobs/{job_id}/download")
+def download_report_job(
+    job_id: str,
+    db: Session = Depends(get_db),
+    current_user: UserSnapshot = Depends(get_current_active_user)
+):
+    """Baixar o arquivo de um relatório concluído"""
+    job = _get_user_job(db, job_id, current_user.id)
+    if job.status == "failed":
+        raise HTTPException(status_code=409, detail=f"Falha ao gerar relatório: {job.error}")
+    if job.status != "done":
+        raise HTTPException(status_code=409, detail="Relatório ainda não está pronto")
+    if not job.artifact_path or not os.path.exists(job.artifact_path):
+        raise HTTPException(status_code=404, detail="Relatório expirado")
+    
+    media_type, extension = REPORT_FORMATS[job.format]
+    return FileResponse(
+        job.artifact_path,
+        media_type=media_type,
+        filename=f"relatorio_financeiro.{extension}"
+    )
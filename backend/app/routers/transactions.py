@@ -1,71 +1,165 @@
-from fastapi import APIRouter, Depends, HTTPException, Request
+import logging
+from fastapi import APIRouter, Depends, HTTPException, Request, Response
+from fastapi.responses import JSONResponse
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
-from sqlalchemy import desc
+from sqlalchemy import and_, desc, or_, select
 from typing import List, Optional
 from datetime import date
-from app.database import get_db
-from app.models import Transaction, TransactionType, User
-from app.schemas import TransactionCreate, TransactionUpdate, Transaction as TransactionSchema
+from app.database import get_async_db, get_db
+from app.models import Transaction, TransactionType
+from app.schemas import (
+    BulkTransactionCreate, BulkTransactionDelete, BulkTransactionResult, BulkTransactionUpdate,
+    TransactionCreate, TransactionUpdate, Transaction as TransactionSchema
+)
 from app.auth import get_current_active_user
+from app.services.user_cache import UserSnapshot
+from app.services.bulk_transactions import bulk_create, bulk_delete, bulk_update, transaction_values, update_values
+from app.services.data_version import bump_data_version, data_version_query
+from app.services.rollups import new_deltas, add_transaction_delta, apply_rollup_deltas
 from app.config import settings
-
-# Rate limiting opcional
-try:
-    from slowapi import Limiter
-    from slowapi.util import get_remote_address
-    limiter = Limiter(key_func=get_remote_address)
-    RATE_LIMITING_AVAILABLE = True
-except ImportError:
-    RATE_LIMITING_AVAILABLE = False
-    limiter = None
+from app.middleware.rate_limit import rate_limit
+from app.utils.etag import etag_headers, etag_matches, make_etag, not_modified
+from app.utils.pagination import NEXT_CURSOR_HEADER, encode_cursor, decode_cursor
 
 router = APIRouter()
+logger = logging.getLogger(__name__)
 
-# Decorator de rate limiting opcional
-def rate_limit(limit: str):
-    if RATE_LIMITING_AVAILABLE and limiter:
-        return limiter.limit(limit)
-    return lambda f: f  # Retorna função sem modificação se rate limiting não disponível
+async def _read_etag(db: AsyncSession, request: Request, user_id: int) -> str:
+    version = (await db.execute(data_version_query(user_id))).scalar() or 0
+    return make_etag(user_id, version, request)
 
 @router.get("/", response_model=List[TransactionSchema])
 @rate_limit(f"{settings.rate_limit_per_minute}/minute")
-def get_transactions(
+async def get_transactions(
     request: Request,
+    response: Response,
     skip: int = 0,
     limit: int = 100,
+    cursor: Optional[str] = None,
     transaction_type: Optional[TransactionType] = None,
     start_date: Optional[date] = None,
     end_date: Optional[date] = None,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_active_user)
+    db: AsyncSession = Depends(get_async_db),
+    current_user: UserSnapshot = Depends(get_current_active_user)
 ):
-    """Buscar todas as transações do usuário logado com filtros opcionais"""
-    query = db.query(Transaction).filter(Transaction.user_id == current_user.id)
+    """Buscar todas as transações do usuário logado com filtros opcionais
+    
+    Com `cursor` a página começa logo após a posição (data, id) codificada e
+    `skip` é ignorado. Quando a página vem cheia, o cursor da próxima página
+    é retornado no header X-Next-Cursor.
+    
+    A ETag vem da versão dos dados do usuário; com If-None-Match igual a
+    resposta é 304 sem consultar as transações.
+    """
+    etag = await _read_etag(db, request, current_user.id)
+    if etag_matches(request, etag):
+        return not_modified(etag)
+    response.headers.update(etag_headers(etag))
+    
+    query = select(Transaction).where(Transaction.user_id == current_user.id)
     
     if transaction_type:
         type_value = transaction_type.value if isinstance(transaction_type, TransactionType) else str(transaction_type)
-        query = query.filter(Transaction.type == type_value)
+        query = query.where(Transaction.type == type_value)
     
     if start_date:
-        query = query.filter(Transaction.date >= start_date)
+        query = query.where(Transaction.date >= start_date)
     
     if end_date:
-        query = query.filter(Transaction.date <= end_date)
+        query = query.where(Transaction.date <= end_date)
+    
+    if cursor:
+        try:
+            cursor_date, cursor_id = decode_cursor(cursor)
+        except ValueError:
+            raise HTTPException(status_code=400, detail="Invalid cursor")
+        query = query.where(or_(
+            Transaction.date < cursor_date,
+            and_(Transaction.date == cursor_date, Transaction.id < cursor_id)
+        ))
     
-    transactions = query.order_by(desc(Transaction.date)).offset(skip).limit(limit).all()
+    # id como desempate garante ordem estável entre transações do mesmo dia
+    query = query.order_by(desc(Transaction.date), desc(Transaction.id))
+    if not cursor:
+        query = query.offset(skip)
+    transactions = (await db.execute(query.limit(limit))).scalars().all()
+    
+    if limit > 0 and len(transactions) == limit:
+        last = transactions[-1]
+        response.headers[NEXT_CURSOR_HEADER] = encode_cursor(last.date, last.id)
     return transactions
 
+def _check_bulk_size(count: int) -> None:
+    if count > settings.bulk_max_items:
+        raise HTTPException(status_code=413, detail=f"Máximo de {settings.bulk_max_items} itens por lote")
+
+def _finish_bulk(db: Session, summary: dict):
+    """Commit do lote; lote atômico com erro volta 422 sem gravar nada"""
+    if summary["committed"]:
+        db.commit()
+        return summary
+    db.rollback()
+    return JSONResponse(status_code=422, content=summary)
+
+@router.post("/bulk", response_model=BulkTransactionResult)
+@rate_limit(f"{settings.rate_limit_per_minute}/minute")
+def create_transactions_bulk(
+    request: Request,
+    payload: BulkTransactionCreate,
+    db: Session = Depends(get_db),
+    current_user: UserSnapshot = Depends(get_current_active_user)
+):
+    """Criar várias transações em uma única transação do banco
+    
+    Cada item é validado como em POST / e recebe um resultado próprio
+    (status, id ou erro). Itens inválidos são ignorados, a menos que
+    `atomic` seja true: aí nada é gravado e a resposta é 422.
+    """
+    _check_bulk_size(len(payload.items))
+    return _finish_bulk(db, bulk_create(db, current_user.id, payload.items, payload.atomic))
+
+@router.put("/bulk", response_model=BulkTransactionResult)
+@rate_limit(f"{settings.rate_limit_per_minute}/minute")
+def update_transactions_bulk(
+    request: Request,
+    payload: BulkTransactionUpdate,
+    db: Session = Depends(get_db),
+    current_user: UserSnapshot = Depends(get_current_active_user)
+):
+    """Atualizar várias transações; cada item é {"id": ..., campos como em PUT /{id}}"""
+    _check_bulk_size(len(payload.items))
+    return _finish_bulk(db, bulk_update(db, current_user.id, payload.items, payload.atomic))
+
+@router.post("/bulk/delete", response_model=BulkTransactionResult)
+@rate_limit(f"{settings.rate_limit_per_minute}/minute")
+def delete_transactions_bulk(
+    request: Request,
+    payload: BulkTransactionDelete,
+    db: Session = Depends(get_db),
+    current_user: UserSnapshot = Depends(get_current_active_user)
+):
+    """Remover várias transações pelos ids (POST porque DELETE com corpo não é bem suportado)"""
+    _check_bulk_size(len(payload.ids))
+    return _finish_bulk(db, bulk_delete(db, current_user.id, payload.ids, payload.atomic))
+
 @router.get("/{transaction_id}", response_model=TransactionSchema)
-def get_transaction(
+async def get_transaction(
+    request: Request,
+    response: Response,
     transaction_id: int,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_active_user)
+    db: AsyncSession = Depends(get_async_db),
+    current_user: UserSnapshot = Depends(get_current_active_user)
 ):
     """Buscar uma transação específica do usuário logado"""
-    transaction = db.query(Transaction).filter(
+    etag = await _read_etag(db, request, current_user.id)
+    if etag_matches(request, etag):
+        return not_modified(etag)
+    response.headers.update(etag_headers(etag))
+    transaction = (await db.execute(select(Transaction).where(
         Transaction.id == transaction_id,
         Transaction.user_id == current_user.id
-    ).first()
+    ))).scalars().first()
     if not transaction:
         raise HTTPException(status_code=404, detail="Transaction not found")
     return transaction
@@ -76,52 +170,24 @@ def create_transaction(
     request: Request,
     transaction: TransactionCreate,
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_active_user)
+    current_user: UserSnapshot = Depends(get_current_active_user)
 ):
     """Criar nova transação"""
     try:
-        # Garantir que o tipo seja uma string válida
-        if isinstance(transaction.type, TransactionType):
-            transaction_type_value = transaction.type.value
-        else:
-            transaction_type_value = str(transaction.type)
-        
-        # Validar que o tipo é válido
-        if transaction_type_value not in ["expense", "income"]:
-            raise ValueError(f"Tipo inválido: {transaction_type_value}")
-        
-        # Tratar subtype corretamente
-        subtype_value = None
-        if transaction.subtype is not None:
-            if isinstance(transaction.subtype, str):
-                subtype_value = transaction.subtype.strip()
-                if not subtype_value:  # Se ficou vazio após strip
-                    subtype_value = None
-            else:
-                subtype_value = str(transaction.subtype).strip() if str(transaction.subtype).strip() else None
-        
         db_transaction = Transaction(
             user_id=current_user.id,  # Associar transação ao usuário logado
-            type=transaction_type_value,
-            subtype=subtype_value,
-            description=transaction.description.strip() if transaction.description else "",
-            amount=float(transaction.amount),
-            date=transaction.date,
-            category=(transaction.category or "Other").strip(),
-            notes=transaction.notes.strip() if transaction.notes else None
+            **transaction_values(transaction)
         )
         db.add(db_transaction)
+        apply_rollup_deltas(db, add_transaction_delta(new_deltas(), db_transaction))
+        bump_data_version(db, current_user.id)
         db.commit()
         db.refresh(db_transaction)
         return db_transaction
-    except Exception as e:
+    except Exception:
         db.rollback()
-        import traceback
-        error_detail = str(e)
-        traceback_str = traceback.format_exc()
-        print(f"ERRO ao criar transação: {error_detail}")
-        print(f"Traceback completo:\n{traceback_str}")
-        raise HTTPException(status_code=500, detail=f"Erro ao criar transação: {error_detail}")
+        logger.exception("Erro ao criar transação", extra={"user_id": current_user.id})
+        raise HTTPException(status_code=500, detail="Erro ao criar transação")
 
 @router.put("/{transaction_id}", response_model=TransactionSchema)
 @rate_limit(f"{settings.rate_limit_per_minute}/minute")
@@ -130,7 +196,7 @@ def update_transaction(
     transaction_id: int,
     transaction_update: TransactionUpdate,
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_active_user)
+    current_user: UserSnapshot = Depends(get_current_active_user)
 ):
     """Atualizar transação existente do usuário logado"""
     db_transaction = db.query(Transaction).filter(
@@ -140,9 +206,13 @@ def update_transaction(
     if not db_transaction:
         raise HTTPException(status_code=404, detail="Transaction not found")
     
-    update_data = transaction_update.model_dump(exclude_unset=True)
+    deltas = add_transaction_delta(new_deltas(), db_transaction, sign=-1)
+    update_data = update_values(transaction_update.model_dump(exclude_unset=True))
     for field, value in update_data.items():
         setattr(db_transaction, field, value)
+    add_transaction_delta(deltas, db_transaction)
+    apply_rollup_deltas(db, deltas)
+    bump_data_version(db, current_user.id)
     
     db.commit()
     db.refresh(db_transaction)
@@ -154,7 +224,7 @@ def delete_transaction(
     request: Request,
     transaction_id: int,
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_active_user)
+    current_user: UserSnapshot = Depends(get_current_active_user)
 ):
     """Deletar transação do usuário logado"""
     db_transaction = db.query(Transaction).filter(
@@ -164,6 +234,8 @@ def delete_transaction(
     if not db_transaction:
         raise HTTPException(status_code=404, detail="Transaction not found")
     
+    apply_rollup_deltas(db, add_transaction_delta(new_deltas(), db_transaction, sign=-1))
+    bump_data_version(db, current_user.id)
     db.delete(db_transaction)
     db.commit()
     return {"message": "Transaction deleted successfully"}
@@ -1,127 +1,115 @@
-from fastapi import APIRouter, UploadFile, File, Depends, HTTPException
+from fastapi import APIRouter, UploadFile, File, Depends, HTTPException, Query
+from fastapi.responses import StreamingResponse
+from starlette.concurrency import run_in_threadpool
 from sqlalchemy.orm import Session
-from datetime import datetime, date
-from app.database import get_db
-from app.models import Transaction, TransactionType, User
+import json
+import os
+import tempfile
+from app.config import settings
+from app.database import get_db, SessionLocal
 from app.auth import get_current_active_user
-import pandas as pd
-from io import BytesIO
+from app.services.user_cache import UserSnapshot
+from app.services.excel_import import SUPPORTED_EXTENSIONS, import_file
 
 router = APIRouter()
 
-def categorize_transaction(description: str) -> str:
-    """Categorização inteligente de transações"""
-    description_lower = description.lower()
-    
-    if any(word in description_lower for word in ["aluguel", "rent"]):
-        return "Aluguel"
-    elif any(word in description_lower for word in ["água", "agua", "water"]):
-        return "Água"
-    elif any(word in description_lower for word in ["luz", "light", "energy", "energia"]):
-        return "Luz"
-    elif any(word in description_lower for word in ["internet", "net"]):
-        return "Internet"
-    elif any(word in description_lower for word in ["das", "tax"]):
-        return "DAS"
-    elif any(word in description_lower for word in ["contabilidade", "accounting"]):
-        return "Contabilidade"
-    elif any(word in description_lower for word in ["mastercard", "credit", "cartão"]):
-        return "Credit Card"
-    else:
-        return "Other"
+UPLOAD_CHUNK_SIZE = 1024 * 1024
+
+async def spool_upload(file: UploadFile, extension: str) -> str:
+    """Copiar o upload para um arquivo temporário em blocos e retornar o caminho"""
+    max_bytes = settings.upload_max_size_mb * 1024 * 1024
+    handle = tempfile.NamedTemporaryFile(suffix=extension, delete=False)
+    size = 0
+    try:
+        with handle:
+            while chunk := await file.read(UPLOAD_CHUNK_SIZE):
+                size += len(chunk)
+                if size > max_bytes:
+                    raise HTTPException(
+                        status_code=413,
+                        detail=f"File too large (max {settings.upload_max_size_mb} MB)"
+                    )
+                handle.write(chunk)
+    except Exception:
+        os.remove(handle.name)
+        raise
+    return handle.name
+
+def _summary(progress: dict) -> dict:
+    return {
+        "message": f"Successfully imported {progress['count']} transactions",
+        "count": progress["count"],
+        "rows": progress["rows"],
+        "error_count": progress["error_count"],
+        "errors": progress["errors"]
+    }
+
+def _run_import(db: Session, user_id: int, path: str, extension: str) -> dict:
+    progress = {"rows": 0, "count": 0, "error_count": 0, "errors": []}
+    try:
+        for progress in import_file(db, user_id, path, extension, settings.upload_batch_size):
+            pass
+        db.commit()
+    except Exception as e:
+        db.rollback()
+        raise HTTPException(
+            status_code=400,
+            detail=f"Error processing file: {str(e)} (no transactions were imported)"
+        )
+    return _summary(progress)
+
+def _progress_events(user_id: int, path: str, extension: str):
+    """Linhas NDJSON com o progresso de cada lote e o resumo final
+
+    O progresso conta linhas processadas; elas só são gravadas no commit,
+    depois do último lote.
+    """
+    # A sessão da dependência já foi fechada quando a resposta é transmitida
+    db = SessionLocal()
+    progress = {"rows": 0, "count": 0, "error_count": 0, "errors": []}
+    try:
+        for progress in import_file(db, user_id, path, extension, settings.upload_batch_size):
+            yield json.dumps({
+                "event": "progress",
+                "rows": progress["rows"],
+                "count": progress["count"],
+                "error_count": progress["error_count"]
+            }) + "\n"
+        db.commit()
+        yield json.dumps({"event": "done", **_summary(progress)}, ensure_ascii=False) + "\n"
+    except Exception as e:
+        db.rollback()
+        yield json.dumps({
+            "event": "error",
+            "detail": f"Error processing file: {str(e)} (no transactions were imported)",
+            "count": 0
+        }, ensure_ascii=False) + "\n"
+    finally:
+        db.close()
+        os.remove(path)
 
 @router.post("/excel")
 async def upload_excel(
     file: UploadFile = File(...),
+    progress: bool = Query(False, description="Transmitir o progresso em NDJSON"),
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_active_user)
+    current_user: UserSnapshot = Depends(get_current_active_user)
 ):
-    """Upload e importação de planilha Excel"""
-    if not file.filename.endswith(('.xlsx', '.xls')):
-        raise HTTPException(status_code=400, detail="File must be Excel format (.xlsx or .xls)")
+    """Upload e importação de planilha Excel (.xlsx, .xls) ou CSV"""
+    extension = os.path.splitext(file.filename or "")[1].lower()
+    if extension not in SUPPORTED_EXTENSIONS:
+        raise HTTPException(status_code=400, detail="File must be Excel (.xlsx or .xls) or CSV (.csv)")
     
-    try:
-        contents = await file.read()
-        df = pd.read_excel(BytesIO(contents), header=None)
-        
-        transactions_imported = 0
-        
-        # Processar SAÍDAS (colunas 0-3)
-        for idx, row in df.iterrows():
-            # Pular cabeçalhos
-            if idx < 2:
-                continue
-            
-            # SAÍDA (Expenses) - colunas 0-3
-            destino = row.iloc[0] if pd.notna(row.iloc[0]) else None
-            valor_saida = row.iloc[1] if pd.notna(row.iloc[1]) else None
-            data_saida = row.iloc[2] if pd.notna(row.iloc[2]) else None
-            
-            if destino and pd.notna(valor_saida):
-                # Converter data se necessário
-                if isinstance(data_saida, datetime):
-                    date_obj = data_saida.date()
-                elif isinstance(data_saida, str):
-                    try:
-                        date_obj = datetime.strptime(data_saida, "%Y-%m-%d").date()
-                    except:
-                        date_obj = date.today()
-                else:
-                    date_obj = date.today()
-                
-                category = categorize_transaction(str(destino))
-                
-                transaction = Transaction(
-                    user_id=current_user.id,  # Associar transação ao usuário logado
-                    type="expense",
-                    description=str(destino),
-                    amount=float(valor_saida),
-                    date=date_obj,
-                    category=category,
-                    notes=row.iloc[3] if pd.notna(row.iloc[3]) else None
-                )
-                db.add(transaction)
-                transactions_imported += 1
-            
-            # SANGRIA (Income) - colunas 5-8
-            origem = row.iloc[5] if pd.notna(row.iloc[5]) else None
-            valor_sangria = row.iloc[6] if pd.notna(row.iloc[6]) else None
-            data_sangria = row.iloc[7] if pd.notna(row.iloc[7]) else None
-            
-            if origem and pd.notna(valor_sangria):
-                # Converter data se necessário
-                if isinstance(data_sangria, datetime):
-                    date_obj = data_sangria.date()
-                elif isinstance(data_sangria, str):
-                    try:
-                        date_obj = datetime.strptime(data_sangria, "%Y-%m-%d").date()
-                    except:
-                        date_obj = date.today()
-                else:
-                    date_obj = date.today()
-                
-                category = categorize_transaction(str(origem))
-                
-                transaction = Transaction(
-                    user_id=current_user.id,  # Associar transação ao usuário logado
-                    type="income",
-                    description=str(origem),
-                    amount=float(valor_sangria),
-                    date=date_obj,
-                    category=category,
-                    notes=row.iloc[8] if pd.notna(row.iloc[8]) else None
-                )
-                db.add(transaction)
-                transactions_imported += 1
-        
-        db.commit()
-        
-        return {
-            "message": f"Successfully imported {transactions_imported} transactions",
-            "count": transactions_imported
-        }
+    path = await spool_upload(file, extension)
     
-    except Exception as e:
-        db.rollback()
-        raise HTTPException(status_code=400, detail=f"Error processing file: {str(e)}")
-
+    if progress:
+        return StreamingResponse(
+            _progress_events(current_user.id, path, extension),
+            media_type="application/x-ndjson"
+        )
+    
+    try:
+        # Arquivo inteiro numa transação; linhas inválidas voltam em "errors"
+        return await run_in_threadpool(_run_import, db, current_user.id, path, extension)
+    finally:
+        os.remove(path)
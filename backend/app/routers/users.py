@@ -9,25 +9,13 @@ from app.models import User
 from app.schemas import UserCreate, UserResponse, UserUpdate
 from app.auth import get_current_admin_user, get_password_hash, verify_password
 from app.utils.password import validate_password_strength
-
-# Rate limiting opcional
-try:
-    from slowapi import Limiter
-    from slowapi.util import get_remote_address
-    limiter = Limiter(key_func=get_remote_address)
-    RATE_LIMITING_AVAILABLE = True
-except ImportError:
-    RATE_LIMITING_AVAILABLE = False
-    limiter = None
+from app.services.password_hashing import HashingPoolBusy
+from app.services.user_cache import UserSnapshot, user_cache
+from app.services.token_store import revoke_user_sessions
+from app.middleware.rate_limit import rate_limit
 
 router = APIRouter()
 
-# Decorator de rate limiting opcional
-def rate_limit(limit: str):
-    if RATE_LIMITING_AVAILABLE and limiter:
-        return limiter.limit(limit)
-    return lambda f: f
-
 @router.get("/", response_model=List[UserResponse])
 @rate_limit("60/minute")
 def get_users(
@@ -35,7 +23,7 @@ def get_users(
     skip: int = 0,
     limit: int = 100,
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_admin_user)
+    current_user: UserSnapshot = Depends(get_current_admin_user)
 ):
     """Listar todos os usuários (apenas admin)"""
     users = db.query(User).offset(skip).limit(limit).all()
@@ -45,7 +33,7 @@ def get_users(
 def get_user(
     user_id: int,
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_admin_user)
+    current_user: UserSnapshot = Depends(get_current_admin_user)
 ):
     """Obter usuário específico (apenas admin)"""
     user = db.query(User).filter(User.id == user_id).first()
@@ -62,7 +50,7 @@ def create_user(
     request: Request,
     user_data: UserCreate,
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_admin_user)
+    current_user: UserSnapshot = Depends(get_current_admin_user)
 ):
     """Criar novo usuário (apenas admin)"""
     # Validar força da senha
@@ -90,7 +78,14 @@ def create_user(
         )
     
     # Criar usuário
-    hashed_password = get_password_hash(user_data.password)
+    try:
+        hashed_password = get_password_hash(user_data.password)
+    except HashingPoolBusy:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Server busy, try again",
+            headers={"Retry-After": "1"},
+        )
     db_user = User(
         email=user_data.email,
         username=user_data.username,
@@ -111,7 +106,7 @@ def update_user(
     user_id: int,
     user_update: UserUpdate,
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_admin_user)
+    current_user: UserSnapshot = Depends(get_current_admin_user)
 ):
     """Atualizar usuário (apenas admin)"""
     db_user = db.query(User).filter(User.id == user_id).first()
@@ -163,17 +158,34 @@ def update_user(
                 detail="Username already taken"
             )
     
+    # Hash antes de alterar o usuário: com o pool cheio nada muda
+    hashed_password = None
+    if password_to_hash:
+        try:
+            hashed_password = get_password_hash(password_to_hash)
+        except HashingPoolBusy:
+            raise HTTPException(
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                detail="Server busy, try again",
+                headers={"Retry-After": "1"},
+            )
+    
     # Atualizar campos
     update_data = user_update.model_dump(exclude_unset=True)
     for field, value in update_data.items():
         if field == "password":
             # Senha já foi validada acima
-            if password_to_hash:
-                setattr(db_user, "hashed_password", get_password_hash(password_to_hash))
+            if hashed_password:
+                setattr(db_user, "hashed_password", hashed_password)
         else:
             setattr(db_user, field, value)
     
+    # Senha trocada ou usuário desativado: encerrar as sessões existentes
+    if password_to_hash or user_update.is_active is False:
+        revoke_user_sessions(db, db_user.id)
+    
     db.commit()
+    user_cache.invalidate(db_user.id)
     db.refresh(db_user)
     return db_user
 
@@ -183,7 +195,7 @@ def delete_user(
     request: Request,
     user_id: int,
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_admin_user)
+    current_user: UserSnapshot = Depends(get_current_admin_user)
 ):
     """Deletar usuário (apenas admin)"""
     db_user = db.query(User).filter(User.id == user_id).first()
@@ -201,6 +213,28 @@ def delete_user(
         )
     
     db.delete(db_user)
+    revoke_user_sessions(db, user_id)
     db.commit()
+    user_cache.invalidate(user_id)
     return {"message": "User deleted successfully"}
 
+
+@router.post("/{user_id}/revoke-sessions")
+@rate_limit("10/minute")
+def revoke_sessions(
+    request: Request,
+    user_id: int,
+    db: Session = Depends(get_db),
+    current_user: UserSnapshot = Depends(get_current_admin_user)
+):
+    """Encerrar todas as sessões de um usuário (apenas admin)"""
+    db_user = db.query(User).filter(User.id == user_id).first()
+    if not db_user:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="User not found"
+        )
+    
+    revoked = revoke_user_sessions(db, user_id)
+    db.commit()
+    return {"message": "Sessions revoked", "revoked": revoked}
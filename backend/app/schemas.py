@@ -1,8 +1,11 @@
 from pydantic import BaseModel, Field, field_validator, ConfigDict
 from datetime import date, datetime
-from typing import Optional, Union
+from typing import Any, Dict, List, Literal, Optional, Union
 from app.models import TransactionType
 
+# Alias: dentro de uma classe com um campo chamado `date` o nome deixa de ser o tipo
+DateType = date
+
 class TransactionBase(BaseModel):
     type: TransactionType
     subtype: Optional[str] = None  # fixed, sporadic, investment, received
@@ -22,7 +25,7 @@ class TransactionUpdate(BaseModel):
     subtype: Optional[str] = None
     description: Optional[str] = None
     amount: Optional[float] = Field(default=None, gt=0)
-    date: Optional[date] = None
+    date: Optional[DateType] = None
     category: Optional[str] = None
     notes: Optional[str] = None
     
@@ -48,6 +51,33 @@ class Transaction(TransactionBase):
     class Config:
         from_attributes = True
 
+# Operações em lote: os itens chegam crus e são validados um a um com
+# TransactionCreate/TransactionUpdate, para um item inválido não derrubar o lote
+class BulkTransactionCreate(BaseModel):
+    items: List[Dict[str, Any]]
+    atomic: bool = False
+
+class BulkTransactionUpdate(BaseModel):
+    items: List[Dict[str, Any]]  # {"id": ..., campos a alterar}
+    atomic: bool = False
+
+class BulkTransactionDelete(BaseModel):
+    ids: List[Any]
+    atomic: bool = False
+
+class BulkItemResult(BaseModel):
+    index: int
+    status: str  # created, updated, deleted, error, skipped
+    id: Optional[int] = None
+    error: Optional[str] = None
+
+class BulkTransactionResult(BaseModel):
+    atomic: bool
+    committed: bool
+    succeeded: int
+    failed: int
+    results: List[BulkItemResult]
+
 class DashboardStats(BaseModel):
     total_income: float
     total_expense: float
@@ -61,6 +91,21 @@ class DashboardStats(BaseModel):
     investments: float
     monthly_balance: float  # Recebidos do mês - Gastos do mês
 
+class TrendPoint(BaseModel):
+    period: str  # 2024-03-05, 2024-W10, 2024-03 ou 2024-Q1
+    start: DateType
+    end: DateType
+    income: float
+    expense: float
+    balance: float
+
+class TrendResponse(BaseModel):
+    granularity: Literal["day", "week", "month", "quarter"]
+    horizon: int
+    start: DateType
+    end: DateType
+    points: List[TrendPoint]
+
 class HourlyCalculationRequest(BaseModel):
     month: int  # 1-12
     year: int
@@ -84,6 +129,42 @@ class ReportRequest(BaseModel):
     category: Optional[str] = None
     format: str = "pdf"  # pdf or excel
 
+class ReportJobCreate(BaseModel):
+    format: Literal["pdf", "excel"] = "pdf"
+    start_date: Optional[date] = None
+    end_date: Optional[date] = None
+    transaction_type: Optional[TransactionType] = None
+    category: Optional[str] = None
+
+class ReportJobResponse(BaseModel):
+    id: str
+    format: str
+    status: str  # pending, running, done, failed
+    error: Optional[str] = None
+    created_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
+    expires_at: Optional[datetime] = None
+    
+    class Config:
+        from_attributes = True
+
+class CategoryRuleCreate(BaseModel):
+    keyword: str = Field(min_length=1, max_length=100)
+    category: str = Field(min_length=1, max_length=50)
+
+class CategoryRuleResponse(BaseModel):
+    id: int
+    keyword: str
+    category: str
+    created_at: Optional[datetime] = None
+    
+    class Config:
+        from_attributes = True
+
+class RecategorizeResponse(BaseModel):
+    checked: int
+    updated: int
+
 # Schemas de autenticação
 class UserBase(BaseModel):
     email: str
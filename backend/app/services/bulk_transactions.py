@@ -0,0 +1,223 @@
+"""
+Criação, atualização e remoção de transações em lote
+
+Cada item é validado com o mesmo schema das rotas unitárias
+(TransactionCreate/TransactionUpdate) e recebe o seu próprio resultado.
+Os itens válidos são gravados com uma instrução por lote (insert e delete
+com vários valores, update com executemany agrupado pelos campos
+alterados) e os agregados mensais são ajustados uma única vez.
+
+Com `atomic` basta um item inválido para nada ser gravado. As funções não
+fazem commit; a rota decide entre commit e rollback.
+"""
+from collections import defaultdict
+from typing import Any, Dict, List, Optional, Tuple
+from pydantic import ValidationError
+from sqlalchemy import bindparam, delete, insert, update
+from sqlalchemy.orm import Session
+from app.models import Transaction, TransactionType
+from app.schemas import TransactionCreate, TransactionUpdate
+from app.services.data_version import bump_data_version
+from app.services.rollups import add_transaction_delta, apply_rollup_deltas, new_deltas, normalize_category
+
+BULK_STATEMENT_SIZE = 500
+# Campos NOT NULL: null explícito em uma atualização é erro do item
+REQUIRED_FIELDS = ("type", "description", "amount", "date")
+
+def _enum_value(value):
+    return value.value if isinstance(value, TransactionType) else value
+
+def transaction_values(transaction: TransactionCreate) -> dict:
+    """Colunas de uma transação nova, normalizadas como na criação unitária"""
+    type_value = str(_enum_value(transaction.type))
+    if type_value not in ("expense", "income"):
+        raise ValueError(f"Tipo inválido: {type_value}")
+    subtype = str(transaction.subtype).strip() if transaction.subtype is not None else ""
+    return {
+        "type": type_value,
+        "subtype": subtype or None,
+        "description": transaction.description.strip() if transaction.description else "",
+        "amount": float(transaction.amount),
+        "date": transaction.date,
+        "category": normalize_category(transaction.category),
+        "notes": transaction.notes.strip() if transaction.notes else None,
+    }
+
+def update_values(update_data: dict) -> dict:
+    """Campos de uma atualização parcial, com a categoria normalizada como na criação"""
+    values = dict(update_data)
+    if "category" in values:
+        values["category"] = normalize_category(values["category"])
+    return values
+
+def format_validation_error(error: ValidationError) -> str:
+    return "; ".join(
+        f"{'.'.join(str(part) for part in item['loc']) or 'item'}: {item['msg']}"
+        for item in error.errors()
+    )
+
+def _result(index: int, status: str, transaction_id: Optional[int] = None, error: Optional[str] = None) -> dict:
+    return {"index": index, "status": status, "id": transaction_id, "error": error}
+
+def _summary(results: List[dict], atomic: bool, committed: bool) -> dict:
+    failed = sum(1 for result in results if result["status"] == "error")
+    return {
+        "atomic": atomic,
+        "committed": committed,
+        "succeeded": len(results) - failed if committed else 0,
+        "failed": failed,
+        "results": results,
+    }
+
+def _abort_if_atomic(results: List[dict], atomic: bool) -> Optional[dict]:
+    """Resumo sem gravação quando o lote é atômico e algum item falhou"""
+    if not atomic or not any(result["status"] == "error" for result in results):
+        return None
+    for result in results:
+        if result["status"] != "error":
+            result.update(status="skipped", id=None)
+    return _summary(results, atomic, committed=False)
+
+def _bump_if_written(db: Session, user_id: int, results: List[dict]) -> None:
+    if any(result["status"] != "error" for result in results):
+        bump_data_version(db, user_id)
+
+def _item_ids(items: List[Dict[str, Any]], results: List[dict], field: str = "id") -> Dict[int, int]:
+    """id -> posição no lote; ids ausentes, inválidos ou repetidos viram erro"""
+    positions: Dict[int, int] = {}
+    for index, item in enumerate(items):
+        value = item.get(field) if isinstance(item, dict) else item
+        if isinstance(value, bool) or not isinstance(value, int):
+            results[index] = _result(index, "error", error=f"{field}: inteiro obrigatório")
+        elif value in positions:
+            results[index] = _result(index, "error", value, "id repetido no lote")
+        else:
+            positions[value] = index
+    return positions
+
+def _load_owned(db: Session, user_id: int, ids) -> Dict[int, Transaction]:
+    found: Dict[int, Transaction] = {}
+    ids = list(ids)
+    for start in range(0, len(ids), BULK_STATEMENT_SIZE):
+        chunk = ids[start:start + BULK_STATEMENT_SIZE]
+        for transaction in db.query(Transaction).filter(
+            Transaction.user_id == user_id,
+            Transaction.id.in_(chunk)
+        ):
+            found[transaction.id] = transaction
+    return found
+
+def bulk_create(db: Session, user_id: int, items: List[Dict[str, Any]], atomic: bool = False) -> dict:
+    """Validar e inserir as transações novas (sem commit)"""
+    results: List[Optional[dict]] = [None] * len(items)
+    records: List[Tuple[int, dict]] = []
+    for index, item in enumerate(items):
+        try:
+            records.append((index, dict(transaction_values(TransactionCreate.model_validate(item)), user_id=user_id)))
+        except ValidationError as e:
+            results[index] = _result(index, "error", error=format_validation_error(e))
+        except ValueError as e:
+            results[index] = _result(index, "error", error=str(e))
+    for index, _ in records:
+        results[index] = _result(index, "created")
+
+    aborted = _abort_if_atomic(results, atomic)
+    if aborted:
+        return aborted
+
+    table = Transaction.__table__
+    # RETURNING na ordem dos parâmetros liga cada id ao item que o gerou
+    statement = insert(table).returning(table.c.id, sort_by_parameter_order=True)
+    deltas = new_deltas()
+    for start in range(0, len(records), BULK_STATEMENT_SIZE):
+        chunk = records[start:start + BULK_STATEMENT_SIZE]
+        ids = db.execute(statement, [values for _, values in chunk]).scalars().all()
+        for (index, values), transaction_id in zip(chunk, ids):
+            results[index]["id"] = transaction_id
+            add_transaction_delta(deltas, Transaction(**values))
+    apply_rollup_deltas(db, deltas)
+    _bump_if_written(db, user_id, results)
+    return _summary(results, atomic, committed=True)
+
+def bulk_update(db: Session, user_id: int, items: List[Dict[str, Any]], atomic: bool = False) -> dict:
+    """Aplicar atualizações parciais ({"id": ..., campos}) às transações do usuário (sem commit)"""
+    results: List[Optional[dict]] = [None] * len(items)
+    positions = _item_ids(items, results)
+    changes: Dict[int, dict] = {}
+    for transaction_id, index in positions.items():
+        fields = {key: value for key, value in items[index].items() if key != "id"}
+        try:
+            update_data = TransactionUpdate.model_validate(fields).model_dump(exclude_unset=True)
+        except ValidationError as e:
+            results[index] = _result(index, "error", transaction_id, format_validation_error(e))
+            continue
+        nulls = [field for field in REQUIRED_FIELDS if field in update_data and update_data[field] is None]
+        if nulls:
+            results[index] = _result(index, "error", transaction_id, f"{', '.join(nulls)}: não pode ser nulo")
+            continue
+        changes[transaction_id] = {key: _enum_value(value) for key, value in update_values(update_data).items()}
+
+    existing = _load_owned(db, user_id, changes)
+    for transaction_id in list(changes):
+        index = positions[transaction_id]
+        if transaction_id in existing:
+            results[index] = _result(index, "updated", transaction_id)
+        else:
+            results[index] = _result(index, "error", transaction_id, "Transaction not found")
+            del changes[transaction_id]
+
+    aborted = _abort_if_atomic(results, atomic)
+    if aborted:
+        return aborted
+
+    # Um executemany por conjunto de campos alterados
+    deltas = new_deltas()
+    groups: Dict[tuple, List[dict]] = defaultdict(list)
+    for transaction_id, update_data in changes.items():
+        transaction = existing[transaction_id]
+        add_transaction_delta(deltas, transaction, sign=-1)
+        for field, value in update_data.items():
+            setattr(transaction, field, value)
+        add_transaction_delta(deltas, transaction)
+        if update_data:
+            fields = tuple(sorted(update_data))
+            groups[fields].append(dict({f"_{field}": update_data[field] for field in fields}, _id=transaction_id))
+
+    table = Transaction.__table__
+    for fields, params in groups.items():
+        statement = update(table).where(table.c.id == bindparam("_id")).values(
+            **{field: bindparam(f"_{field}") for field in fields}
+        )
+        db.execute(statement, params)
+    # Os objetos já carregados têm os valores novos; não há nada a enviar pelo ORM
+    for transaction in existing.values():
+        db.expunge(transaction)
+    apply_rollup_deltas(db, deltas)
+    _bump_if_written(db, user_id, results)
+    return _summary(results, atomic, committed=True)
+
+def bulk_delete(db: Session, user_id: int, ids: List[int], atomic: bool = False) -> dict:
+    """Remover as transações do usuário pelos ids (sem commit)"""
+    results: List[Optional[dict]] = [None] * len(ids)
+    positions = _item_ids(ids, results)
+    existing = _load_owned(db, user_id, positions)
+    for transaction_id, index in positions.items():
+        if transaction_id in existing:
+            results[index] = _result(index, "deleted", transaction_id)
+        else:
+            results[index] = _result(index, "error", transaction_id, "Transaction not found")
+
+    aborted = _abort_if_atomic(results, atomic)
+    if aborted:
+        return aborted
+
+    deltas = new_deltas()
+    for transaction in existing.values():
+        add_transaction_delta(deltas, transaction, sign=-1)
+        db.expunge(transaction)
+    found = list(existing)
+    for start in range(0, len(found), BULK_STATEMENT_SIZE):
+        db.execute(delete(Transaction.__table__).where(Transaction.__table__.c.id.in_(found[start:start + BULK_STATEMENT_SIZE])))
+    apply_rollup_deltas(db, deltas)
+    _bump_if_written(db, user_id, results)
+    return _summary(results, atomic, committed=True)
@@ -0,0 +1,186 @@
+"""
+Categorização de transações por palavras-chave
+
+As regras embutidas e as regras do usuário (tabela category_rules) são
+compiladas em uma única expressão regular. Cada categoria vira um ramo
+`(?=.*\\b(?:palavra|outra)\\b)(?P<cN>)`; a alternância testa os ramos na
+ordem de prioridade e o primeiro que casar define a categoria. As
+palavras-chave só casam como palavras inteiras, então "net" não casa
+com "planeta" e "das" não casa com "vendas".
+
+Regras do usuário têm prioridade sobre as embutidas. O categorizador
+compilado fica em cache por usuário e é recompilado quando as regras mudam.
+"""
+import re
+import threading
+from collections import OrderedDict
+from types import SimpleNamespace
+from typing import Iterable, List, Optional, Tuple
+import numpy as np
+import pandas as pd
+from sqlalchemy import bindparam, func, or_, update
+from sqlalchemy.orm import Session
+from app.models import CategoryRule, Transaction
+from app.services.data_version import bump_data_version
+from app.services.rollups import add_transaction_delta, apply_rollup_deltas, new_deltas
+
+DEFAULT_CATEGORY = "Other"
+CACHE_SIZE = 256
+RECATEGORIZE_BATCH_SIZE = 1000
+
+# Regras na ordem de prioridade (a primeira que casar define a categoria)
+BUILTIN_RULES = [
+    ("Aluguel", ["aluguel", "rent"]),
+    ("Água", ["água", "agua", "water"]),
+    ("Luz", ["luz", "light", "energy", "energia"]),
+    ("Internet", ["internet", "net"]),
+    ("DAS", ["das", "tax"]),
+    ("Contabilidade", ["contabilidade", "accounting"]),
+    ("Credit Card", ["mastercard", "credit", "cartão"]),
+]
+
+def normalize_keyword(keyword: str) -> str:
+    return " ".join(keyword.lower().split())
+
+class Categorizer:
+    """Regras compiladas em uma única regex com prioridade por ordem"""
+
+    def __init__(self, rules: Iterable[Tuple[str, Iterable[str]]]):
+        # Agrupar palavras por categoria mantendo a primeira posição de cada categoria
+        grouped: "OrderedDict[str, List[str]]" = OrderedDict()
+        for category, keywords in rules:
+            words = grouped.setdefault(category, [])
+            words.extend(normalize_keyword(word) for word in keywords if word and word.strip())
+        self.categories = [category for category, words in grouped.items() if words]
+
+        branches = []
+        for index, category in enumerate(self.categories):
+            # Palavras mais longas primeiro para a alternância preferir o casamento completo
+            words = sorted(set(grouped[category]), key=len, reverse=True)
+            alternation = "|".join(re.escape(word).replace(r"\ ", r"\s+") for word in words)
+            branches.append(rf"(?=.*?\b(?:{alternation})\b)(?P<c{index}>)")
+        # Ancorada no início: categorize (match) e categorize_series (str.extract, que
+        # busca) testam só a posição 0; sem categoria, custa uma varredura por ramo e não por posição
+        self.pattern = re.compile(
+            r"\A(?:" + "|".join(branches) + ")", re.IGNORECASE | re.DOTALL
+        ) if branches else None
+
+    def categorize(self, description: Optional[str]) -> str:
+        """Categoria de uma descrição"""
+        if not description or self.pattern is None:
+            return DEFAULT_CATEGORY
+        match = self.pattern.match(description)
+        if not match:
+            return DEFAULT_CATEGORY
+        return self.categories[int(match.lastgroup[1:])]
+
+    def categorize_series(self, descriptions: pd.Series) -> pd.Series:
+        """Categorizar uma coluna inteira de descrições"""
+        if self.pattern is None or descriptions.empty:
+            return pd.Series(DEFAULT_CATEGORY, index=descriptions.index, dtype=object)
+        # Cada grupo vazio vale "" quando o ramo casou e NaN caso contrário
+        matched = descriptions.fillna("").astype(str).str.extract(self.pattern).notna().to_numpy()
+        categories = np.select(
+            [matched[:, index] for index in range(len(self.categories))],
+            self.categories,
+            default=DEFAULT_CATEGORY
+        )
+        return pd.Series(categories, index=descriptions.index, dtype=object)
+
+BUILTIN_CATEGORIZER = Categorizer(BUILTIN_RULES)
+
+def _rules_stamp(db: Session, user_id: int) -> tuple:
+    """Identificador barato do conjunto de regras do usuário"""
+    return tuple(db.query(
+        func.count(CategoryRule.id),
+        func.max(CategoryRule.id),
+        func.max(func.coalesce(CategoryRule.updated_at, CategoryRule.created_at))
+    ).filter(CategoryRule.user_id == user_id).one())
+
+def _build_categorizer(db: Session, user_id: int) -> Categorizer:
+    user_rules = db.query(CategoryRule.category, CategoryRule.keyword).filter(
+        CategoryRule.user_id == user_id
+    ).order_by(CategoryRule.id).all()
+    if not user_rules:
+        return BUILTIN_CATEGORIZER
+    return Categorizer([(category, [keyword]) for category, keyword in user_rules] + BUILTIN_RULES)
+
+_cache: "OrderedDict[int, Tuple[tuple, Categorizer]]" = OrderedDict()
+_cache_lock = threading.Lock()
+
+def get_categorizer(db: Session, user_id: int) -> Categorizer:
+    """Categorizador do usuário, recompilado apenas quando as regras mudam
+
+    O carimbo (quantidade, maior id, última alteração) também detecta
+    alterações feitas por outras réplicas.
+    """
+    stamp = _rules_stamp(db, user_id)
+    with _cache_lock:
+        cached = _cache.get(user_id)
+        if cached and cached[0] == stamp:
+            _cache.move_to_end(user_id)
+            return cached[1]
+
+    categorizer = _build_categorizer(db, user_id)
+    with _cache_lock:
+        _cache[user_id] = (stamp, categorizer)
+        _cache.move_to_end(user_id)
+        while len(_cache) > CACHE_SIZE:
+            _cache.popitem(last=False)
+    return categorizer
+
+def invalidate_categorizer(user_id: int) -> None:
+    """Descartar o categorizador em cache (chamado ao alterar regras)"""
+    with _cache_lock:
+        _cache.pop(user_id, None)
+
+def recategorize_transactions(db: Session, user_id: int, only_uncategorized: bool = False) -> dict:
+    """Reaplicar as regras às transações do usuário (sem commit)
+
+    Percorre as transações em lotes por id, categoriza cada lote de uma vez
+    e grava só as linhas em que alguma regra casou com outra categoria,
+    ajustando os agregados.
+    """
+    categorizer = get_categorizer(db, user_id)
+    table = Transaction.__table__
+    statement = update(table).where(table.c.id == bindparam("_id")).values(category=bindparam("_category"))
+    deltas = new_deltas()
+    checked = updated = 0
+    last_id = 0
+
+    while True:
+        query = db.query(
+            Transaction.id,
+            Transaction.user_id,
+            Transaction.date,
+            Transaction.type,
+            Transaction.subtype,
+            Transaction.category,
+            Transaction.amount,
+            Transaction.description
+        ).filter(Transaction.user_id == user_id, Transaction.id > last_id)
+        if only_uncategorized:
+            query = query.filter(or_(Transaction.category.is_(None), Transaction.category == DEFAULT_CATEGORY))
+        rows = query.order_by(Transaction.id).limit(RECATEGORIZE_BATCH_SIZE).all()
+        if not rows:
+            break
+        last_id = rows[-1].id
+        checked += len(rows)
+
+        new_categories = categorizer.categorize_series(pd.Series([row.description for row in rows], dtype=object))
+        changes = []
+        for row, category in zip(rows, new_categories.tolist()):
+            # Sem regra correspondente a categoria atual (talvez manual) é mantida
+            if category == DEFAULT_CATEGORY or (row.category or DEFAULT_CATEGORY) == category:
+                continue
+            changes.append({"_id": row.id, "_category": category})
+            add_transaction_delta(deltas, row, sign=-1)
+            add_transaction_delta(deltas, SimpleNamespace(**{**row._asdict(), "category": category}))
+        if changes:
+            db.execute(statement, changes)
+            updated += len(changes)
+
+    apply_rollup_deltas(db, deltas)
+    if updated:
+        bump_data_version(db, user_id)
+    return {"checked": checked, "updated": updated}
@@ -0,0 +1,201 @@
+"""
+Motor de agregação do dashboard
+
+Os valores de DashboardStats vêm da tabela monthly_rollups: a tendência
+de 12 meses e o saldo do mês atual sempre, e os totais filtrados quando o
+período coincide com meses inteiros. Para períodos parciais os totais
+filtrados saem de uma única varredura agrupada por tipo/subtipo/categoria
+em transactions. As transações recentes são uma consulta à parte.
+
+O cálculo tem duas etapas: load_dashboard_rows só consulta o banco e
+aggregate_dashboard_stats, sem acesso ao banco, monta o DashboardStats.
+A rota assíncrona roda a primeira na sessão assíncrona e a segunda no
+threadpool, fora do event loop.
+"""
+from dataclasses import dataclass
+from datetime import date
+from calendar import monthrange
+from typing import List, Optional
+from sqlalchemy import and_, func, true
+from sqlalchemy.orm import Session
+from app.models import Transaction
+from app.schemas import DashboardStats
+from app.services import rollups
+
+TREND_MONTHS = 12
+RECENT_LIMIT = 10
+
+def _shift_month(year: int, month: int, offset: int) -> tuple:
+    """Deslocar (ano, mês) por um número de meses"""
+    index = year * 12 + (month - 1) + offset
+    return index // 12, index % 12 + 1
+
+def _date_range_condition(start_date: Optional[date], end_date: Optional[date]):
+    conditions = []
+    if start_date:
+        conditions.append(Transaction.date >= start_date)
+    if end_date:
+        conditions.append(Transaction.date <= end_date)
+    return and_(*conditions) if conditions else true()
+
+def _aligned_month_range(start_date: Optional[date], end_date: Optional[date]):
+    """(primeiro, último) 'YYYY-MM' se o período cobre apenas meses inteiros, senão None"""
+    if start_date and start_date.day != 1:
+        return None
+    if end_date and end_date.day != monthrange(end_date.year, end_date.month)[1]:
+        return None
+    return (
+        rollups.year_month(start_date) if start_date else "0000-00",
+        rollups.year_month(end_date) if end_date else "9999-99"
+    )
+
+def trend_window(today: Optional[date] = None) -> tuple:
+    """Janela exata (primeiro dia, último dia) dos últimos 12 meses"""
+    today = today or date.today()
+    first_year, first_month = _shift_month(today.year, today.month, -(TREND_MONTHS - 1))
+    _, last_day = monthrange(today.year, today.month)
+    return date(first_year, first_month, 1), today.replace(day=last_day)
+
+def trend_months(today: Optional[date] = None) -> list:
+    """Chaves 'YYYY-MM' dos últimos 12 meses, do mais antigo ao atual"""
+    today = today or date.today()
+    keys = []
+    for offset in range(-(TREND_MONTHS - 1), 1):
+        year, month = _shift_month(today.year, today.month, offset)
+        keys.append(f"{year:04d}-{month:02d}")
+    return keys
+
+def _filtered_totals_from_transactions(db: Session, user_id: int, start_date, end_date) -> list:
+    """Linhas (type, subtype, category, total) do período, direto de transactions"""
+    return db.query(
+        Transaction.type,
+        Transaction.subtype,
+        Transaction.category,
+        func.sum(Transaction.amount)
+    ).filter(
+        Transaction.user_id == user_id,
+        _date_range_condition(start_date, end_date)
+    ).group_by(
+        Transaction.type,
+        Transaction.subtype,
+        Transaction.category
+    ).all()
+
+@dataclass(frozen=True)
+class DashboardRows:
+    """Linhas lidas do banco para montar o DashboardStats"""
+    months: List[str]
+    rollup_rows: list
+    filtered_rows: list
+    recent_transactions: List[dict]
+
+def load_dashboard_rows(
+    db: Session,
+    user_id: int,
+    start_date: Optional[date] = None,
+    end_date: Optional[date] = None,
+    today: Optional[date] = None
+) -> DashboardRows:
+    """Consultas do dashboard (agregados, totais filtrados e transações recentes)"""
+    today = today or date.today()
+    months = trend_months(today)
+    month_range = _aligned_month_range(start_date, end_date)
+
+    if month_range is not None:
+        # Período em meses inteiros: uma leitura dos agregados cobre tudo
+        first, last = month_range
+        rollup_rows = rollups.month_totals(db, user_id, min(first, months[0]), max(last, months[-1]))
+        filtered_rows = [
+            (type_, subtype, category, total)
+            for month_key, type_, subtype, category, total in rollup_rows
+            if first <= month_key <= last
+        ]
+    else:
+        rollup_rows = rollups.month_totals(db, user_id, months[0], months[-1])
+        filtered_rows = _filtered_totals_from_transactions(db, user_id, start_date, end_date)
+
+    recent_transactions = db.query(Transaction).filter(
+        Transaction.user_id == user_id,
+        _date_range_condition(start_date, end_date)
+    ).order_by(
+        Transaction.date.desc()
+    ).limit(RECENT_LIMIT).all()
+
+    return DashboardRows(
+        months=months,
+        rollup_rows=rollup_rows,
+        filtered_rows=filtered_rows,
+        # Dicionários, não instâncias do ORM: a agregação roda fora da sessão
+        recent_transactions=[{
+            "id": t.id,
+            "type": str(t.type),
+            "description": t.description,
+            "amount": t.amount,
+            "date": t.date.isoformat(),
+            "category": t.category
+        } for t in recent_transactions]
+    )
+
+def aggregate_dashboard_stats(rows: DashboardRows) -> DashboardStats:
+    """Montar o DashboardStats a partir das linhas (sem acesso ao banco)"""
+    months = rows.months
+    totals = {"income": 0.0, "expense": 0.0}
+    fixed_expenses = 0.0
+    sporadic_expenses = 0.0
+    investments = 0.0
+    expense_by_category = {}
+    income_by_category = {}
+
+    for type_, subtype, category, total in rows.filtered_rows:
+        total = float(total or 0)
+        if type_ not in totals or not total:
+            continue
+
+        totals[type_] += total
+        by_category = income_by_category if type_ == "income" else expense_by_category
+        category_key = category or "Other"
+        by_category[category_key] = by_category.get(category_key, 0.0) + total
+
+        if type_ == "expense" and subtype == "fixed":
+            fixed_expenses += total
+        elif type_ == "expense" and subtype == "sporadic":
+            sporadic_expenses += total
+        elif type_ == "income" and subtype == "investment":
+            investments += total
+
+    trend = {key: {"income": 0.0, "expense": 0.0} for key in months}
+    for month_key, type_, _subtype, _category, total in rows.rollup_rows:
+        if month_key in trend and type_ in totals:
+            trend[month_key][type_] += float(total or 0)
+
+    current_month = trend[months[-1]]
+    monthly_balance = current_month["income"] - current_month["expense"]
+
+    monthly_trend = [
+        {"month": key, "income": values["income"], "expense": values["expense"]}
+        for key, values in trend.items()
+    ]
+
+    return DashboardStats(
+        total_income=totals["income"],
+        total_expense=totals["expense"],
+        balance=totals["income"] - totals["expense"],
+        expense_by_category=expense_by_category,
+        income_by_category=income_by_category,
+        monthly_trend=monthly_trend,
+        recent_transactions=rows.recent_transactions,
+        fixed_expenses=fixed_expenses,
+        sporadic_expenses=sporadic_expenses,
+        investments=investments,
+        monthly_balance=monthly_balance
+    )
+
+def compute_dashboard_stats(
+    db: Session,
+    user_id: int,
+    start_date: Optional[date] = None,
+    end_date: Optional[date] = None,
+    today: Optional[date] = None
+) -> DashboardStats:
+    """Calcular as estatísticas do dashboard de um usuário (as duas etapas na mesma thread)"""
+    return aggregate_dashboard_stats(load_dashboard_rows(db, user_id, start_date, end_date, today))
@@ -0,0 +1,46 @@
+"""
+Versão dos dados por usuário (tabela user_data_versions)
+
+Todo caminho que escreve em transactions chama `bump_data_version` na
+mesma transação do banco, como faz com os agregados mensais. Ler a
+versão é uma busca pela chave primária, então ela serve de chave de
+invalidação barata: ETags das rotas de leitura, deduplicação de
+relatórios e caches.
+"""
+from sqlalchemy import func, select
+from sqlalchemy.orm import Session
+from app.models import UserDataVersion
+
+def _upsert_statement(dialect_name: str):
+    if dialect_name == "sqlite":
+        from sqlalchemy.dialects.sqlite import insert
+    elif dialect_name == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert
+    else:
+        return None
+    stmt = insert(UserDataVersion)
+    return stmt.on_conflict_do_update(
+        index_elements=["user_id"],
+        set_={"version": UserDataVersion.version + 1, "updated_at": func.now()}
+    )
+
+def bump_data_version(db: Session, user_id: int) -> None:
+    """Incrementar a versão dos dados do usuário na sessão atual (sem commit)"""
+    stmt = _upsert_statement(db.get_bind().dialect.name)
+    if stmt is not None:
+        db.execute(stmt, {"user_id": user_id, "version": 1})
+        return
+    row = db.get(UserDataVersion, user_id)
+    if row:
+        row.version += 1
+    else:
+        db.add(UserDataVersion(user_id=user_id, version=1))
+    db.flush()
+
+def data_version_query(user_id: int):
+    """SELECT da versão, para sessões síncronas e assíncronas"""
+    return select(UserDataVersion.version).where(UserDataVersion.user_id == user_id)
+
+def get_data_version(db: Session, user_id: int) -> int:
+    """Versão atual dos dados do usuário (0 se ele nunca escreveu)"""
+    return db.execute(data_version_query(user_id)).scalar() or 0
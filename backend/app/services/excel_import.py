@@ -0,0 +1,245 @@
+"""
+Importação vetorizada da planilha de transações (Excel ou CSV)
+
+Layout da planilha (sem cabeçalho; os dados começam na 3ª linha):
+    colunas 0-3: SAÍDA   (destino, valor, data, observação) -> expense
+    colunas 5-8: SANGRIA (origem, valor, data, observação)  -> income
+
+O arquivo é lido linha a linha (openpyxl em modo read-only ou csv) e
+processado em lotes de tamanho fixo, então a memória não depende do
+tamanho do arquivo. Em cada lote os blocos são validados coluna a coluna
+com pandas: datas, valores e categorias (app/services/categorizer.py) são
+calculados para a coluna inteira de uma vez. Linhas inválidas viram erros
+por linha e as válidas são inseridas com executemany.
+"""
+import csv
+from datetime import date
+from typing import Iterable, Iterator, List, Optional
+import pandas as pd
+from openpyxl import load_workbook
+from sqlalchemy import insert
+from sqlalchemy.orm import Session
+from app.models import Transaction
+from app.services.categorizer import BUILTIN_CATEGORIZER, Categorizer, get_categorizer
+from app.services.data_version import bump_data_version
+from app.services.rollups import apply_rollup_deltas, new_deltas, rollup_key
+
+HEADER_ROWS = 2
+SHEET_COLUMNS = 9
+IMPORT_BATCH_SIZE = 1000
+MAX_REPORTED_ERRORS = 1000
+SUPPORTED_EXTENSIONS = (".xlsx", ".xls", ".csv")
+DATE_FORMATS = ("%Y-%m-%d", "%d/%m/%Y", "%Y-%m-%d %H:%M:%S")
+EXCEL_EPOCH = "1899-12-30"
+MAX_EXCEL_SERIAL = 2958465  # 31/12/9999
+CSV_DELIMITERS = (";", ",", "\t")
+CSV_SNIFF_BYTES = 64 * 1024
+
+# (tipo, primeira coluna do bloco, nome do bloco nas mensagens de erro)
+SHEET_BLOCKS = (
+    ("expense", 0, "SAÍDA"),
+    ("income", 5, "SANGRIA"),
+)
+
+def _strip_text(values: pd.Series) -> pd.Series:
+    if values.dtype != object:
+        return values
+    return values.map(lambda value: value.strip() if isinstance(value, str) else value)
+
+def parse_dates(values: pd.Series) -> pd.Series:
+    """Converter uma coluna de datas (NaT onde não for possível)
+
+    Aceita células de data do Excel, texto AAAA-MM-DD ou DD/MM/AAAA e
+    números seriais do Excel.
+    """
+    cleaned = _strip_text(values)
+    parsed = pd.to_datetime(cleaned, errors="coerce", format=DATE_FORMATS[0])
+    for date_format in DATE_FORMATS[1:]:
+        parsed = parsed.fillna(pd.to_datetime(cleaned.where(parsed.isna()), errors="coerce", format=date_format))
+    serial = pd.to_numeric(cleaned.where(parsed.isna()), errors="coerce")
+    serial = serial.where((serial > 0) & (serial <= MAX_EXCEL_SERIAL))
+    return parsed.fillna(pd.to_datetime(serial, unit="D", origin=EXCEL_EPOCH, errors="coerce"))
+
+def parse_amounts(values: pd.Series) -> pd.Series:
+    """Converter uma coluna de valores (NaN onde não for possível)
+
+    Texto com vírgula é lido no formato brasileiro ("1.234,56", "R$ 10,00").
+    """
+    amounts = pd.to_numeric(values, errors="coerce")
+    if values.dtype != object:
+        return amounts
+    text = values[values.map(lambda value: isinstance(value, str))].str.strip()
+    if text.empty:
+        return amounts
+    text = text.str.replace(r"^R\$\s*", "", regex=True)
+    decimal_comma = text.str.contains(",", regex=False)
+    text = text.where(~decimal_comma, text.str.replace(".", "", regex=False).str.replace(",", ".", regex=False))
+    return amounts.fillna(pd.to_numeric(text, errors="coerce"))
+
+def _row_errors(rows: pd.Index, block: str, message: str) -> List[dict]:
+    # Número da linha como aparece na planilha (1-based)
+    return [{"row": int(row) + 1, "block": block, "error": message} for row in rows]
+
+def parse_block(
+    df: pd.DataFrame,
+    transaction_type: str,
+    first_column: int,
+    block: str,
+    categorizer: Categorizer = BUILTIN_CATEGORIZER,
+    today: Optional[date] = None
+):
+    """Validar um bloco da planilha e retornar (DataFrame de transações, erros)"""
+    today = today or date.today()
+    columns = df.iloc[:, first_column:first_column + 4]
+    columns.columns = ["description", "amount", "date", "notes"]
+
+    # Linhas sem descrição ou sem valor são ignoradas (como células vazias)
+    description_text = columns["description"].astype(str).str.strip()
+    present = columns["description"].notna() & (description_text != "") & columns["amount"].notna()
+    columns = columns[present]
+    description_text = description_text[present]
+    errors = []
+
+    amounts = parse_amounts(columns["amount"])
+    bad_amount = amounts.isna()
+    errors += _row_errors(columns.index[bad_amount], block, "Valor inválido")
+    non_positive = ~bad_amount & (amounts <= 0)
+    errors += _row_errors(columns.index[non_positive], block, "Valor deve ser maior que zero")
+
+    dates = parse_dates(columns["date"])
+    missing_date = columns["date"].isna()
+    bad_date = ~missing_date & dates.isna()
+    errors += _row_errors(columns.index[bad_date], block, "Data inválida (use AAAA-MM-DD, DD/MM/AAAA ou uma célula de data)")
+
+    valid = ~(bad_amount | non_positive | bad_date)
+    parsed = pd.DataFrame({
+        "type": transaction_type,
+        "description": description_text[valid],
+        "amount": amounts[valid].astype(float),
+        "date": dates[valid].where(~missing_date[valid], pd.Timestamp(today)),
+        "notes": columns["notes"][valid].astype(str).where(columns["notes"][valid].notna(), None),
+    })
+    parsed["category"] = categorizer.categorize_series(parsed["description"])
+    return parsed, errors
+
+def parse_rows(df: pd.DataFrame, categorizer: Categorizer = BUILTIN_CATEGORIZER, today: Optional[date] = None):
+    """Validar linhas de dados (sem cabeçalho) e retornar (DataFrame de transações, erros por linha)"""
+    df = df.reindex(columns=range(SHEET_COLUMNS))
+    frames, errors = [], []
+    for transaction_type, first_column, block in SHEET_BLOCKS:
+        frame, block_errors = parse_block(df, transaction_type, first_column, block, categorizer, today)
+        frames.append(frame)
+        errors += block_errors
+    errors.sort(key=lambda error: (error["row"], error["block"]))
+    return pd.concat(frames), errors
+
+def parse_sheet(df: pd.DataFrame, categorizer: Categorizer = BUILTIN_CATEGORIZER, today: Optional[date] = None):
+    """Validar a planilha inteira já carregada (com as linhas de cabeçalho)"""
+    return parse_rows(df.iloc[HEADER_ROWS:], categorizer, today)
+
+def _rollup_deltas(user_id: int, transactions: pd.DataFrame):
+    """Deltas dos agregados mensais somados por grupo, sem percorrer as linhas"""
+    deltas = new_deltas()
+    if transactions.empty:
+        return deltas
+    dates = transactions["date"].dt
+    grouped = transactions.groupby([dates.year, dates.month, "type", "category"])["amount"].agg(["sum", "count"])
+    for (year, month, type_, category), total, count in zip(grouped.index, grouped["sum"].tolist(), grouped["count"].tolist()):
+        key = rollup_key(user_id, date(int(year), int(month), 1), type_, None, category)
+        deltas[key][0] += float(total)
+        deltas[key][1] += int(count)
+    return deltas
+
+def insert_transactions(db: Session, user_id: int, transactions: pd.DataFrame, batch_size: int = IMPORT_BATCH_SIZE) -> int:
+    """Inserir as transações em lotes e atualizar os agregados (sem commit)"""
+    columns = ["type", "description", "amount", "date", "category", "notes"]
+    # Listas de tipos nativos do Python, bem mais rápido que to_dict("records")
+    values = [
+        transactions["date"].dt.date.tolist() if column == "date" else transactions[column].tolist()
+        for column in columns
+    ]
+    records = [dict(zip(columns, row), user_id=user_id) for row in zip(*values)]
+    statement = insert(Transaction.__table__)
+    for start in range(0, len(records), batch_size):
+        db.execute(statement, records[start:start + batch_size])
+    apply_rollup_deltas(db, _rollup_deltas(user_id, transactions))
+    if records:
+        bump_data_version(db, user_id)
+    return len(records)
+
+def import_dataframe(db: Session, user_id: int, df: pd.DataFrame) -> dict:
+    """Importar a planilha já lida e retornar contagem e erros (sem commit)"""
+    transactions, errors = parse_sheet(df, get_categorizer(db, user_id))
+    imported = insert_transactions(db, user_id, transactions)
+    return {"count": imported, "errors": errors}
+
+# Leitura linha a linha do arquivo enviado
+
+def iter_xlsx_rows(path: str) -> Iterator[tuple]:
+    workbook = load_workbook(path, read_only=True, data_only=True)
+    try:
+        yield from workbook.active.iter_rows(values_only=True)
+    finally:
+        workbook.close()
+
+def _csv_delimiter(sample: str) -> str:
+    # O separador mais frequente na primeira linha (";" nas planilhas em português)
+    first_line = next((line for line in sample.splitlines() if line.strip()), "")
+    return max(CSV_DELIMITERS, key=first_line.count) if first_line else ","
+
+def iter_csv_rows(path: str) -> Iterator[list]:
+    """Linhas do CSV (separador ; , ou tab detectado), células vazias como None"""
+    with open(path, newline="", encoding="utf-8-sig") as handle:
+        delimiter = _csv_delimiter(handle.read(CSV_SNIFF_BYTES))
+        handle.seek(0)
+        for row in csv.reader(handle, delimiter=delimiter):
+            yield [value.strip() or None for value in row]
+
+def iter_xls_rows(path: str) -> Iterator[tuple]:
+    # Formato binário antigo: sem leitura em streaming, carregado pelo pandas
+    df = pd.read_excel(path, header=None)
+    yield from df.itertuples(index=False, name=None)
+
+def iter_file_rows(path: str, extension: str) -> Iterator:
+    readers = {".xlsx": iter_xlsx_rows, ".csv": iter_csv_rows, ".xls": iter_xls_rows}
+    return readers[extension](path)
+
+def _batch_frame(batch: list, first_index: int) -> pd.DataFrame:
+    # dtype object preserva os valores como lidos (7 continua "7" nas observações)
+    return pd.DataFrame(batch, index=range(first_index, first_index + len(batch)), dtype=object)
+
+def iter_row_batches(rows: Iterable, batch_size: int = IMPORT_BATCH_SIZE) -> Iterator[pd.DataFrame]:
+    """Agrupar as linhas de dados em DataFrames indexados pelo número da linha"""
+    batch, first_index = [], HEADER_ROWS
+    for index, row in enumerate(rows):
+        if index < HEADER_ROWS:
+            continue
+        if not batch:
+            first_index = index
+        batch.append(tuple(row[:SHEET_COLUMNS]))
+        if len(batch) >= batch_size:
+            yield _batch_frame(batch, first_index)
+            batch = []
+    if batch:
+        yield _batch_frame(batch, first_index)
+
+def import_file(db: Session, user_id: int, path: str, extension: str, batch_size: int = IMPORT_BATCH_SIZE) -> Iterator[dict]:
+    """Importar um arquivo em lotes, tudo numa única transação (sem commit)
+
+    Cada lote é enviado ao banco assim que é lido, mas nada é confirmado:
+    quem chama faz o commit ao fim do arquivo ou o rollback em caso de erro,
+    então uma falha no meio não deixa uma importação parcial (que duplicaria
+    linhas ao reenviar o arquivo).
+
+    Produz o progresso acumulado após cada lote. Apenas os primeiros
+    MAX_REPORTED_ERRORS erros são guardados; `error_count` tem o total.
+    """
+    categorizer = get_categorizer(db, user_id)
+    progress = {"rows": 0, "count": 0, "error_count": 0, "errors": []}
+    for df in iter_row_batches(iter_file_rows(path, extension), batch_size):
+        transactions, errors = parse_rows(df, categorizer)
+        progress["count"] += insert_transactions(db, user_id, transactions)
+        progress["rows"] += len(df)
+        progress["error_count"] += len(errors)
+        progress["errors"] += errors[:MAX_REPORTED_ERRORS - len(progress["errors"])]
+        yield progress
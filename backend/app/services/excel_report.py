@@ -0,0 +1,61 @@
+"""
+Exportação de transações para Excel em modo streaming
+
+As linhas chegam de um iterador (normalmente uma consulta com yield_per) e
+são gravadas por uma planilha openpyxl write-only, que despeja o XML em
+disco à medida que as linhas são adicionadas. O arquivo final fica em um
+arquivo temporário e é enviado ao cliente em blocos, de modo que a memória
+não cresce com o número de linhas.
+"""
+from typing import BinaryIO, Iterable
+from openpyxl import Workbook
+from openpyxl.cell import WriteOnlyCell
+from openpyxl.styles import Alignment, Font, PatternFill
+
+SHEET_TITLE = "Transações"
+COLUMNS = [
+    ("Data", 12),
+    ("Tipo", 12),
+    ("Descrição", 30),
+    ("Categoria", 15),
+    ("Valor", 15),
+    ("Observações", 30),
+]
+
+def _header_row(worksheet):
+    fill = PatternFill(start_color="6366F1", end_color="6366F1", fill_type="solid")
+    font = Font(color="FFFFFF", bold=True)
+    alignment = Alignment(horizontal="center")
+    cells = []
+    for title, _width in COLUMNS:
+        cell = WriteOnlyCell(worksheet, value=title)
+        cell.fill = fill
+        cell.font = font
+        cell.alignment = alignment
+        cells.append(cell)
+    return cells
+
+def write_transactions_xlsx(rows: Iterable, output: BinaryIO) -> int:
+    """Gravar linhas (date, type, description, category, amount, notes) em `output`"""
+    workbook = Workbook(write_only=True)
+    worksheet = workbook.create_sheet(SHEET_TITLE)
+
+    for index, (_title, width) in enumerate(COLUMNS):
+        worksheet.column_dimensions[chr(ord("A") + index)].width = width
+
+    worksheet.append(_header_row(worksheet))
+
+    count = 0
+    for transaction_date, type_, description, category, amount, notes in rows:
+        worksheet.append([
+            transaction_date.strftime("%d/%m/%Y"),
+            "Receita" if type_ == "income" else "Despesa",
+            description,
+            category or "Outro",
+            amount,
+            notes or "",
+        ])
+        count += 1
+
+    workbook.save(output)
+    return count
@@ -0,0 +1,152 @@
+"""
+Métricas em processo no formato de texto do Prometheus
+
+Contadores, gauges e histogramas mínimos (sem dependências) para
+/api/metrics. Os rótulos são tuplas na ordem de `labelnames`; cada métrica
+tem seu lock, porque rotas síncronas rodam no threadpool.
+"""
+import bisect
+import threading
+from typing import Dict, Iterable, List, Sequence, Tuple
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+def _labels(names: Sequence[str], values: Sequence, extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+def _number(value: float) -> str:
+    return str(int(value)) if float(value).is_integer() else repr(float(value))
+
+class _Metric:
+    kind = "untyped"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+
+    def header(self) -> List[str]:
+        return [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._values: Dict[tuple, float] = {}
+
+    def inc(self, labels: tuple = (), amount: float = 1) -> None:
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def render(self) -> List[str]:
+        with self._lock:
+            values = sorted(self._values.items())
+        return self.header() + [
+            f"{self.name}{_labels(self.labelnames, labels)} {_number(value)}" for labels, value in values
+        ]
+
+class Gauge(Counter):
+    kind = "gauge"
+
+    def dec(self, labels: tuple = (), amount: float = 1) -> None:
+        self.inc(labels, -amount)
+
+    def set(self, labels: tuple = (), value: float = 0) -> None:
+        with self._lock:
+            self._values[labels] = value
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (), buckets: Sequence[float] = LATENCY_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # rótulos -> [contagem por balde (+Inf no fim), soma]
+        self._values: Dict[tuple, list] = {}
+
+    def observe(self, labels: tuple, value: float) -> None:
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            entry = self._values.get(labels)
+            if entry is None:
+                entry = self._values[labels] = [[0] * (len(self.buckets) + 1), 0.0]
+            entry[0][index] += 1
+            entry[1] += value
+
+    def render(self) -> List[str]:
+        with self._lock:
+            values = sorted((labels, (list(counts), total)) for labels, (counts, total) in self._values.items())
+        lines = self.header()
+        bounds = [_number(bound) for bound in self.buckets] + ["+Inf"]
+        for labels, (counts, total) in values:
+            cumulative = 0
+            for bound, count in zip(bounds, counts):
+                cumulative += count
+                le = f'le="{bound}"'
+                lines.append(f"{self.name}_bucket{_labels(self.labelnames, labels, le)} {cumulative}")
+            lines.append(f"{self.name}_sum{_labels(self.labelnames, labels)} {_number(total)}")
+            lines.append(f"{self.name}_count{_labels(self.labelnames, labels)} {cumulative}")
+        return lines
+
+class Registry:
+    def __init__(self):
+        self._metrics: List[_Metric] = []
+
+    def register(self, metric: _Metric) -> _Metric:
+        self._metrics.append(metric)
+        return metric
+
+    def counter(self, *args, **kwargs) -> Counter:
+        return self.register(Counter(*args, **kwargs))
+
+    def gauge(self, *args, **kwargs) -> Gauge:
+        return self.register(Gauge(*args, **kwargs))
+
+    def histogram(self, *args, **kwargs) -> Histogram:
+        return self.register(Histogram(*args, **kwargs))
+
+    def render(self) -> List[str]:
+        lines = []
+        for metric in self._metrics:
+            lines.extend(metric.render())
+        return lines
+
+# Chaves das estatísticas que só crescem: viram counters `<prefix>_<chave>_total`
+COUNTER_KEYS = frozenset((
+    "checkouts", "timeouts", "completed", "rejected", "hits", "misses",
+    "coalesced", "errors", "checks", "dropped", "suppressed",
+))
+
+def render_stats(prefix: str, samples: Iterable[Tuple[dict, dict]]) -> List[str]:
+    """Métricas `<prefix>_<chave>` a partir dos dicts de estatísticas (ex.: pool_stats())
+
+    `samples` são pares (rótulos, estatísticas); valores não numéricos são
+    ignorados e booleanos viram 0/1. As chaves de COUNTER_KEYS saem como
+    counters com sufixo `_total`; as demais, como gauges.
+    """
+    series: Dict[str, Tuple[str, List[str]]] = {}
+    for labels, stats in samples:
+        for key, value in stats.items():
+            if isinstance(value, bool):
+                value = int(value)
+            if not isinstance(value, (int, float)):
+                continue
+            kind, name = ("counter", f"{prefix}_{key}_total") if key in COUNTER_KEYS else ("gauge", f"{prefix}_{key}")
+            series.setdefault(name, (kind, []))[1].append(
+                f"{name}{_labels(list(labels), list(labels.values()))} {_number(value)}"
+            )
+    lines = []
+    for name, (kind, samples_lines) in series.items():
+        lines.append(f"# TYPE {name} {kind}")
+        lines.extend(samples_lines)
+    return lines
+
+registry = Registry()
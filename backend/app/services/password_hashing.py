@@ -0,0 +1,104 @@
+"""
+Hash e verificação de senhas em um pool dedicado
+
+bcrypt é intencionalmente caro. As operações rodam em um pool de threads
+próprio e limitado (a implementação em C libera o GIL), fora do event
+loop e do threadpool compartilhado das rotas, então um pico de logins
+ocupa no máximo PASSWORD_HASH_WORKERS núcleos. Acima de
+PASSWORD_HASH_MAX_QUEUE operações pendentes novos pedidos falham com
+HashingPoolBusy, que as rotas traduzem para 503 (os scripts síncronos
+usam o mesmo pool e só veem a exceção).
+
+O custo (BCRYPT_ROUNDS) é configurável; hashes com outro custo são
+refeitos de forma transparente no próximo login bem-sucedido.
+"""
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional, Tuple
+from passlib.context import CryptContext
+from app.config import settings
+
+pwd_context = CryptContext(
+    schemes=["bcrypt"],
+    deprecated="auto",
+    bcrypt__default_rounds=settings.bcrypt_rounds,
+    # Mínimo e máximo iguais ao padrão: qualquer hash com outro custo precisa ser refeito
+    bcrypt__min_rounds=settings.bcrypt_rounds,
+    bcrypt__max_rounds=settings.bcrypt_rounds
+)
+
+class HashingPoolBusy(Exception):
+    """Fila do pool de hash cheia; tente novamente em instantes"""
+
+_executor: Optional[ThreadPoolExecutor] = None
+_lock = threading.Lock()
+_queued = 0
+_running = 0
+_completed = 0
+_rejected = 0
+
+def hashing_stats() -> dict:
+    """Profundidade da fila e contadores do pool de hash"""
+    with _lock:
+        return {
+            "workers": settings.password_hash_workers,
+            "queue_depth": _queued,
+            "running": _running,
+            "completed": _completed,
+            "rejected": _rejected,
+        }
+
+def _get_executor() -> ThreadPoolExecutor:
+    global _executor
+    with _lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=settings.password_hash_workers,
+                thread_name_prefix="password-hash"
+            )
+        return _executor
+
+def _tracked(func, *args):
+    global _queued, _running, _completed
+    with _lock:
+        _queued -= 1
+        _running += 1
+    try:
+        return func(*args)
+    finally:
+        with _lock:
+            _running -= 1
+            _completed += 1
+
+def _submit(func, *args):
+    global _queued, _rejected
+    with _lock:
+        if _queued >= settings.password_hash_max_queue:
+            _rejected += 1
+            raise HashingPoolBusy(f"{_queued} operações de hash na fila")
+        _queued += 1
+    try:
+        return _get_executor().submit(_tracked, func, *args)
+    except Exception:
+        with _lock:
+            _queued -= 1
+        raise
+
+def hash_password(password: str) -> str:
+    return _submit(pwd_context.hash, password).result()
+
+def verify_password(plain_password: str, hashed_password: str) -> bool:
+    return _submit(pwd_context.verify, plain_password, hashed_password).result()
+
+async def verify_and_update_async(plain_password: str, hashed_password: str) -> Tuple[bool, Optional[str]]:
+    """Verificar a senha e, se o custo mudou, retornar também o novo hash"""
+    return await asyncio.wrap_future(_submit(pwd_context.verify_and_update, plain_password, hashed_password))
+
+def shutdown_password_hashing() -> None:
+    """Encerrar o pool (recriado sob demanda se voltar a ser usado)"""
+    global _executor
+    with _lock:
+        executor, _executor = _executor, None
+    if executor is not None:
+        executor.shutdown(wait=False, cancel_futures=True)
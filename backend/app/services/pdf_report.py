@@ -0,0 +1,183 @@
+"""
+Renderização incremental do relatório PDF
+
+Em vez de montar uma única Table com todas as transações e chamar
+doc.build no final, cada página recebe sua própria Table de tamanho fixo,
+desenhada direto no canvas à medida que as linhas chegam do cursor. O
+layout de cada página é independente do total de linhas, então o tempo
+cresce linearmente e a memória fica limitada a uma página.
+"""
+from typing import BinaryIO, Iterable
+from reportlab.lib import colors
+from reportlab.lib.enums import TA_CENTER
+from reportlab.lib.pagesizes import A4
+from reportlab.lib.styles import ParagraphStyle, getSampleStyleSheet
+from reportlab.lib.units import inch
+from reportlab.pdfbase.pdfmetrics import stringWidth
+from reportlab.pdfgen.canvas import Canvas
+from reportlab.platypus import Paragraph, Table, TableStyle
+
+PAGE_WIDTH, PAGE_HEIGHT = A4
+TOP_MARGIN = 0.5 * inch
+BOTTOM_MARGIN = 0.6 * inch
+ROW_HEIGHT = 18
+COLUMN_WIDTHS = [1 * inch, 1 * inch, 2.4 * inch, 1.5 * inch, 1.5 * inch]
+CONTENT_WIDTH = sum(COLUMN_WIDTHS)
+LEFT_MARGIN = (PAGE_WIDTH - CONTENT_WIDTH) / 2
+TRANSACTION_HEADER = ['Data', 'Tipo', 'Descrição', 'Categoria', 'Valor']
+BODY_FONT = 'Helvetica'
+BODY_FONT_SIZE = 10
+CELL_PADDING = 12
+
+SUMMARY_STYLE = TableStyle([
+    ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#6366f1')),
+    ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
+    ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
+    ('ALIGN', (1, 0), (2, -1), 'RIGHT'),
+    ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
+    ('FONTSIZE', (0, 0), (-1, 0), 14),
+    ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
+    ('BACKGROUND', (0, 1), (-1, -1), colors.beige),
+    ('GRID', (0, 0), (-1, -1), 1, colors.black),
+    ('ROWBACKGROUNDS', (0, 1), (-1, -1), [colors.white, colors.lightgrey])
+])
+
+TRANSACTIONS_STYLE = TableStyle([
+    ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#6366f1')),
+    ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
+    ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
+    ('ALIGN', (4, 0), (4, -1), 'RIGHT'),
+    ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
+    ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
+    ('FONTSIZE', (0, 0), (-1, -1), BODY_FONT_SIZE),
+    ('BACKGROUND', (0, 1), (-1, -1), colors.white),
+    ('GRID', (0, 0), (-1, -1), 1, colors.grey),
+    ('ROWBACKGROUNDS', (0, 1), (-1, -1), [colors.white, colors.lightgrey])
+])
+
+def _fit(text: str, width: float) -> str:
+    """Truncar o texto para caber na coluna (as linhas têm altura fixa)"""
+    text = text or ""
+    limit = width - CELL_PADDING
+    if stringWidth(text, BODY_FONT, BODY_FONT_SIZE) <= limit:
+        return text
+    while text and stringWidth(text + "…", BODY_FONT, BODY_FONT_SIZE) > limit:
+        text = text[:-1]
+    return text + "…"
+
+def format_transaction_row(transaction_date, type_, description, category, amount) -> list:
+    return [
+        transaction_date.strftime("%d/%m/%Y"),
+        "Receita" if type_ == "income" else "Despesa",
+        _fit(description, COLUMN_WIDTHS[2]),
+        _fit(category or "Outro", COLUMN_WIDTHS[3]),
+        f"R$ {amount:,.2f}"
+    ]
+
+class _PageWriter:
+    """Posiciona flowables de cima para baixo, uma página por vez"""
+
+    def __init__(self, output: BinaryIO):
+        self.canvas = Canvas(output, pagesize=A4)
+        self.page = 1
+        self.y = PAGE_HEIGHT - TOP_MARGIN
+
+    def draw(self, flowable):
+        _, height = flowable.wrapOn(self.canvas, CONTENT_WIDTH, self.y - BOTTOM_MARGIN)
+        flowable.drawOn(self.canvas, LEFT_MARGIN, self.y - height)
+        self.y -= height
+
+    def space(self, height: float):
+        self.y -= height
+
+    def rows_available(self) -> int:
+        """Linhas de transação que cabem no restante da página (descontando o cabeçalho)"""
+        return max(int((self.y - BOTTOM_MARGIN) // ROW_HEIGHT) - 1, 0)
+
+    def _footer(self):
+        self.canvas.setFont(BODY_FONT, 8)
+        self.canvas.setFillColor(colors.grey)
+        self.canvas.drawRightString(LEFT_MARGIN + CONTENT_WIDTH, BOTTOM_MARGIN / 2, f"Página {self.page}")
+
+    def new_page(self):
+        self._footer()
+        self.canvas.showPage()
+        self.page += 1
+        self.y = PAGE_HEIGHT - TOP_MARGIN
+
+    def finish(self) -> int:
+        self._footer()
+        self.canvas.save()
+        return self.page
+
+def _transactions_table(rows: list) -> Table:
+    table = Table(
+        [TRANSACTION_HEADER] + rows,
+        colWidths=COLUMN_WIDTHS,
+        rowHeights=ROW_HEIGHT
+    )
+    table.setStyle(TRANSACTIONS_STYLE)
+    return table
+
+def write_transactions_pdf(
+    rows: Iterable,
+    total_income: float,
+    total_expense: float,
+    period_text: str,
+    output: BinaryIO
+) -> int:
+    """Gravar o relatório em `output` e retornar o número de páginas
+
+    `rows` produz tuplas (date, type, description, category, amount).
+    """
+    writer = _PageWriter(output)
+    styles = getSampleStyleSheet()
+    title_style = ParagraphStyle(
+        'CustomTitle',
+        parent=styles['Heading1'],
+        fontSize=24,
+        textColor=colors.HexColor('#6366f1'),
+        spaceAfter=30,
+        alignment=TA_CENTER
+    )
+
+    # Título, período e resumo
+    writer.draw(Paragraph("Relatório Financeiro", title_style))
+    writer.space(0.2 * inch + title_style.spaceAfter)
+    writer.draw(Paragraph(period_text, styles['Normal']))
+    writer.space(0.3 * inch)
+
+    balance = total_income - total_expense
+    summary_table = Table([
+        ['Resumo Financeiro', '', ''],
+        ['Receitas', f'R$ {total_income:,.2f}', ''],
+        ['Despesas', f'R$ {total_expense:,.2f}', ''],
+        ['Saldo', f'R$ {balance:,.2f}', '']
+    ], colWidths=[3 * inch, 2 * inch, 2 * inch])
+    summary_table.setStyle(SUMMARY_STYLE)
+    writer.draw(summary_table)
+    writer.space(0.4 * inch)
+
+    # Transações, uma tabela por página
+    chunk = []
+    capacity = 0
+    for row in rows:
+        if not capacity:
+            if chunk:
+                writer.draw(_transactions_table(chunk))
+                writer.new_page()
+                chunk = []
+            else:
+                writer.draw(Paragraph("Transações", styles['Heading2']))
+                writer.space(0.2 * inch)
+            capacity = writer.rows_available()
+            if not capacity:
+                writer.new_page()
+                capacity = writer.rows_available()
+        chunk.append(format_transaction_row(*row))
+        capacity -= 1
+
+    if chunk:
+        writer.draw(_transactions_table(chunk))
+
+    return writer.finish()
@@ -0,0 +1,129 @@
+"""
+Perfil das consultas SQL de uma requisição ou de um trecho de código
+
+QueryProfile junta as consultas pelo texto do statement (os parâmetros já
+vêm como placeholders), com contagem e tempo. O mesmo statement repetido
+muitas vezes numa só requisição é o sinal de um N+1: um laço consultando
+linha a linha o que caberia numa consulta só.
+
+- profile_queries(): perfil de tudo que os engines executarem no bloco
+  (scripts e verificações, sem requisição HTTP);
+- query_budget(n): o mesmo, falhando com QueryBudgetExceeded se o bloco
+  passar de n consultas.
+
+O perfil por requisição fica em app/middleware/profiler.py.
+"""
+import json
+import time
+from contextlib import contextmanager
+from typing import Dict, Iterator, List, Optional
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncEngine
+from app.config import settings
+
+STATEMENT_PREVIEW = 160
+SUMMARY_STATEMENTS = 5
+
+def _normalize(statement: str) -> str:
+    return " ".join(statement.split())
+
+class QueryProfile:
+    """Consultas agrupadas por statement, com contagem e tempo"""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.queries = 0
+        self.seconds = 0.0
+        self.statements: Dict[str, list] = {}
+
+    def record(self, statement: str, elapsed: float) -> None:
+        self.queries += 1
+        self.seconds += elapsed
+        entry = self.statements.get(statement)
+        if entry is None:
+            entry = self.statements[statement] = [0, 0.0]
+        entry[0] += 1
+        entry[1] += elapsed
+
+    def _rows(self, entries) -> List[dict]:
+        return [
+            {
+                "statement": _normalize(statement)[:STATEMENT_PREVIEW],
+                "count": count,
+                "db_ms": round(seconds * 1000, 2),
+            }
+            for statement, (count, seconds) in entries
+        ]
+
+    def repeated(self, threshold: Optional[int] = None) -> List[dict]:
+        """Statements executados `threshold` vezes ou mais (suspeitos de N+1)"""
+        threshold = threshold or settings.query_profiler_repeat_threshold
+        entries = sorted(
+            ((statement, entry) for statement, entry in self.statements.items() if entry[0] >= threshold),
+            key=lambda item: item[1][0],
+            reverse=True
+        )
+        return self._rows(entries)
+
+    def summary(self, threshold: Optional[int] = None) -> dict:
+        slowest = sorted(self.statements.items(), key=lambda item: item[1][1], reverse=True)
+        return {
+            "queries": self.queries,
+            "distinct": len(self.statements),
+            "db_ms": round(self.seconds * 1000, 2),
+            "repeated": self.repeated(threshold)[:SUMMARY_STATEMENTS],
+            "slowest": self._rows(slowest[:SUMMARY_STATEMENTS]),
+        }
+
+    def summary_json(self, threshold: Optional[int] = None) -> str:
+        return json.dumps(self.summary(threshold), separators=(",", ":"))
+
+    def server_timing(self) -> str:
+        """Valor do header Server-Timing (tempo no banco e total até agora)"""
+        total_ms = (time.perf_counter() - self.started) * 1000
+        return (
+            f'db;dur={self.seconds * 1000:.2f};desc="{self.queries} queries", '
+            f"total;dur={total_ms:.2f}"
+        )
+
+class QueryBudgetExceeded(AssertionError):
+    def __init__(self, label: str, budget: int, profile: QueryProfile):
+        self.profile = profile
+        detail = json.dumps(profile.summary(threshold=2), indent=2, ensure_ascii=False)
+        super().__init__(f"{label or 'bloco'}: {profile.queries} consultas (orçamento {budget})\n{detail}")
+
+def _sync_engines(targets) -> list:
+    if not targets:
+        from app.database import async_engine, engine
+        targets = (engine, async_engine)
+    return [target.sync_engine if isinstance(target, AsyncEngine) else target for target in targets]
+
+@contextmanager
+def profile_queries(*targets) -> Iterator[QueryProfile]:
+    """Perfil de todas as consultas dos engines (padrão: os dois do app) durante o bloco"""
+    profile = QueryProfile()
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        context._budget_started = time.perf_counter()
+
+    def after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        profile.record(statement, time.perf_counter() - context._budget_started)
+
+    engines = _sync_engines(targets)
+    for target in engines:
+        event.listen(target, "before_cursor_execute", before_cursor_execute)
+        event.listen(target, "after_cursor_execute", after_cursor_execute)
+    try:
+        yield profile
+    finally:
+        for target in engines:
+            event.remove(target, "before_cursor_execute", before_cursor_execute)
+            event.remove(target, "after_cursor_execute", after_cursor_execute)
+
+@contextmanager
+def query_budget(max_queries: int, label: str = "", *targets) -> Iterator[QueryProfile]:
+    """Falhar se o bloco executar mais de `max_queries` consultas"""
+    with profile_queries(*targets) as profile:
+        yield profile
+    if profile.queries > max_queries:
+        raise QueryBudgetExceeded(label, max_queries, profile)
@@ -0,0 +1,89 @@
+"""
+Consultas e geração dos relatórios (PDF e Excel)
+
+Compartilhado pelas rotas síncronas de /api/reports e pelos jobs em
+segundo plano: aplica os filtros do relatório, lê as linhas com yield_per
+e grava o arquivo final em um objeto de arquivo.
+"""
+import tempfile
+from typing import BinaryIO, Optional
+from sqlalchemy import case, func
+from sqlalchemy.orm import Session
+from app.models import Transaction, TransactionType
+from app.services.excel_report import write_transactions_xlsx
+from app.services.pdf_report import write_transactions_pdf
+
+EXCEL_BATCH_SIZE = 1000
+PDF_BATCH_SIZE = 500
+
+REPORT_FORMATS = {
+    "pdf": ("application/pdf", "pdf"),
+    "excel": ("application/vnd.openxmlformats-officedocument.spreadsheetml.sheet", "xlsx"),
+}
+
+def apply_report_filters(
+    query,
+    user_id: int,
+    start_date=None,
+    end_date=None,
+    transaction_type: Optional[TransactionType] = None,
+    category: Optional[str] = None
+):
+    """Aplicar os filtros do relatório a uma consulta sobre transactions"""
+    query = query.filter(Transaction.user_id == user_id)
+    if start_date:
+        query = query.filter(Transaction.date >= start_date)
+    if end_date:
+        query = query.filter(Transaction.date <= end_date)
+    if transaction_type:
+        type_value = transaction_type.value if isinstance(transaction_type, TransactionType) else str(transaction_type)
+        query = query.filter(Transaction.type == type_value)
+    if category:
+        query = query.filter(Transaction.category == category)
+    return query
+
+def write_pdf_report(db: Session, user_id: int, output: BinaryIO, **filters) -> int:
+    """Gravar o relatório PDF em `output` e retornar o número de páginas"""
+    # Totais calculados no banco antes de percorrer as linhas
+    total_income, total_expense = apply_report_filters(db.query(
+        func.sum(case((Transaction.type == "income", Transaction.amount), else_=0)),
+        func.sum(case((Transaction.type == "expense", Transaction.amount), else_=0))
+    ), user_id, **filters).one()
+
+    rows = apply_report_filters(db.query(
+        Transaction.date,
+        Transaction.type,
+        Transaction.description,
+        Transaction.category,
+        Transaction.amount
+    ), user_id, **filters).order_by(Transaction.date.desc()).yield_per(PDF_BATCH_SIZE)
+
+    period_text = f"Período: {filters.get('start_date') or 'Início'} a {filters.get('end_date') or 'Hoje'}"
+    return write_transactions_pdf(rows, float(total_income or 0), float(total_expense or 0), period_text, output)
+
+def write_excel_report(db: Session, user_id: int, output: BinaryIO, **filters) -> int:
+    """Gravar o relatório Excel em `output` e retornar o número de linhas"""
+    rows = apply_report_filters(db.query(
+        Transaction.date,
+        Transaction.type,
+        Transaction.description,
+        Transaction.category,
+        Transaction.amount,
+        Transaction.notes
+    ), user_id, **filters).order_by(Transaction.date.desc()).yield_per(EXCEL_BATCH_SIZE)
+    return write_transactions_xlsx(rows, output)
+
+def write_report(db: Session, user_id: int, report_format: str, output: BinaryIO, **filters) -> int:
+    writer = write_pdf_report if report_format == "pdf" else write_excel_report
+    return writer(db, user_id, output, **filters)
+
+def build_report(db: Session, user_id: int, report_format: str, **filters) -> BinaryIO:
+    """Gerar o relatório em um arquivo temporário posicionado no início"""
+    output = tempfile.TemporaryFile()
+    try:
+        write_report(db, user_id, report_format, output, **filters)
+    except Exception:
+        output.close()
+        raise
+    output.seek(0)
+    return output
@@ -0,0 +1,228 @@
+"""
+Fila de relatórios em segundo plano
+
+Os jobs ficam na tabela report_jobs (visível para todas as réplicas) e são
+executados por um pool de processos local. O arquivo gerado é gravado em
+REPORT_ARTIFACTS_DIR (no PVC em produção) e removido após o TTL.
+
+Pedidos idênticos (mesmo usuário, formato, filtros e versão dos dados em
+user_data_versions) reutilizam o job existente em vez de gerar outro arquivo.
+"""
+import hashlib
+import json
+import multiprocessing
+import os
+import threading
+import uuid
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from datetime import date, datetime, timedelta, timezone
+from typing import Optional
+from sqlalchemy import and_, or_, update
+from sqlalchemy.orm import Session
+from app.config import settings
+from app.database import SessionLocal
+from app.models import ReportJob
+from app.services.data_version import get_data_version
+from app.services.report_data import REPORT_FORMATS, write_report
+
+ACTIVE_STATUSES = ("pending", "running")
+CLEANUP_BATCH_SIZE = 500
+
+_executor = None
+_executor_lock = threading.Lock()
+
+def _get_executor() -> ProcessPoolExecutor:
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ProcessPoolExecutor(
+                max_workers=settings.report_job_workers,
+                mp_context=multiprocessing.get_context("spawn")
+            )
+        return _executor
+
+def _reset_executor():
+    global _executor
+    with _executor_lock:
+        if _executor is not None:
+            _executor.shutdown(wait=False, cancel_futures=True)
+        _executor = None
+
+def shutdown_report_workers():
+    """Encerrar o pool de processos (chamado no shutdown da aplicação)"""
+    _reset_executor()
+
+def normalize_params(
+    start_date: Optional[date] = None,
+    end_date: Optional[date] = None,
+    transaction_type=None,
+    category: Optional[str] = None
+) -> dict:
+    """Filtros em forma serializável e canônica"""
+    return {
+        "start_date": start_date.isoformat() if start_date else None,
+        "end_date": end_date.isoformat() if end_date else None,
+        "transaction_type": getattr(transaction_type, "value", transaction_type),
+        "category": category or None,
+    }
+
+def _filters_from_params(params: dict) -> dict:
+    return {
+        "start_date": date.fromisoformat(params["start_date"]) if params.get("start_date") else None,
+        "end_date": date.fromisoformat(params["end_date"]) if params.get("end_date") else None,
+        "transaction_type": params.get("transaction_type"),
+        "category": params.get("category"),
+    }
+
+def dedup_key(user_id: int, report_format: str, params: dict, data_version: str) -> str:
+    payload = json.dumps({
+        "user_id": user_id,
+        "format": report_format,
+        "params": params,
+        "data_version": data_version,
+    }, sort_keys=True)
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+def _stale_before(now: datetime) -> datetime:
+    return now - timedelta(minutes=settings.report_job_timeout_minutes)
+
+# As comparações com created_at/expires_at ficam no SQL: o driver pode devolver
+# datas com ou sem fuso (SQLite x PostgreSQL) e o Python não compara as duas
+def _reusable_filter(now: datetime):
+    return or_(
+        and_(
+            ReportJob.status == "done",
+            or_(ReportJob.expires_at.is_(None), ReportJob.expires_at > now)
+        ),
+        and_(
+            ReportJob.status.in_(ACTIVE_STATUSES),
+            ReportJob.created_at >= _stale_before(now)
+        )
+    )
+
+def refresh_job_status(db: Session, job: ReportJob) -> ReportJob:
+    """Marcar como falho um job que passou do tempo limite (ex.: réplica reiniciada)"""
+    if job.status not in ACTIVE_STATUSES:
+        return job
+    now = datetime.now(timezone.utc)
+    result = db.execute(
+        update(ReportJob)
+        .where(
+            ReportJob.id == job.id,
+            ReportJob.status.in_(ACTIVE_STATUSES),
+            ReportJob.created_at < _stale_before(now)
+        )
+        .values(
+            status="failed",
+            error="Tempo limite excedido",
+            finished_at=now,
+            expires_at=now + timedelta(minutes=settings.report_artifact_ttl_minutes)
+        )
+        .execution_options(synchronize_session=False)
+    )
+    if result.rowcount:
+        db.commit()
+        db.refresh(job)
+    return job
+
+def submit_report_job(db: Session, user_id: int, report_format: str, **filters) -> ReportJob:
+    """Criar (ou reutilizar) um job de relatório e enviá-lo ao pool"""
+    params = normalize_params(**filters)
+    key = dedup_key(user_id, report_format, params, str(get_data_version(db, user_id)))
+
+    now = datetime.now(timezone.utc)
+    candidates = db.query(ReportJob).filter(
+        ReportJob.user_id == user_id,
+        ReportJob.dedup_key == key,
+        _reusable_filter(now)
+    ).order_by(ReportJob.created_at.desc()).all()
+    for candidate in candidates:
+        if candidate.status != "done" or (candidate.artifact_path and os.path.exists(candidate.artifact_path)):
+            return candidate
+
+    job = ReportJob(
+        id=uuid.uuid4().hex,
+        user_id=user_id,
+        format=report_format,
+        params=json.dumps(params, sort_keys=True),
+        dedup_key=key,
+        status="pending"
+    )
+    db.add(job)
+    db.commit()
+    db.refresh(job)
+
+    try:
+        _get_executor().submit(run_report_job, job.id)
+    except BrokenProcessPool:
+        _reset_executor()
+        _get_executor().submit(run_report_job, job.id)
+    return job
+
+def run_report_job(job_id: str) -> None:
+    """Gerar o arquivo de um job (executado em um processo do pool)"""
+    db = SessionLocal()
+    partial_path = None
+    try:
+        job = db.get(ReportJob, job_id)
+        if not job or job.status != "pending":
+            return
+        job.status = "running"
+        db.commit()
+
+        os.makedirs(settings.report_artifacts_dir, exist_ok=True)
+        extension = REPORT_FORMATS[job.format][1]
+        path = os.path.join(settings.report_artifacts_dir, f"{job.id}.{extension}")
+        partial_path = f"{path}.part"
+
+        filters = _filters_from_params(json.loads(job.params))
+        with open(partial_path, "wb") as output:
+            write_report(db, job.user_id, job.format, output, **filters)
+        os.replace(partial_path, path)
+        partial_path = None
+
+        now = datetime.now(timezone.utc)
+        job.status = "done"
+        job.artifact_path = path
+        job.finished_at = now
+        job.expires_at = now + timedelta(minutes=settings.report_artifact_ttl_minutes)
+        db.commit()
+    except Exception as e:
+        db.rollback()
+        job = db.get(ReportJob, job_id)
+        if job:
+            now = datetime.now(timezone.utc)
+            job.status = "failed"
+            job.error = str(e)[:500]
+            job.finished_at = now
+            job.expires_at = now + timedelta(minutes=settings.report_artifact_ttl_minutes)
+            db.commit()
+    finally:
+        if partial_path and os.path.exists(partial_path):
+            os.remove(partial_path)
+        db.close()
+
+def cleanup_expired_report_jobs(db: Session) -> int:
+    """Remover arquivos e registros de jobs expirados"""
+    removed = 0
+    while True:
+        expired = db.query(ReportJob).filter(
+            ReportJob.expires_at < datetime.now(timezone.utc)
+        ).limit(CLEANUP_BATCH_SIZE).all()
+        if not expired:
+            return removed
+        for job in expired:
+            if job.artifact_path and os.path.exists(job.artifact_path):
+                os.remove(job.artifact_path)
+            db.delete(job)
+        db.commit()
+        removed += len(expired)
+
+def cleanup_report_artifacts() -> int:
+    """Tarefa periódica: limpar jobs expirados com uma sessão própria"""
+    db = SessionLocal()
+    try:
+        return cleanup_expired_report_jobs(db)
+    finally:
+        db.close()
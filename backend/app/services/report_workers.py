@@ -0,0 +1,18 @@
+"""
+Pool de threads dedicado à geração de relatórios
+
+A renderização de relatórios grandes é CPU-bound e demorada; rodá-la em um
+pool próprio e limitado evita bloquear o event loop e impede que vários
+relatórios simultâneos ocupem todo o threadpool padrão das rotas síncronas.
+"""
+import asyncio
+import functools
+from concurrent.futures import ThreadPoolExecutor
+from app.config import settings
+
+_executor = ThreadPoolExecutor(max_workers=settings.report_workers, thread_name_prefix="reports")
+
+async def run_in_report_pool(func, *args, **kwargs):
+    """Executar `func` no pool de relatórios e aguardar o resultado"""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_executor, functools.partial(func, *args, **kwargs))
@@ -0,0 +1,186 @@
+"""
+Cache de respostas prontas (JSON) das rotas de leitura mais pesadas
+
+A chave inclui o usuário, a versão dos dados (user_data_versions) e os
+filtros, então uma escrita invalida tudo do usuário sem apagar nada: as
+entradas antigas só deixam de ser pedidas e saem por LRU/TTL.
+
+Backends:
+- memory (padrão): LRU em processo com tamanho máximo e TTL;
+- redis: servidor compatível com Redis (RESPONSE_CACHE_URL), compartilhado
+  entre réplicas; requer o pacote `redis`;
+- none: desligado.
+
+Misses concorrentes da mesma chave no processo são coalescidos (single
+flight): só o primeiro calcula e os demais aguardam o resultado. Falhas do
+backend não derrubam a requisição, o valor é calculado sem cache.
+"""
+import asyncio
+import logging
+import threading
+import time
+from collections import OrderedDict
+from typing import Awaitable, Callable, Dict, Optional
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+# Redis opcional
+try:
+    import redis.asyncio as redis_asyncio
+    REDIS_AVAILABLE = True
+except ImportError:
+    redis_asyncio = None
+    REDIS_AVAILABLE = False
+
+class MemoryBackend:
+    """LRU com TTL por entrada, seguro para uso entre threads"""
+
+    name = "memory"
+
+    def __init__(self, max_size: int):
+        self.max_size = max_size
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    async def get(self, key: str) -> Optional[bytes]:
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            if entry[0] <= now:
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return entry[1]
+
+    async def set(self, key: str, value: bytes, ttl_seconds: float) -> None:
+        if self.max_size <= 0:
+            return
+        with self._lock:
+            self._entries[key] = (time.monotonic() + ttl_seconds, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def size(self) -> Optional[int]:
+        with self._lock:
+            return len(self._entries)
+
+    async def close(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+class RedisBackend:
+    """Servidor compatível com Redis; o tamanho é limitado pelo maxmemory do servidor"""
+
+    name = "redis"
+
+    def __init__(self, url: str):
+        self._client = redis_asyncio.from_url(url)
+
+    async def get(self, key: str) -> Optional[bytes]:
+        return await self._client.get(key)
+
+    async def set(self, key: str, value: bytes, ttl_seconds: float) -> None:
+        await self._client.set(key, value, px=max(1, int(ttl_seconds * 1000)))
+
+    def size(self) -> Optional[int]:
+        return None
+
+    async def close(self) -> None:
+        await self._client.aclose()
+
+class ResponseCache:
+    """Cache de valores serializados com TTL, contadores e single flight"""
+
+    def __init__(self, backend, ttl_seconds: float, namespace: str):
+        self.backend = backend
+        self.ttl_seconds = ttl_seconds
+        self.namespace = namespace
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self.errors = 0
+        self._inflight: Dict[str, asyncio.Future] = {}
+
+    def key(self, *parts) -> str:
+        return ":".join([self.namespace, *(str(part) for part in parts)])
+
+    async def get_or_compute(self, key: str, compute: Callable[[], Awaitable[bytes]]) -> bytes:
+        """Valor em cache ou calculado por `compute` (uma vez por chave, mesmo com misses simultâneos)"""
+        if self.backend is None:
+            return await compute()
+
+        try:
+            cached = await self.backend.get(key)
+        except Exception:
+            self.errors += 1
+            cached = None
+        if cached is not None:
+            self.hits += 1
+            return cached
+
+        inflight = self._inflight.get(key)
+        if inflight is not None:
+            self.coalesced += 1
+            try:
+                return await asyncio.shield(inflight)
+            except asyncio.CancelledError:
+                if not inflight.cancelled():
+                    raise
+            # Quem calculava foi cancelado (cliente desconectou): calcular aqui mesmo
+            return await compute()
+
+        self.misses += 1
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[key] = future
+        try:
+            value = await compute()
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except BaseException as e:
+            future.set_exception(e)
+            # Evitar "exception was never retrieved" quando ninguém aguardava
+            future.exception()
+            raise
+        finally:
+            self._inflight.pop(key, None)
+        future.set_result(value)
+
+        try:
+            await self.backend.set(key, value, self.ttl_seconds)
+        except Exception:
+            self.errors += 1
+        return value
+
+    def stats(self) -> dict:
+        return {
+            "backend": self.backend.name if self.backend else "none",
+            "size": self.backend.size() if self.backend else 0,
+            "hits": self.hits,
+            "misses": self.misses,
+            "coalesced": self.coalesced,
+            "errors": self.errors,
+        }
+
+    async def close(self) -> None:
+        if self.backend is not None:
+            await self.backend.close()
+
+def create_backend(kind: str = None, url: str = None, max_size: int = None):
+    """Backend configurado em RESPONSE_CACHE_BACKEND (memory, redis ou none)"""
+    kind = (kind or settings.response_cache_backend).lower()
+    if kind == "none":
+        return None
+    if kind == "redis":
+        if not REDIS_AVAILABLE:
+            logger.warning("Pacote redis não instalado. Cache de respostas em memória.")
+        else:
+            return RedisBackend(url or settings.response_cache_url)
+    return MemoryBackend(settings.response_cache_size if max_size is None else max_size)
+
+# O sufixo da namespace muda junto com o formato do JSON (entradas antigas no Redis são ignoradas)
+dashboard_cache = ResponseCache(create_backend(), settings.response_cache_ttl_seconds, "dashboard:v1")
@@ -0,0 +1,228 @@
+"""
+Agregados mensais materializados (tabela monthly_rollups)
+
+Cada linha guarda soma e contagem das transações de um usuário por
+(mês, tipo, subtipo, categoria). Os caminhos de escrita acumulam deltas
+com `add_transaction_delta` e os aplicam com `apply_rollup_deltas` na
+mesma transação do banco, mantendo a tabela sincronizada.
+"""
+from collections import defaultdict
+from datetime import date
+from typing import Dict, Iterable, List, Optional, Tuple
+from sqlalchemy import String, func, literal_column
+from sqlalchemy.ext.compiler import compiles
+from sqlalchemy.sql.functions import FunctionElement
+from sqlalchemy.orm import Session
+from app.models import MonthlyRollup, Transaction
+
+# (user_id, year_month, type, subtype, category) -> [total, count]
+RollupKey = Tuple[int, str, str, str, str]
+RollupDeltas = Dict[RollupKey, List[float]]
+
+AMOUNT_TOLERANCE = 0.005
+DEFAULT_CATEGORY = "Other"
+
+def year_month(value: date) -> str:
+    return f"{value.year:04d}-{value.month:02d}"
+
+def normalize_category(category: Optional[str]) -> str:
+    """Categoria como gravada: sem espaços nas pontas, vazia ou nula vira 'Other'"""
+    return (category or "").strip() or DEFAULT_CATEGORY
+
+def category_expression(column=Transaction.category):
+    """normalize_category no SQL (mesma chave na reconstrução e no caminho incremental)"""
+    return func.coalesce(func.nullif(func.trim(column), ""), DEFAULT_CATEGORY)
+
+def rollup_key(user_id: int, value: date, type_: str, subtype: Optional[str], category: Optional[str]) -> RollupKey:
+    """Chave normalizada do agregado (subtipo vazio e categoria 'Other' por padrão)"""
+    type_ = getattr(type_, "value", type_)  # aceitar TransactionType
+    return (user_id, year_month(value), str(type_), subtype or "", normalize_category(category))
+
+def new_deltas() -> RollupDeltas:
+    return defaultdict(lambda: [0.0, 0])
+
+def add_transaction_delta(deltas: RollupDeltas, transaction, sign: int = 1) -> RollupDeltas:
+    """Acumular a contribuição de uma transação (sign=-1 para remover)"""
+    key = rollup_key(
+        transaction.user_id,
+        transaction.date,
+        transaction.type,
+        transaction.subtype,
+        transaction.category
+    )
+    deltas[key][0] += sign * float(transaction.amount or 0)
+    deltas[key][1] += sign
+    return deltas
+
+def _upsert_statement(dialect_name: str):
+    if dialect_name == "sqlite":
+        from sqlalchemy.dialects.sqlite import insert
+    elif dialect_name == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert
+    else:
+        return None
+    stmt = insert(MonthlyRollup)
+    return stmt.on_conflict_do_update(
+        index_elements=["user_id", "year_month", "type", "subtype", "category"],
+        set_={
+            "total": MonthlyRollup.total + stmt.excluded.total,
+            "count": MonthlyRollup.count + stmt.excluded.count,
+        }
+    )
+
+def apply_rollup_deltas(db: Session, deltas: RollupDeltas) -> None:
+    """Aplicar deltas acumulados na sessão atual (sem commit)"""
+    values = [
+        {
+            "user_id": key[0],
+            "year_month": key[1],
+            "type": key[2],
+            "subtype": key[3],
+            "category": key[4],
+            "total": total,
+            "count": count,
+        }
+        for key, (total, count) in deltas.items()
+        if count or abs(total) > 0
+    ]
+    if not values:
+        return
+
+    stmt = _upsert_statement(db.get_bind().dialect.name)
+    if stmt is not None:
+        db.execute(stmt, values)
+    else:
+        for value in values:
+            row = db.get(MonthlyRollup, (
+                value["user_id"], value["year_month"], value["type"], value["subtype"], value["category"]
+            ))
+            if row:
+                row.total += value["total"]
+                row.count += value["count"]
+            else:
+                db.add(MonthlyRollup(**value))
+        db.flush()
+
+    # Remover agregados que ficaram vazios
+    user_ids = {value["user_id"] for value in values}
+    db.query(MonthlyRollup).filter(
+        MonthlyRollup.user_id.in_(user_ids),
+        MonthlyRollup.count <= 0
+    ).delete(synchronize_session=False)
+
+class year_month_of(FunctionElement):
+    """Data -> 'YYYY-MM', compilado conforme o banco"""
+    type = String()
+    inherit_cache = True
+    name = "year_month_of"
+
+@compiles(year_month_of)
+def _year_month_sqlite(element, compiler, **kw):
+    return compiler.process(func.strftime("%Y-%m", *element.clauses.clauses), **kw)
+
+@compiles(year_month_of, "postgresql")
+def _year_month_postgresql(element, compiler, **kw):
+    # Agrupamento pelo início do mês no servidor, formatado como a chave dos agregados.
+    # Constantes literais: com parâmetros o SELECT e o GROUP BY não seriam a mesma expressão
+    month_start = func.date_trunc(literal_column("'month'"), *element.clauses.clauses)
+    return compiler.process(func.to_char(month_start, literal_column("'YYYY-MM'")), **kw)
+
+def month_expression(column=Transaction.date):
+    """Expressão SQL que converte uma data em 'YYYY-MM'"""
+    return year_month_of(column)
+
+def compute_rollups_from_transactions(db: Session, user_id: Optional[int] = None) -> Dict[RollupKey, Tuple[float, int]]:
+    """Calcular os agregados diretamente da tabela transactions"""
+    month = month_expression()
+    subtype = func.coalesce(Transaction.subtype, "")
+    category = category_expression()
+    query = db.query(
+        Transaction.user_id,
+        month,
+        Transaction.type,
+        subtype,
+        category,
+        func.sum(Transaction.amount),
+        func.count(Transaction.id)
+    )
+    if user_id is not None:
+        query = query.filter(Transaction.user_id == user_id)
+    rows = query.group_by(Transaction.user_id, month, Transaction.type, subtype, category).all()
+    return {
+        (row[0], row[1], row[2], row[3], row[4]): (float(row[5] or 0), int(row[6]))
+        for row in rows
+    }
+
+def load_rollups(db: Session, user_id: Optional[int] = None) -> Dict[RollupKey, Tuple[float, int]]:
+    query = db.query(MonthlyRollup)
+    if user_id is not None:
+        query = query.filter(MonthlyRollup.user_id == user_id)
+    return {
+        (r.user_id, r.year_month, r.type, r.subtype, r.category): (float(r.total or 0), int(r.count or 0))
+        for r in query.all()
+    }
+
+def find_drift(db: Session, user_id: Optional[int] = None) -> List[dict]:
+    """Comparar monthly_rollups com os valores reais e listar divergências"""
+    expected = compute_rollups_from_transactions(db, user_id)
+    actual = load_rollups(db, user_id)
+    drift = []
+    for key in sorted(set(expected) | set(actual)):
+        expected_total, expected_count = expected.get(key, (0.0, 0))
+        actual_total, actual_count = actual.get(key, (0.0, 0))
+        if expected_count != actual_count or abs(expected_total - actual_total) > AMOUNT_TOLERANCE:
+            drift.append({
+                "key": key,
+                "expected": (expected_total, expected_count),
+                "actual": (actual_total, actual_count),
+            })
+    return drift
+
+def rebuild_rollups(db: Session, user_ids: Optional[Iterable[int]] = None) -> int:
+    """Recriar os agregados (de todos os usuários ou apenas dos informados)"""
+    targets = None if user_ids is None else sorted(set(user_ids))
+    if targets is None:
+        db.query(MonthlyRollup).delete(synchronize_session=False)
+        expected = compute_rollups_from_transactions(db)
+    else:
+        expected = {}
+        for uid in targets:
+            db.query(MonthlyRollup).filter(MonthlyRollup.user_id == uid).delete(synchronize_session=False)
+            expected.update(compute_rollups_from_transactions(db, uid))
+
+    db.bulk_insert_mappings(MonthlyRollup, [
+        {
+            "user_id": key[0],
+            "year_month": key[1],
+            "type": key[2],
+            "subtype": key[3],
+            "category": key[4],
+            "total": total,
+            "count": count,
+        }
+        for key, (total, count) in expected.items()
+    ])
+    return len(expected)
+
+def month_totals(db: Session, user_id: int, first_month: str, last_month: str) -> list:
+    """Linhas (year_month, type, subtype, category, total) de um intervalo de meses"""
+    return db.query(
+        MonthlyRollup.year_month,
+        MonthlyRollup.type,
+        MonthlyRollup.subtype,
+        MonthlyRollup.category,
+        MonthlyRollup.total
+    ).filter(
+        MonthlyRollup.user_id == user_id,
+        MonthlyRollup.year_month >= first_month,
+        MonthlyRollup.year_month <= last_month
+    ).all()
+
+def type_total(db: Session, user_id: int, month: str, type_: str) -> float:
+    """Total de um tipo (income/expense) em um mês"""
+    total = db.query(func.sum(MonthlyRollup.total)).filter(
+        MonthlyRollup.user_id == user_id,
+        MonthlyRollup.year_month == month,
+        MonthlyRollup.type == type_
+    ).scalar()
+    return float(total or 0)
@@ -0,0 +1,97 @@
+"""
+Armazenamento de refresh tokens
+
+O banco guarda apenas o SHA-256 do token (um vazamento da tabela não
+entrega sessões válidas). A busca no refresh usa o índice único do hash,
+então continua O(log n) conforme a tabela cresce; o índice
+(user_id, expires_at) atende a revogação de todas as sessões do usuário.
+
+Revogar um token também antecipa seu vencimento para agora, então a
+limpeza periódica só precisa apagar, em lotes, as linhas vencidas.
+"""
+import hashlib
+from datetime import datetime, timedelta, timezone
+from typing import Optional
+from sqlalchemy import delete, select, update
+from sqlalchemy.orm import Session
+from app.config import settings
+from app.database import SessionLocal
+from app.models import RefreshToken
+
+def hash_token(token: str) -> str:
+    return hashlib.sha256(token.encode("utf-8")).hexdigest()
+
+def save_refresh_token(db: Session, user_id: int, token: str) -> RefreshToken:
+    """Salvar o hash do refresh token no banco"""
+    expires_at = datetime.now(timezone.utc) + timedelta(days=settings.refresh_token_expire_days)
+    refresh_token = RefreshToken(
+        token_hash=hash_token(token),
+        user_id=user_id,
+        expires_at=expires_at
+    )
+    db.add(refresh_token)
+    db.commit()
+    db.refresh(refresh_token)
+    return refresh_token
+
+def find_active_refresh_token(db: Session, token: str, user_id: int) -> Optional[RefreshToken]:
+    """Token válido (não revogado e não vencido) do usuário, pelo hash"""
+    return db.query(RefreshToken).filter(
+        RefreshToken.token_hash == hash_token(token),
+        RefreshToken.user_id == user_id,
+        RefreshToken.is_revoked == False,
+        RefreshToken.expires_at > datetime.now(timezone.utc)
+    ).first()
+
+def revoke_refresh_token(db: Session, token: str) -> bool:
+    """Revogar um refresh token"""
+    result = db.execute(
+        update(RefreshToken)
+        .where(RefreshToken.token_hash == hash_token(token), RefreshToken.is_revoked == False)
+        .values(is_revoked=True, expires_at=datetime.now(timezone.utc))
+    )
+    db.commit()
+    return result.rowcount > 0
+
+def revoke_user_sessions(db: Session, user_id: int) -> int:
+    """Revogar todas as sessões ativas do usuário (sem commit)
+
+    Retorna a quantidade de tokens revogados.
+    """
+    now = datetime.now(timezone.utc)
+    result = db.execute(
+        update(RefreshToken)
+        .where(RefreshToken.user_id == user_id, RefreshToken.expires_at > now, RefreshToken.is_revoked == False)
+        .values(is_revoked=True, expires_at=now)
+        # Sincronizar pelo banco: avaliar o WHERE em Python compararia as datas
+        # dos tokens carregados (sem fuso no SQLite) com `now` (com fuso)
+        .execution_options(synchronize_session="fetch")
+    )
+    return result.rowcount
+
+def prune_refresh_tokens(db: Session, batch_size: Optional[int] = None) -> int:
+    """Apagar tokens vencidos ou revogados em lotes, confirmando cada lote
+
+    Lotes curtos evitam segurar o lock de escrita do SQLite por muito tempo.
+    """
+    batch_size = batch_size or settings.refresh_token_prune_batch_size
+    now = datetime.now(timezone.utc)
+    deleted = 0
+    while True:
+        ids = db.execute(
+            select(RefreshToken.id).where(RefreshToken.expires_at <= now).limit(batch_size)
+        ).scalars().all()
+        if not ids:
+            break
+        db.execute(delete(RefreshToken).where(RefreshToken.id.in_(ids)))
+        db.commit()
+        deleted += len(ids)
+    return deleted
+
+def prune_expired_refresh_tokens() -> int:
+    """Limpeza periódica (sessão própria, executada fora de uma requisição)"""
+    db = SessionLocal()
+    try:
+        return prune_refresh_tokens(db)
+    finally:
+        db.close()
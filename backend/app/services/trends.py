@@ -0,0 +1,153 @@
+"""
+Tendência de receitas e despesas por período (dia, semana, mês, trimestre)
+
+Os baldes são períodos de calendário do pandas terminando no período de
+hoje, então meses têm o número certo de dias e semanas começam na
+segunda-feira. Cada consulta é um único GROUP BY:
+
+- month/quarter: somas de monthly_rollups por (mês, tipo), convertidas
+  para trimestre no pandas;
+- day/week: somas de transactions por (data, tipo) na janela, agrupadas
+  em semanas no pandas.
+
+Os períodos sem movimento são preenchidos com zero por reindex, sem laço
+por período. load_trend_rows faz a consulta e aggregate_trend, só com
+pandas, monta os pontos; a rota assíncrona roda a segunda no threadpool.
+"""
+from datetime import date
+from typing import List, Optional
+import pandas as pd
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+from app.models import MonthlyRollup, Transaction
+from app.services import rollups
+
+# granularidade -> (frequência do pandas, horizonte padrão, horizonte máximo)
+GRANULARITIES = {
+    "day": ("D", 30, 366),
+    "week": ("W-SUN", 12, 104),
+    "month": ("M", 12, 120),
+    "quarter": ("Q", 8, 40),
+}
+TYPES = ["income", "expense"]
+
+def trend_periods(granularity: str, horizon: Optional[int] = None, today: Optional[date] = None) -> pd.PeriodIndex:
+    """Os `horizon` períodos de calendário até o atual; ValueError se inválido"""
+    if granularity not in GRANULARITIES:
+        raise ValueError(f"Granularidade inválida: {granularity} (use {', '.join(GRANULARITIES)})")
+    freq, default_horizon, max_horizon = GRANULARITIES[granularity]
+    horizon = default_horizon if horizon is None else horizon
+    if not 1 <= horizon <= max_horizon:
+        raise ValueError(f"Horizonte deve estar entre 1 e {max_horizon} para '{granularity}'")
+    today = today or date.today()
+    return pd.period_range(end=pd.Period(today, freq=freq), periods=horizon, freq=freq)
+
+def period_label(period: pd.Period, granularity: str) -> str:
+    start = period.start_time.date()
+    if granularity == "day":
+        return start.isoformat()
+    if granularity == "week":
+        year, week, _ = start.isocalendar()
+        return f"{year:04d}-W{week:02d}"
+    if granularity == "month":
+        return rollups.year_month(start)
+    return f"{start.year:04d}-Q{period.quarter}"
+
+def _monthly_rows(db: Session, user_id: int, first: date, last: date) -> list:
+    """(year_month, type, total) de monthly_rollups no intervalo"""
+    return db.query(
+        MonthlyRollup.year_month,
+        MonthlyRollup.type,
+        func.sum(MonthlyRollup.total)
+    ).filter(
+        MonthlyRollup.user_id == user_id,
+        MonthlyRollup.year_month >= rollups.year_month(first),
+        MonthlyRollup.year_month <= rollups.year_month(last)
+    ).group_by(MonthlyRollup.year_month, MonthlyRollup.type).all()
+
+def _daily_rows(db: Session, user_id: int, first: date, last: date) -> list:
+    """(date, type, total) de transactions no intervalo"""
+    return db.query(
+        Transaction.date,
+        Transaction.type,
+        func.sum(Transaction.amount)
+    ).filter(
+        Transaction.user_id == user_id,
+        Transaction.date >= first,
+        Transaction.date <= last
+    ).group_by(Transaction.date, Transaction.type).all()
+
+def _bucket(keys: pd.Series, granularity: str, freq: str) -> pd.PeriodIndex:
+    if granularity in ("month", "quarter"):
+        return pd.PeriodIndex(keys, freq="M").asfreq(freq)
+    return pd.DatetimeIndex(pd.to_datetime(keys)).to_period(freq)
+
+def load_trend_rows(
+    db: Session,
+    user_id: int,
+    granularity: str = "month",
+    horizon: Optional[int] = None,
+    today: Optional[date] = None
+) -> list:
+    """Somas por (mês ou data, tipo) na janela da tendência"""
+    periods = trend_periods(granularity, horizon, today)
+    first, last = periods[0].start_time.date(), periods[-1].end_time.date()
+    load = _monthly_rows if granularity in ("month", "quarter") else _daily_rows
+    # Tuplas simples: o resultado vai para outra thread
+    return [tuple(row) for row in load(db, user_id, first, last)]
+
+def aggregate_trend(
+    rows: list,
+    granularity: str = "month",
+    horizon: Optional[int] = None,
+    today: Optional[date] = None
+) -> dict:
+    """Receitas e despesas por período, do mais antigo ao atual (sem acesso ao banco)"""
+    periods = trend_periods(granularity, horizon, today)
+    freq = GRANULARITIES[granularity][0]
+    first, last = periods[0].start_time.date(), periods[-1].end_time.date()
+
+    frame = pd.DataFrame(rows, columns=["key", "type", "total"])
+    frame = frame[frame["type"].isin(TYPES)]
+
+    if frame.empty:
+        table = pd.DataFrame(0.0, index=periods, columns=TYPES)
+    else:
+        table = (
+            frame.assign(period=_bucket(frame["key"], granularity, freq), total=frame["total"].astype(float))
+            .groupby(["period", "type"])["total"].sum()
+            .unstack("type")
+            .reindex(index=periods, columns=TYPES, fill_value=0.0)
+            .fillna(0.0)
+        )
+
+    income = table["income"].round(2).tolist()
+    expense = table["expense"].round(2).tolist()
+    points = [
+        {
+            "period": period_label(period, granularity),
+            "start": period.start_time.date(),
+            "end": period.end_time.date(),
+            "income": income[i],
+            "expense": expense[i],
+            "balance": round(income[i] - expense[i], 2),
+        }
+        for i, period in enumerate(periods)
+    ]
+    return {
+        "granularity": granularity,
+        "horizon": len(periods),
+        "start": first,
+        "end": last,
+        "points": points,
+    }
+
+def compute_trend(
+    db: Session,
+    user_id: int,
+    granularity: str = "month",
+    horizon: Optional[int] = None,
+    today: Optional[date] = None
+) -> dict:
+    """Receitas e despesas por período (consulta e agregação na mesma thread)"""
+    return aggregate_trend(load_trend_rows(db, user_id, granularity, horizon, today), granularity, horizon, today)
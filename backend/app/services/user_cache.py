@@ -0,0 +1,90 @@
+"""
+Cache em processo dos usuários autenticados
+
+Guarda um snapshot imutável (id, role, is_active, is_superuser) por
+usuário, com TTL e tamanho máximo (LRU). As rotas de atualização e
+remoção de usuários invalidam a entrada local; o TTL limita por quanto
+tempo outras réplicas podem ver um snapshot antigo.
+"""
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Optional
+from sqlalchemy.orm import Session
+from app.config import settings
+from app.database import AsyncSessionLocal
+from app.models import User
+
+@dataclass(frozen=True)
+class UserSnapshot:
+    id: int
+    role: str
+    is_active: bool
+    is_superuser: bool
+
+class UserCache:
+    """LRU com TTL, seguro para uso entre threads"""
+
+    def __init__(self, max_size: int, ttl_seconds: float):
+        self.max_size = max_size
+        self.ttl_seconds = ttl_seconds
+        self.hits = 0
+        self.misses = 0
+        self._entries: "OrderedDict[int, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, user_id: int) -> Optional[UserSnapshot]:
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(user_id)
+            if entry is None or entry[0] <= now:
+                if entry is not None:
+                    del self._entries[user_id]
+                self.misses += 1
+                return None
+            self._entries.move_to_end(user_id)
+            self.hits += 1
+            return entry[1]
+
+    def put(self, snapshot: UserSnapshot) -> None:
+        if self.max_size <= 0:
+            return
+        with self._lock:
+            self._entries[snapshot.id] = (time.monotonic() + self.ttl_seconds, snapshot)
+            self._entries.move_to_end(snapshot.id)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, user_id: int) -> None:
+        with self._lock:
+            self._entries.pop(user_id, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"size": len(self._entries), "hits": self.hits, "misses": self.misses}
+
+user_cache = UserCache(settings.user_cache_size, settings.user_cache_ttl_seconds)
+
+def snapshot_from_db(db: Session, user_id: int) -> Optional[UserSnapshot]:
+    row = db.query(User.id, User.role, User.is_active, User.is_superuser).filter(User.id == user_id).first()
+    if row is None:
+        return None
+    return UserSnapshot(
+        id=row.id,
+        role=row.role or "user",
+        is_active=bool(row.is_active),
+        is_superuser=bool(row.is_superuser)
+    )
+
+async def load_user_snapshot(user_id: int) -> Optional[UserSnapshot]:
+    """Buscar o snapshot no banco (sessão assíncrona própria) e guardá-lo no cache"""
+    async with AsyncSessionLocal() as db:
+        snapshot = await db.run_sync(snapshot_from_db, user_id)
+    if snapshot is not None:
+        user_cache.put(snapshot)
+    return snapshot
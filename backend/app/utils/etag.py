@@ -0,0 +1,47 @@
+"""
+ETags derivados da versão dos dados do usuário
+
+A ETag de uma leitura é o hash de (usuário, versão dos dados, rota,
+query string e partes extras como a data de hoje). Como a versão muda a
+cada escrita, o cliente que manda If-None-Match recebe 304 sem que a
+rota consulte as transações.
+"""
+import hashlib
+import json
+from fastapi import Request, Response
+
+# Incrementar quando o formato das respostas mudar, invalidando as ETags antigas
+ETAG_FORMAT = 1
+CACHE_CONTROL = "private, no-cache"
+
+def make_etag(user_id: int, data_version: int, request: Request, *extra, weak: bool = False) -> str:
+    """ETag da resposta; `weak` para arquivos cujos bytes mudam a cada geração (PDF, xlsx)"""
+    payload = json.dumps([
+        ETAG_FORMAT,
+        user_id,
+        data_version,
+        request.url.path,
+        sorted(request.query_params.multi_items()),
+        list(extra),
+    ], default=str)
+    digest = hashlib.sha256(payload.encode()).hexdigest()[:32]
+    return f'W/"{digest}"' if weak else f'"{digest}"'
+
+def _opaque(tag: str) -> str:
+    tag = tag.strip()
+    return tag[2:] if tag.startswith("W/") else tag
+
+def etag_matches(request: Request, etag: str) -> bool:
+    """If-None-Match casa com a ETag (comparação fraca, como manda a RFC 9110)"""
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    if header.strip() == "*":
+        return True
+    return _opaque(etag) in {_opaque(tag) for tag in header.split(",")}
+
+def etag_headers(etag: str) -> dict:
+    return {"ETag": etag, "Cache-Control": CACHE_CONTROL}
+
+def not_modified(etag: str) -> Response:
+    return Response(status_code=304, headers=etag_headers(etag))
@@ -0,0 +1,23 @@
+"""
+Cursores opacos para paginação por chave (keyset)
+"""
+import base64
+from datetime import date
+from typing import Tuple
+
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+def encode_cursor(value: date, row_id: int) -> str:
+    """Codificar a posição (data, id) da última linha de uma página"""
+    raw = f"{value.isoformat()}:{row_id}".encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+def decode_cursor(cursor: str) -> Tuple[date, int]:
+    """Decodificar um cursor; levanta ValueError se for inválido"""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        raw = base64.urlsafe_b64decode(padded.encode()).decode()
+        date_part, id_part = raw.split(":", 1)
+        return date.fromisoformat(date_part), int(id_part)
+    except (ValueError, UnicodeDecodeError) as e:
+        raise ValueError(f"Invalid cursor: {cursor}") from e
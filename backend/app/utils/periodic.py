@@ -0,0 +1,17 @@
+"""
+Tarefas periódicas em segundo plano
+"""
+import asyncio
+import logging
+from starlette.concurrency import run_in_threadpool
+
+logger = logging.getLogger(__name__)
+
+async def run_periodically(interval_seconds: float, func, *args):
+    """Executar `func` (bloqueante) no threadpool a cada `interval_seconds`"""
+    while True:
+        try:
+            await run_in_threadpool(func, *args)
+        except Exception:
+            logger.exception("Tarefa periódica falhou", extra={"task": getattr(func, "__name__", str(func))})
+        await asyncio.sleep(interval_seconds)
@@ -0,0 +1,17 @@
+"""
+Utilitários para respostas em streaming
+"""
+from typing import BinaryIO, Iterator
+
+CHUNK_SIZE = 64 * 1024
+
+def iter_file(fileobj: BinaryIO, chunk_size: int = CHUNK_SIZE) -> Iterator[bytes]:
+    """Ler o arquivo em blocos e fechá-lo ao final"""
+    try:
+        while True:
+            chunk = fileobj.read(chunk_size)
+            if not chunk:
+                break
+            yield chunk
+    finally:
+        fileobj.close()
@@ -0,0 +1,154 @@
+#!/usr/bin/env python3
+"""
+Benchmark de concorrência das rotas de leitura (sessão síncrona x assíncrona)
+
+Dispara 200 clientes simultâneos (httpx + ASGITransport, sem rede) contra
+a listagem de transações e as estatísticas do dashboard, e compara:
+
+- antigo: réplica das rotas como eram, `def` com Session síncrona e
+  autenticação consultando o banco a cada requisição (tudo no threadpool);
+- async: as rotas atuais, com AsyncSession (aiosqlite) e o usuário em cache.
+
+Informa requisições/s, latências, erros, o atraso do event loop durante
+a carga e a espera por conexões no pool de cada engine.
+
+Uso:
+    python3 benchmarks/bench_async_db.py --clients 200 --requests 5
+"""
+import argparse
+import asyncio
+import contextlib
+import io
+import os
+import tempfile
+import time
+
+# Banco temporário (precisa ser definido antes de importar o app)
+_handle, DB_PATH = tempfile.mkstemp(suffix=".db", prefix="bench_async_")
+os.close(_handle)
+os.environ["DATABASE_URL"] = f"sqlite:///{DB_PATH}"
+# O modo antigo esgota o pool; sem isto cada requisição presa espera 30 s
+os.environ.setdefault("DB_POOL_TIMEOUT_SECONDS", "10")
+
+from common import seed_transactions
+
+import httpx
+from typing import List
+from fastapi import APIRouter, Depends, HTTPException
+from sqlalchemy.orm import Session
+from app.auth import create_access_token, oauth2_scheme, verify_token
+from app.database import Base, async_engine, engine, get_db, pool_stats
+from app.main import app
+from app.models import Transaction, User
+from app.middleware.rate_limit import limiter
+from app.schemas import DashboardStats, Transaction as TransactionSchema
+from app.services.dashboard_stats import compute_dashboard_stats
+from app.services.password_hashing import hash_password
+
+# Réplica das rotas síncronas anteriores à camada assíncrona
+legacy = APIRouter()
+
+def legacy_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(get_db)) -> User:
+    payload = verify_token(token, "access")
+    user = db.query(User).filter(User.id == int(payload["sub"])).first()
+    if user is None or not user.is_active:
+        raise HTTPException(status_code=401)
+    return user
+
+@legacy.get("/transactions", response_model=List[TransactionSchema])
+def legacy_transactions(db: Session = Depends(get_db), user: User = Depends(legacy_current_user)):
+    return db.query(Transaction).filter(Transaction.user_id == user.id).order_by(
+        Transaction.date.desc(), Transaction.id.desc()
+    ).limit(100).all()
+
+@legacy.get("/stats", response_model=DashboardStats)
+def legacy_stats(db: Session = Depends(get_db), user: User = Depends(legacy_current_user)):
+    return compute_dashboard_stats(db, user.id)
+
+app.include_router(legacy, prefix="/bench/legacy")
+
+MODES = {
+    "antigo": ("/bench/legacy/transactions", "/bench/legacy/stats"),
+    "async": ("/api/transactions/", "/api/dashboard/stats"),
+}
+
+def create_user() -> str:
+    from app.database import SessionLocal
+    db = SessionLocal()
+    try:
+        user = User(email="bench@example.com", username="bench", hashed_password=hash_password("Bench@12345"))
+        db.add(user)
+        db.commit()
+        return create_access_token({"sub": str(user.id)})
+    finally:
+        db.close()
+
+async def client_loop(client, paths, requests: int, headers: dict, latencies: list, errors: list):
+    for i in range(requests):
+        start = time.perf_counter()
+        response = await client.get(paths[i % len(paths)], headers=headers)
+        latencies.append(time.perf_counter() - start)
+        if response.status_code != 200:
+            # Com o pool esgotado o modo antigo responde 500 (timeout do pool)
+            errors.append(response.status_code)
+
+async def loop_probe(stop: asyncio.Event, lags: list, interval: float = 0.01):
+    # Atraso entre o sleep pedido e o acordar real = tempo em que o loop ficou ocupado
+    while not stop.is_set():
+        start = time.perf_counter()
+        await asyncio.sleep(interval)
+        lags.append(time.perf_counter() - start - interval)
+
+async def run_mode(mode: str, args, headers: dict) -> None:
+    paths = MODES[mode]
+    # Erros da aplicação viram respostas 500 em vez de exceções no cliente
+    transport = httpx.ASGITransport(app=app, raise_app_exceptions=False)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=None) as client:
+        # Aquecimento (pools, cache de usuário)
+        await client_loop(client, paths, 2, headers, [], [])
+        latencies, lags, errors = [], [], []
+        stop = asyncio.Event()
+        probe = asyncio.create_task(loop_probe(stop, lags))
+        start = time.perf_counter()
+        # O handler de erros do app imprime cada falha; aqui só interessa a contagem
+        with contextlib.redirect_stdout(io.StringIO()):
+            await asyncio.gather(*(
+                client_loop(client, paths, args.requests, headers, latencies, errors) for _ in range(args.clients)
+            ))
+        elapsed = time.perf_counter() - start
+        stop.set()
+        await probe
+
+    latencies.sort()
+    def pct(p):
+        return latencies[min(len(latencies) - 1, int(len(latencies) * p))] * 1000
+    print(f"  {mode:<7} req/s={len(latencies) / elapsed:,.0f}  p50={pct(0.5):.0f} ms  p95={pct(0.95):.0f} ms  "
+          f"p99={pct(0.99):.0f} ms  erros={len(errors)}  atraso do loop máx={max(lags) * 1000:.0f} ms")
+    stats = pool_stats(async_engine if mode == "async" else engine)
+    print(f"          pool: checkouts={stats.get('checkouts')} timeouts={stats.get('timeouts')} "
+          f"espera média={stats.get('wait_avg_ms')} ms máx={stats.get('wait_max_ms')} ms")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--clients", type=int, default=200, help="Clientes simultâneos")
+    parser.add_argument("--requests", type=int, default=5, help="Requisições por cliente")
+    parser.add_argument("--rows", type=int, default=5_000, help="Transações no banco")
+    args = parser.parse_args()
+
+    if limiter is not None:
+        limiter.enabled = False
+    try:
+        Base.metadata.create_all(bind=engine)
+        token = create_user()
+        seed_transactions(engine, args.rows)
+        headers = {"Authorization": f"Bearer {token}"}
+        print(f"⚡ {args.clients} clientes x {args.requests} requisições (listagem + dashboard), {args.rows} transações")
+        for mode in MODES:
+            asyncio.run(run_mode(mode, args, headers))
+    finally:
+        engine.dispose()
+        asyncio.run(async_engine.dispose())
+        os.remove(DB_PATH)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,111 @@
+#!/usr/bin/env python3
+"""
+Benchmark de /api/dashboard/stats
+
+Compara a implementação antiga (uma consulta SUM por valor, ~35 consultas)
+com o motor de agregação em app/services/dashboard_stats.py.
+
+Uso:
+    python3 benchmarks/bench_dashboard.py --rows 1000000
+"""
+import argparse
+import os
+from datetime import date, timedelta
+from common import create_bench_engine, seed_transactions, make_session, count_queries, timed
+
+from sqlalchemy import func
+from app.models import Transaction
+from app.services.dashboard_stats import compute_dashboard_stats
+
+def legacy_dashboard_stats(db, user_id, start_date=None, end_date=None):
+    """Reprodução da sequência de consultas da implementação anterior"""
+    def total(*conditions):
+        query = db.query(func.sum(Transaction.amount)).filter(Transaction.user_id == user_id, *conditions)
+        if start_date:
+            query = query.filter(Transaction.date >= start_date)
+        if end_date:
+            query = query.filter(Transaction.date <= end_date)
+        return query.scalar() or 0.0
+
+    def by_category(type_):
+        query = db.query(Transaction.category, func.sum(Transaction.amount)).filter(
+            Transaction.type == type_, Transaction.user_id == user_id
+        )
+        if start_date:
+            query = query.filter(Transaction.date >= start_date)
+        if end_date:
+            query = query.filter(Transaction.date <= end_date)
+        return dict(query.group_by(Transaction.category).all())
+
+    def month_total(type_, month_start, month_end):
+        return db.query(func.sum(Transaction.amount)).filter(
+            Transaction.type == type_,
+            Transaction.user_id == user_id,
+            Transaction.date >= month_start,
+            Transaction.date <= month_end
+        ).scalar() or 0.0
+
+    total(Transaction.type == "income")
+    total(Transaction.type == "expense")
+    total(Transaction.type == "expense", Transaction.subtype == "fixed")
+    total(Transaction.type == "expense", Transaction.subtype == "sporadic")
+    total(Transaction.type == "income", Transaction.subtype == "investment")
+    today = date.today()
+    month_start = today.replace(day=1)
+    month_total("income", month_start, today)
+    month_total("expense", month_start, today)
+    by_category("expense")
+    by_category("income")
+    for i in range(12):
+        start = date.today().replace(day=1)
+        start = start.replace(month=(start.month - i) % 12 or 12)
+        if start.month > date.today().month:
+            start = start.replace(year=start.year - 1)
+        end = start.replace(day=28)
+        month_total("income", start, end)
+        month_total("expense", start, end)
+    query = db.query(Transaction).filter(Transaction.user_id == user_id)
+    if start_date:
+        query = query.filter(Transaction.date >= start_date)
+    if end_date:
+        query = query.filter(Transaction.date <= end_date)
+    query.order_by(Transaction.date.desc()).limit(10).all()
+
+def run_case(engine, label, func, repeat, **filters):
+    db = make_session(engine)
+    try:
+        with count_queries(engine) as counter:
+            func(db, 1, **filters)
+        median, best = timed(lambda: func(db, 1, **filters), repeat)
+    finally:
+        db.close()
+    print(f"  {label:<10} consultas={counter['queries']:>3}  mediana={median * 1000:9.1f} ms  melhor={best * 1000:9.1f} ms")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--db", help="Reutilizar um banco já populado")
+    args = parser.parse_args()
+
+    engine, path = create_bench_engine(args.db)
+    if not args.db:
+        print(f"🔄 Populando {args.rows} transações em {path}...")
+        seed_transactions(engine, args.rows)
+
+    try:
+        cases = [
+            ("sem filtro", {}),
+            ("último ano", {"start_date": date.today() - timedelta(days=365), "end_date": date.today()}),
+        ]
+        for title, filters in cases:
+            print(f"📊 {title}")
+            run_case(engine, "antes", legacy_dashboard_stats, args.repeat, **filters)
+            run_case(engine, "depois", compute_dashboard_stats, args.repeat, **filters)
+    finally:
+        engine.dispose()
+        if not args.db:
+            os.remove(path)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,139 @@
+#!/usr/bin/env python3
+"""
+Benchmark de concorrência no SQLite (várias réplicas escrevendo no mesmo arquivo)
+
+Simula as réplicas do deployment com processos independentes, cada um com
+várias threads misturando leituras (totais do usuário) e escritas curtas
+(uma transação por commit). Compara o engine antigo (só
+check_same_thread=False, journal padrão) com o perfil sqlite_file de
+app/database.py (WAL, busy_timeout, pool limitado) e informa operações/s,
+latência e quantos erros "database is locked" ocorreram.
+
+Uso:
+    python3 benchmarks/bench_db_writes.py --processes 2 --threads 8 --seconds 5
+"""
+import argparse
+import multiprocessing
+import os
+import random
+import tempfile
+import threading
+import time
+from datetime import date
+from common import create_bench_engine
+
+from sqlalchemy import create_engine, func, insert, select
+from sqlalchemy.exc import OperationalError
+from app.database import Base, create_app_engine, pool_stats
+from app.models import Transaction
+
+def legacy_engine(path: str):
+    """Engine como era criado antes dos perfis"""
+    return create_engine(f"sqlite:///{path}", connect_args={"check_same_thread": False})
+
+def profile_engine(path: str):
+    return create_app_engine(f"sqlite:///{path}")
+
+ENGINES = {"antigo": legacy_engine, "perfil": profile_engine}
+
+def worker_thread(engine, seconds: float, write_ratio: float, seed: int, result: dict, lock: threading.Lock):
+    rng = random.Random(seed)
+    table = Transaction.__table__
+    reads = writes = errors = 0
+    latencies = []
+    deadline = time.perf_counter() + seconds
+    while time.perf_counter() < deadline:
+        user_id = rng.randint(1, 5)
+        start = time.perf_counter()
+        try:
+            if rng.random() < write_ratio:
+                with engine.begin() as conn:
+                    conn.execute(insert(table).values(
+                        user_id=user_id, type="expense", description="Concorrência",
+                        amount=round(rng.uniform(5, 500), 2), date=date.today(), category="Other"
+                    ))
+                writes += 1
+            else:
+                with engine.connect() as conn:
+                    conn.execute(
+                        select(func.count(table.c.id), func.sum(table.c.amount)).where(table.c.user_id == user_id)
+                    ).one()
+                reads += 1
+            latencies.append(time.perf_counter() - start)
+        except OperationalError:
+            errors += 1
+    with lock:
+        result["reads"] += reads
+        result["writes"] += writes
+        result["errors"] += errors
+        result["latencies"] += latencies
+
+def replica(mode: str, path: str, threads: int, seconds: float, write_ratio: float, index: int, queue):
+    """Um processo = uma réplica com seu próprio engine"""
+    engine = ENGINES[mode](path)
+    result = {"reads": 0, "writes": 0, "errors": 0, "latencies": []}
+    lock = threading.Lock()
+    workers = [
+        threading.Thread(target=worker_thread, args=(engine, seconds, write_ratio, index * 1000 + i, result, lock))
+        for i in range(threads)
+    ]
+    for thread in workers:
+        thread.start()
+    for thread in workers:
+        thread.join()
+    result["pool"] = pool_stats(engine)
+    engine.dispose()
+    queue.put(result)
+
+def run(mode: str, args) -> None:
+    if mode == "antigo":
+        handle, path = tempfile.mkstemp(suffix=".db", prefix="bench_")
+        os.close(handle)
+        engine = legacy_engine(path)
+        Base.metadata.create_all(bind=engine)
+    else:
+        engine, path = create_bench_engine()
+    engine.dispose()
+
+    queue = multiprocessing.Queue()
+    processes = [
+        multiprocessing.Process(target=replica, args=(mode, path, args.threads, args.seconds, args.write_ratio, i, queue))
+        for i in range(args.processes)
+    ]
+    try:
+        for process in processes:
+            process.start()
+        results = [queue.get() for _ in processes]
+        for process in processes:
+            process.join()
+    finally:
+        for suffix in ("", "-wal", "-shm", "-journal"):
+            if os.path.exists(path + suffix):
+                os.remove(path + suffix)
+
+    reads = sum(r["reads"] for r in results)
+    writes = sum(r["writes"] for r in results)
+    errors = sum(r["errors"] for r in results)
+    latencies = sorted(latency for r in results for latency in r["latencies"])
+    p95 = latencies[int(len(latencies) * 0.95)] * 1000 if latencies else 0.0
+    print(f"  {mode:<7} ops/s={(reads + writes) / args.seconds:,.0f}  escritas/s={writes / args.seconds:,.0f}  "
+          f"p95={p95:.1f} ms  'database is locked'={errors}")
+    waits = [r["pool"] for r in results if "wait_max_ms" in r["pool"]]
+    if waits:
+        print(f"          espera no pool: máx={max(w['wait_max_ms'] for w in waits):.1f} ms  "
+              f"timeouts={sum(w['timeouts'] for w in waits)}")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--processes", type=int, default=2, help="Processos (réplicas)")
+    parser.add_argument("--threads", type=int, default=8, help="Threads por processo")
+    parser.add_argument("--seconds", type=float, default=5, help="Duração de cada modo")
+    parser.add_argument("--write-ratio", type=float, default=0.3, help="Fração de operações de escrita")
+    args = parser.parse_args()
+
+    print(f"🗄️  {args.processes} processo(s) x {args.threads} thread(s), {args.write_ratio:.0%} escritas, {args.seconds:.0f} s por modo")
+    for mode in ENGINES:
+        run(mode, args)
+
+if __name__ == "__main__":
+    main()
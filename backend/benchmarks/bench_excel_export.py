@@ -0,0 +1,101 @@
+#!/usr/bin/env python3
+"""
+Benchmark de memória da exportação Excel
+
+Compara o pico de memória Python (tracemalloc) e o tempo da exportação antiga
+(ORM .all() -> lista de dicts -> DataFrame -> BytesIO copiado) com a
+exportação em streaming de app/services/excel_report.py.
+
+Uso:
+    python3 benchmarks/bench_excel_export.py --rows 500000
+"""
+import argparse
+import os
+import tempfile
+import time
+import tracemalloc
+from io import BytesIO
+from common import create_bench_engine, seed_transactions, make_session
+
+import pandas as pd
+from app.models import Transaction
+from app.services.excel_report import write_transactions_xlsx
+from app.utils.streaming import iter_file
+
+def legacy_export(db, user_id):
+    """Reprodução da exportação anterior baseada em pandas"""
+    transactions = db.query(Transaction).filter(
+        Transaction.user_id == user_id
+    ).order_by(Transaction.date.desc()).all()
+    data = [{
+        "Data": t.date.strftime("%d/%m/%Y"),
+        "Tipo": "Receita" if t.type == "income" else "Despesa",
+        "Descrição": t.description,
+        "Categoria": t.category or "Outro",
+        "Valor": t.amount,
+        "Observações": t.notes or "",
+    } for t in transactions]
+    df = pd.DataFrame(data)
+    output = BytesIO()
+    with pd.ExcelWriter(output, engine="openpyxl") as writer:
+        df.to_excel(writer, sheet_name="Transações", index=False)
+    output.seek(0)
+    return len(BytesIO(output.read()).getvalue())
+
+def streaming_export(db, user_id):
+    rows = db.query(
+        Transaction.date,
+        Transaction.type,
+        Transaction.description,
+        Transaction.category,
+        Transaction.amount,
+        Transaction.notes
+    ).filter(
+        Transaction.user_id == user_id
+    ).order_by(Transaction.date.desc()).yield_per(1000)
+    output = tempfile.TemporaryFile()
+    write_transactions_xlsx(rows, output)
+    output.seek(0)
+    return sum(len(chunk) for chunk in iter_file(output))
+
+def measure(engine, label, func):
+    db = make_session(engine)
+    try:
+        # Tempo medido sem tracemalloc, que deixa a execução bem mais lenta
+        start = time.perf_counter()
+        size = func(db, 1)
+        elapsed = time.perf_counter() - start
+        db.expunge_all()
+
+        tracemalloc.start()
+        func(db, 1)
+        _current, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+    finally:
+        db.close()
+    print(f"  {label:<10} pico={peak / 2**20:8.1f} MiB  tempo={elapsed:7.1f} s  arquivo={size / 2**20:6.1f} MiB")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=500_000)
+    parser.add_argument("--skip-legacy", action="store_true", help="Medir apenas a exportação em streaming")
+    parser.add_argument("--db", help="Reutilizar um banco já populado")
+    args = parser.parse_args()
+
+    engine, path = create_bench_engine(args.db)
+    if not args.db:
+        print(f"🔄 Populando {args.rows} transações em {path}...")
+        seed_transactions(engine, args.rows)
+
+    try:
+        print("📊 Exportação Excel")
+        if not args.skip_legacy:
+            measure(engine, "antes", legacy_export)
+        measure(engine, "depois", streaming_export)
+    finally:
+        engine.dispose()
+        if not args.db:
+            os.remove(path)
+
+if __name__ == "__main__":
+    main()
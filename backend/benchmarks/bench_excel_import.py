@@ -0,0 +1,180 @@
+#!/usr/bin/env python3
+"""
+Benchmark de vazão da importação Excel
+
+Compara linhas/s da importação antiga (iterrows + categorização por linha +
+um db.add por transação) com a importação vetorizada de
+app/services/excel_import.py. A leitura do arquivo (pd.read_excel) é igual
+nos dois caminhos, então o benchmark parte do DataFrame já carregado.
+
+Com --file o caminho completo do upload é medido: a planilha é gravada em
+um .xlsx (ou .csv) e importada em lotes a partir do arquivo, informando
+também o pico de memória Python, que não deve crescer com o arquivo.
+
+Uso:
+    python3 benchmarks/bench_excel_import.py --rows 50000
+    python3 benchmarks/bench_excel_import.py --rows 200000 --file xlsx
+"""
+import argparse
+import csv
+import os
+import random
+import tempfile
+import time
+import tracemalloc
+from datetime import date, datetime, timedelta
+from common import create_bench_engine, make_session
+
+import pandas as pd
+from app.models import Transaction
+from app.services.categorizer import BUILTIN_RULES
+from app.services.excel_import import import_dataframe, import_file
+from openpyxl import Workbook
+from app.services.rollups import new_deltas, add_transaction_delta, apply_rollup_deltas
+
+DESCRIPTIONS = ["Aluguel sala", "Conta de água", "Energia elétrica", "Internet fibra", "DAS mensal",
+                "Contabilidade", "Fatura mastercard", "Mercado", "Salário", "Freela"]
+
+def build_sheet(rows: int, seed: int = 42) -> pd.DataFrame:
+    """Planilha no layout SAÍDA (0-3) / SANGRIA (5-8) com duas linhas de cabeçalho"""
+    rng = random.Random(seed)
+    today = datetime.combine(date.today(), datetime.min.time())
+    data = [["SAÍDA", None, None, None, None, "SANGRIA", None, None, None],
+            ["Destino", "Valor", "Data", "OBS", None, "Origem", "Valor", "Data", "OBS"]]
+    for i in range(rows):
+        day = today - timedelta(days=rng.randrange(5 * 365))
+        data.append([
+            rng.choice(DESCRIPTIONS), round(rng.uniform(5, 5000), 2), day, None, None,
+            rng.choice(DESCRIPTIONS), round(rng.uniform(5, 5000), 2), day.strftime("%Y-%m-%d"), f"obs {i}",
+        ])
+    return pd.DataFrame(data)
+
+def write_sheet_file(df: pd.DataFrame, extension: str) -> str:
+    """Gravar a planilha em um arquivo temporário no formato do upload"""
+    handle, path = tempfile.mkstemp(suffix=f".{extension}", prefix="bench_import_")
+    os.close(handle)
+    rows = df.astype(object).where(df.notna(), None).itertuples(index=False, name=None)
+    if extension == "csv":
+        with open(path, "w", newline="", encoding="utf-8") as output:
+            writer = csv.writer(output, delimiter=";")
+            for row in rows:
+                writer.writerow([
+                    "" if value is None else value.strftime("%d/%m/%Y") if isinstance(value, datetime) else value
+                    for value in row
+                ])
+    else:
+        workbook = Workbook(write_only=True)
+        sheet = workbook.create_sheet()
+        for row in rows:
+            sheet.append(row)
+        workbook.save(path)
+    return path
+
+def file_import(engine, user_id, path, extension):
+    db = make_session(engine)
+    try:
+        for progress in import_file(db, user_id, path, f".{extension}"):
+            pass
+        return progress["count"]
+    finally:
+        db.close()
+
+def legacy_categorize(description: str) -> str:
+    description_lower = description.lower()
+    for category, words in BUILTIN_RULES:
+        if any(word in description_lower for word in words):
+            return category
+    return "Other"
+
+def legacy_import(db, user_id, df):
+    """Reprodução da importação anterior (uma linha por vez)"""
+    imported = 0
+    deltas = new_deltas()
+    for idx, row in df.iterrows():
+        if idx < 2:
+            continue
+        for type_, first in (("expense", 0), ("income", 5)):
+            description = row.iloc[first] if pd.notna(row.iloc[first]) else None
+            amount = row.iloc[first + 1] if pd.notna(row.iloc[first + 1]) else None
+            value = row.iloc[first + 2] if pd.notna(row.iloc[first + 2]) else None
+            if description and pd.notna(amount):
+                if isinstance(value, datetime):
+                    date_obj = value.date()
+                elif isinstance(value, str):
+                    try:
+                        date_obj = datetime.strptime(value, "%Y-%m-%d").date()
+                    except ValueError:
+                        date_obj = date.today()
+                else:
+                    date_obj = date.today()
+                transaction = Transaction(
+                    user_id=user_id,
+                    type=type_,
+                    description=str(description),
+                    amount=float(amount),
+                    date=date_obj,
+                    category=legacy_categorize(str(description)),
+                    notes=row.iloc[first + 3] if pd.notna(row.iloc[first + 3]) else None
+                )
+                db.add(transaction)
+                add_transaction_delta(deltas, transaction)
+                imported += 1
+    apply_rollup_deltas(db, deltas)
+    db.commit()
+    return imported
+
+def vectorized_import(db, user_id, df):
+    result = import_dataframe(db, user_id, df)
+    db.commit()
+    return result["count"]
+
+def run(engine, label, func, user_id, df):
+    db = make_session(engine)
+    try:
+        start = time.perf_counter()
+        imported = func(db, user_id, df)
+        elapsed = time.perf_counter() - start
+    finally:
+        db.close()
+    print(f"  {label:<12} transações={imported}  tempo={elapsed:.2f} s  linhas/s={imported / elapsed:,.0f}")
+    return elapsed
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=50_000, help="Linhas da planilha (cada uma gera duas transações)")
+    parser.add_argument("--skip-legacy", action="store_true", help="Medir apenas a importação vetorizada")
+    parser.add_argument("--file", choices=["xlsx", "csv"], help="Importar a partir de um arquivo (upload completo)")
+    args = parser.parse_args()
+
+    engine, path = create_bench_engine()
+    try:
+        df = build_sheet(args.rows)
+        if args.file:
+            sheet_path = write_sheet_file(df, args.file)
+            del df
+            try:
+                print(f"📥 Importação de {args.rows} linhas a partir de .{args.file} ({os.path.getsize(sheet_path) / 2**20:.1f} MiB)")
+                start = time.perf_counter()
+                imported = file_import(engine, 1, sheet_path, args.file)
+                elapsed = time.perf_counter() - start
+                print(f"  transações={imported}  tempo={elapsed:.2f} s  linhas/s={imported / elapsed:,.0f}")
+                tracemalloc.start()
+                file_import(engine, 2, sheet_path, args.file)
+                _current, peak = tracemalloc.get_traced_memory()
+                tracemalloc.stop()
+                print(f"  pico={peak / 2**20:.1f} MiB")
+            finally:
+                os.remove(sheet_path)
+            return
+
+        print(f"📥 Importação de {args.rows} linhas ({args.rows * 2} transações)")
+        new = run(engine, "vetorizada", vectorized_import, 1, df)
+        if not args.skip_legacy:
+            old = run(engine, "antiga", legacy_import, 2, df)
+            print(f"  ganho={old / new:.1f}x")
+    finally:
+        engine.dispose()
+        os.remove(path)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,119 @@
+#!/usr/bin/env python3
+"""
+Benchmark de vazão do login
+
+Dispara logins concorrentes contra a aplicação (httpx + ASGITransport, sem
+rede) e informa logins/s e logins/s por núcleo do pool de hash. Ao mesmo
+tempo mede a latência de /api/health: com o bcrypt fora do event loop ela
+deve continuar baixa mesmo com o pool saturado.
+
+O custo e o tamanho do pool são lidos das variáveis BCRYPT_ROUNDS e
+PASSWORD_HASH_WORKERS, que aqui vêm de --rounds e --workers.
+
+Uso:
+    python3 benchmarks/bench_login.py --logins 200 --concurrency 32
+    python3 benchmarks/bench_login.py --rounds 10 --workers 4
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import tempfile
+import time
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--logins", type=int, default=200, help="Total de logins")
+    parser.add_argument("--concurrency", type=int, default=32, help="Logins simultâneos")
+    parser.add_argument("--rounds", type=int, default=12, help="Custo do bcrypt (BCRYPT_ROUNDS)")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="Threads do pool de hash")
+    return parser.parse_args()
+
+ARGS = parse_args()
+# As configurações são lidas na importação da aplicação
+os.environ["BCRYPT_ROUNDS"] = str(ARGS.rounds)
+os.environ["PASSWORD_HASH_WORKERS"] = str(ARGS.workers)
+os.environ["PASSWORD_HASH_MAX_QUEUE"] = str(max(ARGS.concurrency * 2, 64))
+# O login usa a sessão assíncrona do app, então o banco temporário vai pela DATABASE_URL
+_handle, DB_PATH = tempfile.mkstemp(suffix=".db", prefix="bench_login_")
+os.close(_handle)
+os.environ["DATABASE_URL"] = f"sqlite:///{DB_PATH}"
+
+from common import create_bench_engine, make_session
+
+import httpx
+from app.database import async_engine
+from app.main import app
+from app.models import User
+from app.middleware.rate_limit import limiter
+from app.services.password_hashing import hash_password, hashing_stats
+
+PASSWORD = "Bench@12345"
+
+def create_user(engine) -> None:
+    db = make_session(engine)
+    try:
+        db.add(User(email="bench@example.com", username="bench", hashed_password=hash_password(PASSWORD), role="user"))
+        db.commit()
+    finally:
+        db.close()
+
+async def login_worker(client, remaining: list, latencies: list):
+    while remaining:
+        remaining.pop()
+        start = time.perf_counter()
+        response = await client.post("/api/auth/login", data={"username": "bench", "password": PASSWORD})
+        response.raise_for_status()
+        latencies.append(time.perf_counter() - start)
+
+async def health_probe(client, stop: asyncio.Event, latencies: list):
+    while not stop.is_set():
+        start = time.perf_counter()
+        await client.get("/api/health")
+        latencies.append(time.perf_counter() - start)
+        await asyncio.sleep(0.01)
+
+async def run_benchmark(args):
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        # Aquecimento (cria o pool de threads e as conexões)
+        await login_worker(client, [None], [])
+
+        remaining = [None] * args.logins
+        login_latencies, health_latencies = [], []
+        stop = asyncio.Event()
+        probe = asyncio.create_task(health_probe(client, stop, health_latencies))
+        start = time.perf_counter()
+        await asyncio.gather(*(login_worker(client, remaining, login_latencies) for _ in range(args.concurrency)))
+        elapsed = time.perf_counter() - start
+        stop.set()
+        await probe
+    return elapsed, login_latencies, health_latencies
+
+def percentile(values: list, fraction: float) -> float:
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * fraction))]
+
+def main():
+    args = ARGS
+    engine, path = create_bench_engine(DB_PATH)
+    if limiter is not None:
+        limiter.enabled = False
+    try:
+        create_user(engine)
+        cores = min(args.workers, os.cpu_count() or 1)
+        print(f"🔐 {args.logins} logins, {args.concurrency} simultâneos, bcrypt rounds={args.rounds}, pool={args.workers} ({cores} núcleo(s))")
+        elapsed, logins, health = asyncio.run(run_benchmark(args))
+        rate = len(logins) / elapsed
+        print(f"  tempo={elapsed:.2f} s  logins/s={rate:,.1f}  logins/s por núcleo={rate / cores:,.1f}")
+        print(f"  login  p50={statistics.median(logins) * 1000:.0f} ms  p95={percentile(logins, 0.95) * 1000:.0f} ms")
+        if health:
+            print(f"  health p50={statistics.median(health) * 1000:.1f} ms  p95={percentile(health, 0.95) * 1000:.1f} ms  ({len(health)} amostras)")
+        print(f"  pool: {hashing_stats()}")
+    finally:
+        engine.dispose()
+        asyncio.run(async_engine.dispose())
+        os.remove(path)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,71 @@
+#!/usr/bin/env python3
+"""
+Benchmark da renderização do relatório PDF
+
+Mede páginas por segundo (e, com --memory, o pico de memória Python) da
+renderização incremental em app/services/pdf_report.py.
+
+Uso:
+    python3 benchmarks/bench_pdf_report.py --rows 100000
+"""
+import argparse
+import os
+import tempfile
+import time
+import tracemalloc
+from common import create_bench_engine, seed_transactions, make_session
+
+from app.models import Transaction
+from app.services.pdf_report import write_transactions_pdf
+
+def render(engine):
+    """Renderizar o relatório completo do usuário 1 e retornar (páginas, bytes)"""
+    db = make_session(engine)
+    try:
+        rows = db.query(
+            Transaction.date,
+            Transaction.type,
+            Transaction.description,
+            Transaction.category,
+            Transaction.amount
+        ).filter(
+            Transaction.user_id == 1
+        ).order_by(Transaction.date.desc()).yield_per(500)
+        with tempfile.TemporaryFile() as output:
+            pages = write_transactions_pdf(rows, 0.0, 0.0, "Período: Início a Hoje", output)
+            return pages, output.tell()
+    finally:
+        db.close()
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=100_000)
+    parser.add_argument("--memory", action="store_true", help="Medir também o pico de memória (mais lento)")
+    parser.add_argument("--db", help="Reutilizar um banco já populado")
+    args = parser.parse_args()
+
+    engine, path = create_bench_engine(args.db)
+    if not args.db:
+        print(f"🔄 Populando {args.rows} transações em {path}...")
+        seed_transactions(engine, args.rows)
+
+    try:
+        print("📄 Relatório PDF")
+        start = time.perf_counter()
+        pages, size = render(engine)
+        elapsed = time.perf_counter() - start
+        print(f"  páginas={pages}  tempo={elapsed:.1f} s  páginas/s={pages / elapsed:.1f}  arquivo={size / 2**20:.1f} MiB")
+
+        if args.memory:
+            tracemalloc.start()
+            render(engine)
+            _current, peak = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+            print(f"  pico={peak / 2**20:.1f} MiB")
+    finally:
+        engine.dispose()
+        if not args.db:
+            os.remove(path)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,94 @@
+#!/usr/bin/env python3
+"""
+Benchmark do middleware de headers de segurança
+
+Compara requisições/s de um app mínimo sem middleware, com a versão antiga
+(BaseHTTPMiddleware, reproduzida aqui) e com o middleware ASGI atual, numa
+rota JSON e numa rota em streaming (como os relatórios). As requisições
+passam por httpx + ASGITransport, sem rede, então a diferença medida é só
+o custo do middleware.
+
+Uso:
+    python3 benchmarks/bench_security_headers.py --requests 5000 --concurrency 50
+"""
+import argparse
+import asyncio
+import time
+
+import common  # noqa: F401 - coloca o backend no sys.path
+
+import httpx
+from fastapi import FastAPI
+from fastapi.responses import StreamingResponse
+from starlette.middleware.base import BaseHTTPMiddleware
+from app.config import settings
+from app.middleware.security import SecurityHeadersMiddleware
+
+STREAM_CHUNKS = 32
+CHUNK = b"x" * 1024
+
+class LegacySecurityHeadersMiddleware(BaseHTTPMiddleware):
+    """Implementação anterior (BaseHTTPMiddleware)"""
+
+    async def dispatch(self, request, call_next):
+        response = await call_next(request)
+        for name, value in settings.security_headers:
+            response.headers[name] = value
+        return response
+
+def build_app(middleware=None) -> FastAPI:
+    app = FastAPI()
+
+    @app.get("/json")
+    async def json_route():
+        return {"status": "ok"}
+
+    @app.get("/stream")
+    async def stream_route():
+        async def chunks():
+            for _ in range(STREAM_CHUNKS):
+                yield CHUNK
+        return StreamingResponse(chunks(), media_type="application/octet-stream")
+
+    if middleware is not None:
+        app.add_middleware(middleware)
+    return app
+
+async def run(app: FastAPI, path: str, total: int, concurrency: int) -> float:
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        # Aquecimento (monta a pilha de middlewares)
+        (await client.get(path)).raise_for_status()
+        remaining = iter(range(total))
+
+        async def worker():
+            for _ in remaining:
+                response = await client.get(path)
+                response.raise_for_status()
+
+        started = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+        return total / (time.perf_counter() - started)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=5_000, help="Requisições por caso")
+    parser.add_argument("--concurrency", type=int, default=50, help="Requisições simultâneas")
+    args = parser.parse_args()
+
+    cases = [
+        ("sem middleware", None),
+        ("BaseHTTPMiddleware", LegacySecurityHeadersMiddleware),
+        ("ASGI", SecurityHeadersMiddleware),
+    ]
+    print(f"🛡️  {args.requests} requisições por caso, {args.concurrency} simultâneas")
+    for path in ("/json", "/stream"):
+        print(f"📊 {path}")
+        baseline = None
+        for title, middleware in cases:
+            rps = asyncio.run(run(build_app(middleware), path, args.requests, args.concurrency))
+            baseline = baseline or rps
+            print(f"  {title:<20} req/s={rps:8.0f}  ({rps / baseline:.0%} do app sem middleware)")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,93 @@
+"""
+Utilitários compartilhados pelos benchmarks
+"""
+import os
+import random
+import sys
+import tempfile
+import time
+from contextlib import contextmanager
+from datetime import date, timedelta
+
+# Adicionar o diretório do backend ao path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import event, insert
+from sqlalchemy.orm import sessionmaker
+from app.database import Base, create_app_engine
+from app.models import Transaction
+from app.services.rollups import rebuild_rollups
+
+CATEGORIES = ["Aluguel", "Água", "Luz", "Internet", "DAS", "Contabilidade", "Credit Card", "Salary", "Other"]
+SUBTYPES = {
+    "expense": ["fixed", "sporadic", None],
+    "income": ["investment", "received", None],
+}
+
+def create_bench_engine(path: str = None):
+    """Criar engine SQLite em arquivo temporário (perfil da aplicação) com todas as tabelas"""
+    if path is None:
+        handle, path = tempfile.mkstemp(suffix=".db", prefix="bench_")
+        os.close(handle)
+    engine = create_app_engine(f"sqlite:///{path}")
+    Base.metadata.create_all(bind=engine)
+    return engine, path
+
+def seed_transactions(engine, rows: int, user_id: int = 1, years: int = 5, batch_size: int = 50_000, seed: int = 42):
+    """Inserir `rows` transações aleatórias distribuídas nos últimos `years` anos"""
+    rng = random.Random(seed)
+    today = date.today()
+    span_days = years * 365
+    with engine.begin() as conn:
+        batch = []
+        for i in range(rows):
+            type_ = "income" if rng.random() < 0.3 else "expense"
+            batch.append({
+                "user_id": user_id,
+                "type": type_,
+                "subtype": rng.choice(SUBTYPES[type_]),
+                "description": f"Lançamento {i}",
+                "amount": round(rng.uniform(5, 5000), 2),
+                "date": today - timedelta(days=rng.randrange(span_days)),
+                "category": rng.choice(CATEGORIES),
+            })
+            if len(batch) >= batch_size:
+                conn.execute(insert(Transaction), batch)
+                batch = []
+        if batch:
+            conn.execute(insert(Transaction), batch)
+
+    # Popular os agregados mensais como o rebuild_rollups.py faria
+    db = make_session(engine)
+    try:
+        rebuild_rollups(db)
+        db.commit()
+    finally:
+        db.close()
+
+def make_session(engine):
+    return sessionmaker(autocommit=False, autoflush=False, bind=engine)()
+
+@contextmanager
+def count_queries(engine):
+    """Contar as consultas executadas no bloco"""
+    counter = {"queries": 0}
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        counter["queries"] += 1
+
+    event.listen(engine, "before_cursor_execute", before_cursor_execute)
+    try:
+        yield counter
+    finally:
+        event.remove(engine, "before_cursor_execute", before_cursor_execute)
+
+def timed(func, repeat: int = 5):
+    """Executar `func` `repeat` vezes e retornar (mediana, melhor) em segundos"""
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        samples.append(time.perf_counter() - start)
+    samples.sort()
+    return samples[len(samples) // 2], samples[0]
@@ -0,0 +1,238 @@
+#!/usr/bin/env python3
+"""
+Verificador de planos de consulta (EXPLAIN QUERY PLAN)
+
+Sobe a API contra um banco SQLite temporário, chama as rotas principais,
+captura cada SELECT/UPDATE/DELETE emitido e falha (código de saída 1) se
+algum deles fizer varredura completa em transactions, monthly_rollups,
+refresh_tokens ou user_data_versions, ou se alguma rota passar do seu
+orçamento de consultas (QUERY_BUDGETS), o que denuncia um N+1.
+"""
+import sys
+import os
+import random
+import tempfile
+from datetime import date, timedelta
+
+# Banco temporário (precisa ser definido antes de importar o app)
+_handle, DB_PATH = tempfile.mkstemp(suffix=".db", prefix="query_plans_")
+os.close(_handle)
+os.environ["DATABASE_URL"] = f"sqlite:///{DB_PATH}"
+
+# Adicionar o diretório atual ao path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from sqlalchemy import event, insert, text
+from fastapi.testclient import TestClient
+from app.main import app
+from app.database import async_engine, engine, SessionLocal
+from app.models import Transaction, User
+from app.auth import get_password_hash
+from app.services.query_profiler import QueryBudgetExceeded, query_budget
+from app.services.rollups import rebuild_rollups
+from app.services.token_store import prune_refresh_tokens
+
+CHECKED_TABLES = ("transactions", "monthly_rollups", "refresh_tokens", "user_data_versions")
+USERS = 5
+ROWS_PER_USER = 2000
+PASSWORD = "Plan-Check-Passw0rd!"
+# Máximo de consultas por rota, com o usuário já no cache e o cache do
+# dashboard frio (cada rota roda logo depois de uma escrita)
+QUERY_BUDGETS = [
+    ("GET", "/api/transactions/", 2),
+    ("GET", "/api/transactions/{id}", 2),
+    ("GET", "/api/dashboard/stats", 3),
+    ("GET", "/api/dashboard/trend", 2),
+    ("GET", "/api/reports/excel", 4),
+    ("PUT", "/api/transactions/{id}", 6),
+    ("DELETE", "/api/transactions/{id}", 5),
+]
+
+def seed():
+    """Criar usuários e transações suficientes para o planner preferir índices"""
+    rng = random.Random(7)
+    today = date.today()
+    db = SessionLocal()
+    try:
+        for i in range(USERS):
+            db.add(User(
+                email=f"plan{i}@example.com",
+                username=f"plan{i}",
+                hashed_password=get_password_hash(PASSWORD),
+                role="admin" if i == 0 else "user",
+                is_superuser=i == 0
+            ))
+        db.commit()
+        user_ids = [u.id for u in db.query(User).all()]
+        rows = []
+        for user_id in user_ids:
+            for n in range(ROWS_PER_USER):
+                type_ = rng.choice(["income", "expense"])
+                rows.append({
+                    "user_id": user_id,
+                    "type": type_,
+                    "subtype": rng.choice(["fixed", "sporadic", "investment", "received", None]),
+                    "description": f"Lançamento {n}",
+                    "amount": round(rng.uniform(1, 1000), 2),
+                    "date": today - timedelta(days=rng.randrange(1500)),
+                    "category": rng.choice(["Aluguel", "Luz", "Internet", "Salary", "Other"]),
+                })
+        db.execute(insert(Transaction), rows)
+        rebuild_rollups(db)
+        db.commit()
+        db.execute(text("ANALYZE"))
+        db.commit()
+    finally:
+        db.close()
+
+def exercise_routes(client: TestClient):
+    """Chamar as rotas que consultam as tabelas verificadas"""
+    response = client.post("/api/auth/login", data={"username": "plan0", "password": PASSWORD})
+    response.raise_for_status()
+    tokens = response.json()
+    headers = {"Authorization": f"Bearer {tokens['access_token']}"}
+
+    today = date.today()
+    month_start = today.replace(day=1)
+    last_year = (today - timedelta(days=365)).isoformat()
+
+    calls = [
+        ("GET", "/api/transactions/", {}),
+        ("GET", "/api/transactions/", {"skip": 500, "limit": 50}),
+        ("GET", "/api/transactions/", {"transaction_type": "expense", "start_date": last_year}),
+        ("GET", "/api/transactions/", {"start_date": last_year, "end_date": today.isoformat()}),
+        ("GET", "/api/dashboard/stats", {}),
+        ("GET", "/api/dashboard/stats", {"start_date": last_year, "end_date": today.isoformat()}),
+        ("GET", "/api/dashboard/stats", {"start_date": month_start.isoformat()}),
+        ("GET", "/api/dashboard/trend", {"granularity": "day", "horizon": 90}),
+        ("GET", "/api/dashboard/trend", {"granularity": "week"}),
+        ("GET", "/api/dashboard/trend", {"granularity": "quarter"}),
+        ("GET", "/api/reports/pdf", {"start_date": last_year, "transaction_type": "income"}),
+        ("GET", "/api/reports/excel", {"category": "Luz"}),
+    ]
+    for method, path, params in calls:
+        response = client.request(method, path, params=params, headers=headers)
+        response.raise_for_status()
+
+    # Requisição condicional: só a versão dos dados é consultada
+    etag = client.get("/api/dashboard/stats", headers=headers).headers["ETag"]
+    response = client.get("/api/dashboard/stats", headers={**headers, "If-None-Match": etag})
+    assert response.status_code == 304, response.status_code
+
+    page = client.get("/api/transactions/", params={"limit": 50}, headers=headers)
+    page.raise_for_status()
+    client.get("/api/transactions/", headers=headers, params={
+        "limit": 50, "cursor": page.headers["X-Next-Cursor"]
+    }).raise_for_status()
+
+    response = client.post("/api/dashboard/hourly-calculation", headers=headers, json={
+        "month": today.month, "year": today.year, "days_worked": 20, "hours_per_day": 8
+    })
+    response.raise_for_status()
+
+    created = client.post("/api/transactions/", headers=headers, json={
+        "type": "expense", "description": "Plano", "amount": 10, "date": today.isoformat()
+    })
+    created.raise_for_status()
+    transaction_id = created.json()["id"]
+    client.get(f"/api/transactions/{transaction_id}", headers=headers).raise_for_status()
+    client.put(f"/api/transactions/{transaction_id}", headers=headers, json={"amount": 20}).raise_for_status()
+    client.delete(f"/api/transactions/{transaction_id}", headers=headers).raise_for_status()
+
+    client.post("/api/auth/refresh", json={"refresh_token": tokens["refresh_token"]}).raise_for_status()
+    client.post("/api/auth/logout", headers=headers, json={"refresh_token": tokens["refresh_token"]}).raise_for_status()
+    client.post("/api/auth/logout-all", headers=headers).raise_for_status()
+    db = SessionLocal()
+    try:
+        prune_refresh_tokens(db)
+    finally:
+        db.close()
+
+def capture_statements(client: TestClient) -> list:
+    statements = {}
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        if executemany or not statement.lstrip().upper().startswith(("SELECT", "UPDATE", "DELETE")):
+            return
+        if any(table in statement for table in CHECKED_TABLES):
+            statements.setdefault(statement, parameters)
+
+    # Rotas síncronas usam engine; as assíncronas, async_engine
+    engines = (engine, async_engine.sync_engine)
+    for target in engines:
+        event.listen(target, "before_cursor_execute", before_cursor_execute)
+    try:
+        exercise_routes(client)
+    finally:
+        for target in engines:
+            event.remove(target, "before_cursor_execute", before_cursor_execute)
+    return list(statements.items())
+
+def check_query_budgets(client: TestClient) -> list:
+    """Rotas que passaram do orçamento de consultas"""
+    response = client.post("/api/auth/login", data={"username": "plan1", "password": PASSWORD})
+    response.raise_for_status()
+    headers = {"Authorization": f"Bearer {response.json()['access_token']}"}
+    client.get("/api/auth/me", headers=headers).raise_for_status()
+
+    failures = []
+    for method, path, budget in QUERY_BUDGETS:
+        created = client.post("/api/transactions/", headers=headers, json={
+            "type": "expense", "description": "Orçamento", "amount": 10, "date": date.today().isoformat()
+        })
+        created.raise_for_status()
+        url = path.format(id=created.json()["id"])
+        body = {"amount": 20} if method == "PUT" else None
+        try:
+            with query_budget(budget, f"{method} {path}"):
+                client.request(method, url, headers=headers, json=body).raise_for_status()
+        except QueryBudgetExceeded as e:
+            failures.append(str(e))
+    return failures
+
+def full_scans(plan_rows) -> list:
+    return [
+        detail for *_ids, detail in plan_rows
+        if any(detail.startswith(f"SCAN {table}") for table in CHECKED_TABLES)
+    ]
+
+def main() -> int:
+    print("🔍 Verificando planos de consulta...")
+    seed()
+    client = TestClient(app)
+    statements = capture_statements(client)
+
+    failures = []
+    raw = engine.raw_connection()
+    try:
+        cursor = raw.cursor()
+        for statement, parameters in statements:
+            cursor.execute(f"EXPLAIN QUERY PLAN {statement}", parameters)
+            scans = full_scans(cursor.fetchall())
+            if scans:
+                failures.append((statement, scans))
+    finally:
+        raw.close()
+
+    print(f"   {len(statements)} consultas analisadas")
+    for statement, scans in failures:
+        print(f"❌ Varredura completa: {', '.join(scans)}")
+        print(f"   {' '.join(statement.split())}")
+    if not failures:
+        print(f"✅ Nenhuma varredura completa em {'/'.join(CHECKED_TABLES)}")
+
+    over_budget = check_query_budgets(client)
+    for failure in over_budget:
+        print(f"❌ Orçamento de consultas excedido em {failure}")
+    if not over_budget:
+        print(f"✅ {len(QUERY_BUDGETS)} rotas dentro do orçamento de consultas")
+
+    return 1 if failures or over_budget else 0
+
+if __name__ == "__main__":
+    try:
+        exit_code = main()
+    finally:
+        engine.dispose()
+        os.remove(DB_PATH)
+    sys.exit(exit_code)
@@ -11,6 +11,18 @@ python3 init_db.py
 echo "🔄 Executando migração de user_id..."
 python3 migrate_add_user_id.py
 
+# Refresh tokens por hash (recria a tabela antiga e remove tokens vencidos)
+echo "🔑 Executando migração de refresh tokens..."
+python3 migrate_refresh_tokens.py
+
+# Criar índices compostos ausentes (idempotente)
+echo "🗂️  Executando migração de índices..."
+python3 migrate_add_indexes.py
+
+# Verificar/corrigir agregados mensais (preenche a tabela em bancos existentes)
+echo "📊 Verificando agregados mensais..."
+python3 rebuild_rollups.py
+
 # Testar login do admin
 echo ""
 echo "🧪 Testando login do admin..."
@@ -0,0 +1,52 @@
+#!/usr/bin/env python3
+"""
+Script de migração para criar os índices declarados nos modelos.
+
+Base.metadata.create_all só cria índices junto com tabelas novas; bancos
+existentes recebem aqui os índices compostos de transactions (e de
+qualquer outra tabela). Pode ser executado várias vezes.
+"""
+import sys
+import os
+
+# Adicionar o diretório atual ao path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from sqlalchemy import inspect, text
+from app.database import engine, Base
+import app.models  # noqa: F401 - registrar os modelos no metadata
+
+def migrate_add_indexes():
+    """Criar índices ausentes e atualizar as estatísticas do planner"""
+    print("🔄 Iniciando migração: índices das tabelas...")
+    try:
+        Base.metadata.create_all(bind=engine)
+        inspector = inspect(engine)
+        created = 0
+
+        for table in Base.metadata.sorted_tables:
+            existing = {index["name"] for index in inspector.get_indexes(table.name)}
+            for index in sorted(table.indexes, key=lambda i: i.name):
+                if index.name in existing:
+                    continue
+                print(f"📝 Criando índice {index.name} em {table.name}...")
+                index.create(bind=engine, checkfirst=True)
+                created += 1
+
+        if created:
+            print(f"✅ {created} índice(s) criado(s)")
+        else:
+            print("✅ Todos os índices já existem")
+
+        # Atualizar estatísticas usadas pelo planner
+        with engine.begin() as conn:
+            conn.execute(text("ANALYZE"))
+        print("✅ Estatísticas do banco atualizadas")
+    except Exception as e:
+        print(f"❌ Erro durante a migração: {str(e)}")
+        import traceback
+        traceback.print_exc()
+        sys.exit(1)
+
+if __name__ == "__main__":
+    migrate_add_indexes()
@@ -19,35 +19,16 @@ def migrate_add_user_id():
     try:
         print("🔄 Iniciando migração: adicionar user_id às transações...")
         
-        # Verificar se a coluna já existe usando PRAGMA table_info (SQLite)
-        try:
-            result = db.execute(text("PRAGMA table_info(transactions)"))
-            columns = [row[1] for row in result.fetchall()]  # row[1] é o nome da coluna
-            
-            if 'user_id' in columns:
-                print("✅ Coluna user_id já existe. Verificando transações sem user_id...")
-            else:
-                print("📝 Adicionando coluna user_id à tabela transactions...")
-                # Adicionar coluna user_id (permitir NULL temporariamente)
-                db.execute(text("ALTER TABLE transactions ADD COLUMN user_id INTEGER"))
-                db.commit()
-                print("✅ Coluna user_id adicionada")
-        except Exception as e:
-            # Se falhar, tentar adicionar a coluna mesmo assim (pode já existir)
-            print(f"⚠️  Verificação de coluna falhou: {str(e)}")
-            print("📝 Tentando adicionar coluna user_id...")
-            try:
-                db.execute(text("ALTER TABLE transactions ADD COLUMN user_id INTEGER"))
-                db.commit()
-                print("✅ Coluna user_id adicionada")
-            except Exception as add_error:
-                # Se falhar ao adicionar, provavelmente já existe
-                error_msg = str(add_error).lower()
-                if "duplicate column" in error_msg or "already exists" in error_msg or "duplicate" in error_msg:
-                    print("✅ Coluna user_id já existe")
-                else:
-                    # Se for outro erro, relançar
-                    raise add_error
+        # Verificar se a coluna já existe (inspector funciona em SQLite e PostgreSQL)
+        columns = [column["name"] for column in inspect(engine).get_columns("transactions")]
+        if 'user_id' in columns:
+            print("✅ Coluna user_id já existe. Verificando transações sem user_id...")
+        else:
+            print("📝 Adicionando coluna user_id à tabela transactions...")
+            # Adicionar coluna user_id (permitir NULL temporariamente)
+            db.execute(text("ALTER TABLE transactions ADD COLUMN user_id INTEGER"))
+            db.commit()
+            print("✅ Coluna user_id adicionada")
         
         # Buscar o primeiro usuário admin (ou primeiro usuário se não houver admin)
         admin_user = db.query(User).filter(
@@ -0,0 +1,64 @@
+#!/usr/bin/env python3
+"""
+Script de migração da tabela refresh_tokens para o armazenamento por hash.
+
+Versões antigas guardavam o token em texto puro (coluna `token`) e nunca
+apagavam linhas. A tabela é recriada com `token_hash` e os índices novos;
+apenas os tokens ainda válidos são copiados (já com o hash), então as
+sessões ativas continuam funcionando. Pode ser executado várias vezes:
+em bancos já migrados só remove os tokens vencidos ou revogados.
+"""
+import sys
+import os
+
+# Adicionar o diretório atual ao path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from datetime import datetime
+from sqlalchemy import DateTime, inspect, insert, text
+from app.database import SessionLocal, engine, Base
+from app.models import RefreshToken
+from app.services.token_store import hash_token, prune_refresh_tokens
+
+def migrate_refresh_tokens():
+    """Converter tokens em texto puro para hash e limpar tokens vencidos"""
+    print("🔄 Iniciando migração: refresh tokens por hash...")
+    try:
+        Base.metadata.create_all(bind=engine)
+        columns = {column["name"] for column in inspect(engine).get_columns("refresh_tokens")}
+
+        if "token_hash" not in columns:
+            with engine.begin() as conn:
+                # Linhas convertidas antes do DROP: no SQLite o DDL não volta com rollback
+                rows = conn.execute(text(
+                    "SELECT token, user_id, expires_at, created_at FROM refresh_tokens "
+                    "WHERE is_revoked = 0 AND expires_at > :now"
+                ).columns(expires_at=DateTime, created_at=DateTime), {"now": datetime.utcnow()}).fetchall()
+                records = [
+                    {"token_hash": hash_token(token), "user_id": user_id, "expires_at": expires_at,
+                     "created_at": created_at, "is_revoked": False}
+                    for token, user_id, expires_at, created_at in rows
+                ]
+                print(f"📝 Recriando refresh_tokens ({len(records)} token(s) válido(s) preservado(s))...")
+                conn.execute(text("DROP TABLE refresh_tokens"))
+                RefreshToken.__table__.create(bind=conn)
+                if records:
+                    conn.execute(insert(RefreshToken.__table__), records)
+            print("✅ Tabela refresh_tokens migrada")
+        else:
+            print("✅ refresh_tokens já usa hash")
+
+        db = SessionLocal()
+        try:
+            deleted = prune_refresh_tokens(db)
+        finally:
+            db.close()
+        print(f"✅ {deleted} token(s) vencido(s) ou revogado(s) removido(s)")
+    except Exception as e:
+        print(f"❌ Erro durante a migração: {str(e)}")
+        import traceback
+        traceback.print_exc()
+        sys.exit(1)
+
+if __name__ == "__main__":
+    migrate_refresh_tokens()
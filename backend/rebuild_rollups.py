@@ -0,0 +1,71 @@
+#!/usr/bin/env python3
+"""
+Script para verificar e reconstruir a tabela monthly_rollups
+
+Uso:
+    python3 rebuild_rollups.py              # verifica e corrige usuários com divergência
+    python3 rebuild_rollups.py --check      # apenas verifica (sai com código 1 se houver divergência)
+    python3 rebuild_rollups.py --full       # reconstrói a tabela inteira
+    python3 rebuild_rollups.py --user-id 3  # restringe a um usuário
+"""
+import argparse
+import sys
+import os
+
+# Adicionar o diretório atual ao path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from app.database import engine, Base, SessionLocal
+from app.services.rollups import find_drift, rebuild_rollups
+
+def main():
+    parser = argparse.ArgumentParser(description="Verificar e reconstruir monthly_rollups")
+    parser.add_argument("--check", action="store_true", help="Apenas verificar, sem corrigir")
+    parser.add_argument("--full", action="store_true", help="Reconstruir todos os agregados")
+    parser.add_argument("--user-id", type=int, help="Restringir a um usuário")
+    args = parser.parse_args()
+
+    Base.metadata.create_all(bind=engine)
+
+    db = SessionLocal()
+    try:
+        if args.full:
+            print("🔄 Reconstruindo monthly_rollups...")
+            user_ids = [args.user_id] if args.user_id is not None else None
+            count = rebuild_rollups(db, user_ids)
+            db.commit()
+            print(f"✅ {count} agregados recriados")
+            return 0
+
+        print("🔍 Verificando monthly_rollups...")
+        drift = find_drift(db, args.user_id)
+        if not drift:
+            print("✅ Agregados consistentes")
+            return 0
+
+        affected_users = sorted({item["key"][0] for item in drift})
+        print(f"⚠️  {len(drift)} agregados divergentes em {len(affected_users)} usuário(s)")
+        for item in drift[:20]:
+            print(f"   {item['key']}: esperado={item['expected']} atual={item['actual']}")
+        if len(drift) > 20:
+            print(f"   ... e mais {len(drift) - 20}")
+
+        if args.check:
+            return 1
+
+        print("🔧 Corrigindo agregados dos usuários afetados...")
+        rebuild_rollups(db, affected_users)
+        db.commit()
+        print("✅ Agregados corrigidos")
+        return 0
+    except Exception as e:
+        db.rollback()
+        print(f"❌ Erro: {str(e)}")
+        import traceback
+        traceback.print_exc()
+        return 1
+    finally:
+        db.close()
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -25,8 +25,17 @@ export default function Layout({ children }: LayoutProps) {
 
     setUploading(true);
     try {
-      await uploadAPI.uploadExcel(file);
-      alert('Planilha importada com sucesso!');
+      const response = await uploadAPI.uploadExcel(file);
+      const { count, errors = [] } = response.data;
+      if (errors.length > 0) {
+        const details = errors
+          .slice(0, 10)
+          .map((err: { row: number; block: string; error: string }) => `Linha ${err.row} (${err.block}): ${err.error}`)
+          .join('\n');
+        alert(`${count} transações importadas. ${errors.length} linha(s) ignorada(s):\n${details}`);
+      } else {
+        alert('Planilha importada com sucesso!');
+      }
       window.location.reload();
     } catch (error) {
       console.error('Erro ao importar:', error);
@@ -87,7 +96,7 @@ export default function Layout({ children }: LayoutProps) {
             </span>
             <input
               type="file"
-              accept=".xlsx,.xls"
+              accept=".xlsx,.xls,.csv"
               onChange={handleFileUpload}
               disabled={uploading}
               className="hidden"
@@ -1,12 +1,17 @@
-import { useEffect, useState } from 'react';
+import { useCallback, useEffect, useRef, useState } from 'react';
 import { transactionsAPI, Transaction } from '../services/api';
 import { Plus, Edit, Trash2, Search, Filter } from 'lucide-react';
 import { formatCurrency, formatDate } from '../utils/formatters';
 import TransactionModal from '../components/TransactionModal';
 
+const PAGE_SIZE = 50;
+
 export default function Transactions() {
   const [transactions, setTransactions] = useState<Transaction[]>([]);
   const [loading, setLoading] = useState(true);
+  const [nextCursor, setNextCursor] = useState<string | null>(null);
+  const [loadingMore, setLoadingMore] = useState(false);
+  const sentinelRef = useRef<HTMLDivElement | null>(null);
   const [searchTerm, setSearchTerm] = useState('');
   const [isModalOpen, setIsModalOpen] = useState(false);
   const [editingTransaction, setEditingTransaction] = useState<Transaction | null>(null);
@@ -17,8 +22,9 @@ export default function Transactions() {
 
   const loadTransactions = async () => {
     try {
-      const response = await transactionsAPI.getAll();
-      setTransactions(response.data);
+      const page = await transactionsAPI.getPage({ limit: PAGE_SIZE });
+      setTransactions(page.items);
+      setNextCursor(page.nextCursor);
     } catch (error) {
       console.error('Erro ao carregar transações:', error);
     } finally {
@@ -26,6 +32,31 @@ export default function Transactions() {
     }
   };
 
+  const loadMore = useCallback(async () => {
+    if (!nextCursor || loadingMore) return;
+    setLoadingMore(true);
+    try {
+      const page = await transactionsAPI.getPage({ limit: PAGE_SIZE }, nextCursor);
+      setTransactions((current) => [...current, ...page.items]);
+      setNextCursor(page.nextCursor);
+    } catch (error) {
+      console.error('Erro ao carregar mais transações:', error);
+    } finally {
+      setLoadingMore(false);
+    }
+  }, [nextCursor, loadingMore]);
+
+  // Carregar a próxima página quando o fim da lista aparecer na tela
+  useEffect(() => {
+    const sentinel = sentinelRef.current;
+    if (!sentinel || !nextCursor) return;
+    const observer = new IntersectionObserver((entries) => {
+      if (entries[0].isIntersecting) loadMore();
+    });
+    observer.observe(sentinel);
+    return () => observer.disconnect();
+  }, [nextCursor, loadMore]);
+
   const handleDelete = async (id: number) => {
     if (!confirm('Tem certeza que deseja deletar esta transação?')) return;
     
@@ -158,6 +189,20 @@ export default function Transactions() {
             </table>
           </div>
         )}
+        {nextCursor && (
+          <div ref={sentinelRef} className="flex items-center justify-center py-6">
+            {loadingMore ? (
+              <div className="animate-spin rounded-full h-6 w-6 border-t-2 border-b-2 border-purple-500"></div>
+            ) : (
+              <button
+                onClick={loadMore}
+                className="px-4 py-2 glass rounded-lg text-sm text-gray-300 hover:bg-white/5 transition-all"
+              >
+                Carregar mais
+              </button>
+            )}
+          </div>
+        )}
       </div>
 
       {/* Transaction Modal */}
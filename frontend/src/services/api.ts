@@ -117,8 +117,23 @@ export interface HourlyCalculationResponse {
   month: string;
 }
 
+export interface TransactionPage {
+  items: Transaction[];
+  nextCursor: string | null;
+}
+
 export const transactionsAPI = {
   getAll: (params?: any) => api.get<Transaction[]>('/transactions/', { params }),
+  // Paginação por cursor: o cursor da próxima página vem no header X-Next-Cursor
+  getPage: async (params?: any, cursor?: string | null): Promise<TransactionPage> => {
+    const response = await api.get<Transaction[]>('/transactions/', {
+      params: { ...params, cursor: cursor || undefined },
+    });
+    return {
+      items: response.data,
+      nextCursor: response.headers['x-next-cursor'] || null,
+    };
+  },
   getById: (id: number) => api.get<Transaction>(`/transactions/${id}`),
   create: (data: Partial<Transaction>) => api.post<Transaction>('/transactions/', data),
   update: (id: number, data: Partial<Transaction>) => api.put<Transaction>(`/transactions/${id}`, data),
@@ -144,11 +159,45 @@ export const uploadAPI = {
   },
 };
 
+export interface CategoryRule {
+  id: number;
+  keyword: string;
+  category: string;
+  created_at?: string;
+}
+
+export const categoriesAPI = {
+  getRules: () => api.get<CategoryRule[]>('/categories/rules'),
+  createRule: (keyword: string, category: string) =>
+    api.post<CategoryRule>('/categories/rules', { keyword, category }),
+  deleteRule: (id: number) => api.delete(`/categories/rules/${id}`),
+  recategorize: (onlyUncategorized = false) =>
+    api.post<{ checked: number; updated: number }>('/categories/recategorize', null, {
+      params: { only_uncategorized: onlyUncategorized },
+    }),
+};
+
+export interface ReportJob {
+  id: string;
+  format: 'pdf' | 'excel';
+  status: 'pending' | 'running' | 'done' | 'failed';
+  error?: string;
+  created_at?: string;
+  finished_at?: string;
+  expires_at?: string;
+}
+
 export const reportsAPI = {
   generatePDF: (params?: any) => 
     api.get('/reports/pdf', { params, responseType: 'blob' }),
   generateExcel: (params?: any) => 
     api.get('/reports/excel', { params, responseType: 'blob' }),
+  submitJob: (format: 'pdf' | 'excel', params?: any) =>
+    api.post<ReportJob>('/reports/jobs', { format, ...params }),
+  getJob: (id: string) =>
+    api.get<ReportJob>(`/reports/jobs/${id}`),
+  downloadJob: (id: string) =>
+    api.get(`/reports/jobs/${id}/download`, { responseType: 'blob' }),
 };
 
 export const authAPI = {